@@ -0,0 +1,94 @@
+"""Бенчмарк отчета о нарушениях: фото в полном размере против кэша миниатюр.
+
+Запуск из папки analizing_data:
+    python -m tools.bench_violation_report
+"""
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl.drawing.image import Image
+from openpyxl.utils import get_column_letter
+from PIL import Image as PILImage
+
+from violation_report_generator.thumbnail_cache import ThumbnailCache
+from violation_report_generator.violation_data_model import Violation, ViolationReportData
+from violation_report_generator.violation_report_generator import ViolationReportGenerator
+
+PHOTOS = 120
+PHOTO_SIZE = (1600, 1200)
+
+
+class FullSizeReportGenerator(ViolationReportGenerator):
+    """Прежнее поведение: исходный файл вставляется целиком, меняются только width/height"""
+
+    def _insert_photo(self, ws, photo_path: Path, row: int, col: int):
+        img = Image(photo_path)
+        scale_ratio = min(200 / img.width, 70 / img.height)
+        img.width = int(img.width * scale_ratio)
+        img.height = int(img.height * scale_ratio)
+        img.anchor = f'{get_column_letter(col)}{row}'
+        ws.add_image(img)
+
+
+def make_photos(folder: Path) -> list:
+    paths = []
+    for i in range(PHOTOS):
+        img = PILImage.effect_noise(PHOTO_SIZE, random.randint(20, 80)).convert('RGB')
+        path = folder / f"photo_{i}.jpg"
+        img.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def make_report_data(photos: list) -> ViolationReportData:
+    violations = [
+        Violation(
+            section_name=f"Раздел {i % 5 + 1}",
+            subsection_name=None,
+            criterion_number=i + 1,
+            criterion_description="Критерий",
+            comment="Нарушение",
+            photo_path=photo
+        )
+        for i, photo in enumerate(photos)
+    ]
+    return ViolationReportData(
+        original_report_name="bench",
+        inspection_date="01.01.2026",
+        section_name="Бенчмарк",
+        inspector="bench",
+        violations=violations,
+        total_violations=len(violations)
+    )
+
+
+def bench(generator: ViolationReportGenerator, data: ViolationReportData, output_path: Path):
+    started = time.perf_counter()
+    generator.generate(data, output_path)
+    return time.perf_counter() - started, os.path.getsize(output_path)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        photos = make_photos(tmp)
+        data = make_report_data(photos)
+        cached = ViolationReportGenerator(ThumbnailCache(tmp / "thumbnails"))
+
+        results = [
+            ("полный размер", *bench(FullSizeReportGenerator(), data, tmp / "full.xlsx")),
+            ("миниатюры, холодный кэш", *bench(cached, data, tmp / "cold.xlsx")),
+            ("миниатюры, теплый кэш", *bench(cached, data, tmp / "warm.xlsx")),
+        ]
+
+        print(f"Фото: {PHOTOS} шт. {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]}")
+        print(f"{'режим':>24} | {'время, с':>9} | {'размер, КБ':>11}")
+        for name, elapsed, size in results:
+            print(f"{name:>24} | {elapsed:>9.2f} | {size / 1024:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
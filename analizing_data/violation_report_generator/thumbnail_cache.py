@@ -0,0 +1,60 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+
+class ThumbnailCache:
+    """
+    Кэш миниатюр фотографий нарушений.
+    Каждое фото один раз вписывается в размер ячейки отчета;
+    ключ кэша - хэш содержимого файла и целевой размер.
+    """
+
+    def __init__(self, cache_dir: Path = None, max_size: Tuple[int, int] = (200, 70), quality: int = 85):
+        self.cache_dir = cache_dir or Path(__file__).parent.parent / "thumbnails_cache"
+        self.max_size = max_size
+        self.quality = quality
+        # (путь, mtime, размер файла) -> миниатюра, чтобы не хэшировать файл повторно
+        self._known: Dict[Tuple[str, int, int], Path] = {}
+
+    def get(self, photo_path: Path) -> Path:
+        """Возвращает путь к миниатюре, создавая ее при первом обращении"""
+        stat = os.stat(photo_path)
+        known_key = (str(photo_path), stat.st_mtime_ns, stat.st_size)
+        thumbnail_path = self._known.get(known_key)
+        if thumbnail_path and thumbnail_path.exists():
+            return thumbnail_path
+
+        width, height = self.max_size
+        thumbnail_path = self.cache_dir / f"{self._file_hash(photo_path)}_{width}x{height}_fit.jpg"
+        if not thumbnail_path.exists():
+            self._make_thumbnail(photo_path, thumbnail_path)
+
+        self._known[known_key] = thumbnail_path
+        return thumbnail_path
+
+    def _make_thumbnail(self, photo_path: Path, thumbnail_path: Path):
+        """Вписывает фото в max_size с сохранением пропорций (маленькие увеличиваются) и сохраняет в JPEG"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with PILImage.open(photo_path) as img:
+            # draft позволяет декодировать JPEG сразу в уменьшенном масштабе
+            img.draft('RGB', self.max_size)
+            img = img.convert('RGB')
+            # thumbnail() только уменьшает; contain, как и прежний расчет масштаба, растягивает до рамки
+            img = ImageOps.contain(img, self.max_size, PILImage.LANCZOS)
+
+            tmp_path = thumbnail_path.with_name(f"{thumbnail_path.name}.{os.getpid()}.tmp")
+            img.save(tmp_path, 'JPEG', quality=self.quality, optimize=True)
+        os.replace(tmp_path, thumbnail_path)
+
+    @staticmethod
+    def _file_hash(photo_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(photo_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
@@ -4,6 +4,7 @@ from openpyxl.drawing.image import Image
 from openpyxl.utils import get_column_letter
 from pathlib import Path
 from .violation_data_model import ViolationReportData
+from .thumbnail_cache import ThumbnailCache
 
 class ViolationReportGenerator:
     """
@@ -11,6 +12,10 @@ class ViolationReportGenerator:
     Стиль похож на основной отчет, но без оценок и с колонкой для фото.
     """
     
+    def __init__(self, thumbnail_cache: ThumbnailCache = None):
+        # Фото вставляются уже уменьшенными до размера ячейки
+        self.thumbnail_cache = thumbnail_cache or ThumbnailCache()
+    
     def generate(self, data: ViolationReportData, output_path: Path) -> Path:
         """Генерирует отчет о нарушениях"""
         wb = openpyxl.Workbook()
@@ -130,24 +135,8 @@ class ViolationReportGenerator:
     def _insert_photo(self, ws, photo_path: Path, row: int, col: int):
         """Вставляет фотографию в указанную ячейку"""
         try:
-            img = Image(photo_path)
-            
-            # Масштабируем изображение
-            max_width = 200
-            max_height = 70
-            
-            # Получаем оригинальные размеры
-            original_width = img.width
-            original_height = img.height
-            
-            # Вычисляем коэффициенты масштабирования
-            width_ratio = max_width / original_width
-            height_ratio = max_height / original_height
-            scale_ratio = min(width_ratio, height_ratio)
-            
-            # Применяем масштабирование
-            img.width = int(original_width * scale_ratio)
-            img.height = int(original_height * scale_ratio)
+            # Миниатюра уже вписана в 200x70, масштабировать не нужно
+            img = Image(self.thumbnail_cache.get(photo_path))
             
             # Якорь для позиционирования изображения
             cell_anchor = f'{get_column_letter(col)}{row}'
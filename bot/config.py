@@ -6,4 +6,72 @@ load_dotenv()
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 
 if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN не найден в переменных окружения")
\ No newline at end of file
+    raise ValueError("BOT_TOKEN не найден в переменных окружения")
+
+# Хранилище данных: "json" (файлы *.json) или "sqlite"
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'data/bot.sqlite3')
+
+# Интервал отложенной записи JSON-хранилищ, мс
+FLUSH_INTERVAL_MS = int(os.getenv('FLUSH_INTERVAL_MS', '200'))
+
+# Фото нарушений: папка и число одновременных скачиваний
+PHOTOS_FOLDER = os.getenv('PHOTOS_FOLDER', 'data/checklist_photos')
+PHOTO_DOWNLOAD_CONCURRENCY = int(os.getenv('PHOTO_DOWNLOAD_CONCURRENCY', '4'))
+
+# Сколько чек-листов держать в памяти (остальные читаются с диска по требованию)
+CHECKLIST_CACHE_SIZE = int(os.getenv('CHECKLIST_CACHE_SIZE', '256'))
+
+# Сколько пользователей держать в кэше ролей (проверка прав без обращения к хранилищу)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+
+# FSM-хранилище: "memory" (сбрасывается при перезапуске) или "sqlite" (в SQLITE_PATH)
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'memory').lower()
+# Через сколько секунд без изменений состояние считается брошенным (по умолчанию 7 дней)
+FSM_STATE_TTL = int(os.getenv('FSM_STATE_TTL', str(7 * 24 * 3600)))
+
+# Режим получения апдейтов: "polling" или "webhook"
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+# Сколько апдейтов обрабатывается одновременно
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '32'))
+
+# Вебхук: публичный адрес (если пуст, вебхук в Telegram не регистрируется - для локальной проверки),
+# адрес и путь встроенного сервера, секрет из заголовка X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Экспорт метрик для Prometheus: локальный адрес и порт (0 - выключен, статистика доступна через /stats)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Генерация отчетов: размеры пулов процессов (верстка PDF/Excel) и потоков (ввод-вывод)
+REPORT_PROCESSES = int(os.getenv('REPORT_PROCESSES', '2'))
+REPORT_THREADS = int(os.getenv('REPORT_THREADS', '4'))
+
+# Очередь отчетов: число одновременно готовящихся отчетов, папка и размер кэша готовых файлов
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+REPORT_CACHE_FOLDER = os.getenv('REPORT_CACHE_FOLDER', 'data/reports_cache')
+REPORT_CACHE_SIZE = int(os.getenv('REPORT_CACHE_SIZE', '50'))
+
+# Уведомления: лимиты Telegram (сообщений в секунду на бота и на чат) и число повторов при ошибках
+NOTIFY_GLOBAL_RATE = float(os.getenv('NOTIFY_GLOBAL_RATE', '25'))
+NOTIFY_CHAT_RATE = float(os.getenv('NOTIFY_CHAT_RATE', '1'))
+NOTIFY_CHAT_BURST = int(os.getenv('NOTIFY_CHAT_BURST', '3'))
+NOTIFY_MAX_RETRIES = int(os.getenv('NOTIFY_MAX_RETRIES', '3'))
+
+# Очередь исходящих уведомлений (outbox): число попыток доставки и размер пачки отправки
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+
+# Кэш отрисованных сообщений чек-листов (число мест x видов просмотра)
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '512'))
+
+# Сколько разовых многостраничных списков держать в памяти для листания
+PAGER_CACHE_SIZE = int(os.getenv('PAGER_CACHE_SIZE', '1000'))
+
+# Сколько мест показывать на одной странице списков проверок и объектов
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '8'))
@@ -0,0 +1,151 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Адрес критерия внутри раздела: (подраздел или None, номер)
+CriterionKey = Tuple[Optional[str], int]
+
+
+def iter_section_criteria(section_data: Dict) -> Iterator[Tuple[Optional[str], Dict]]:
+    """Критерии раздела: сначала прямые (подраздел None), затем по подразделам"""
+    for criterion in section_data.get("criteria", []):
+        yield None, criterion
+    for sub_key, sub_data in section_data.get("subdivisions", {}).items():
+        for criterion in sub_data.get("criteria", []):
+            yield sub_key, criterion
+
+
+def iter_criteria(checklist_data: Dict) -> Iterator[Tuple[str, Optional[str], Dict]]:
+    """Обходит все критерии: сначала прямые критерии раздела, затем критерии подразделов"""
+    for section_key, section_data in checklist_data["sections"].items():
+        for sub_key, criterion in iter_section_criteria(section_data):
+            yield section_key, sub_key, criterion
+
+
+class ChecklistIndex:
+    """Индекс критериев одного чек-листа: (раздел, подраздел, номер) -> критерий.
+
+    Хранит ссылки на те же словари, что и checklist_data, поэтому изменения
+    критерия через индекс сразу видны в данных чек-листа.
+    """
+
+    def __init__(self, checklist_data: Dict):
+        self.criteria: Dict[Tuple[str, Optional[str], int], Dict] = {}
+        self.section_keys: Dict[str, List[CriterionKey]] = {}
+        self.section_filled: Dict[str, int] = {}
+
+        for section_key in checklist_data["sections"]:
+            self.section_keys[section_key] = []
+            self.section_filled[section_key] = 0
+
+        for section_key, sub_key, criterion in iter_criteria(checklist_data):
+            self.criteria[(section_key, sub_key, criterion["number"])] = criterion
+            self.section_keys[section_key].append((sub_key, criterion["number"]))
+            if criterion.get('complies') is not None:
+                self.section_filled[section_key] += 1
+
+    def get(self, section: str, criterion_number: int, subdivision: Optional[str] = None) -> Optional[Dict]:
+        return self.criteria.get((section, subdivision, criterion_number))
+
+    def section_progress(self) -> Dict[str, Dict[str, int]]:
+        """Возвращает {раздел: {"filled": n, "total": m}}"""
+        return {
+            section_key: {"filled": self.section_filled[section_key], "total": len(keys)}
+            for section_key, keys in self.section_keys.items()
+        }
+
+
+def find_criterion(checklist_data: Dict, section: str, criterion_number: int,
+                   subdivision: Optional[str] = None) -> Optional[Dict]:
+    """Линейный поиск критерия (для данных без индекса)"""
+    section_data = checklist_data["sections"].get(section)
+    if not section_data:
+        return None
+    if subdivision:
+        section_data = section_data.get("subdivisions", {}).get(subdivision)
+        if not section_data:
+            return None
+    for criterion in section_data.get("criteria", []):
+        if criterion["number"] == criterion_number:
+            return criterion
+    return None
+
+
+def count_completed_criteria(checklist: Dict) -> int:
+    """Подсчитывает количество заполненных критериев"""
+    return sum(1 for _, _, criterion in iter_criteria(checklist["checklist_data"])
+               if criterion.get('complies') is not None)
+
+
+def count_total_criteria(checklist_data: Dict) -> int:
+    """Подсчитывает общее количество критериев"""
+    return sum(1 for _ in iter_criteria(checklist_data))
+
+
+def is_checklist_completed(checklist: Dict) -> bool:
+    """Проверяет, заполнен ли весь чек-лист"""
+    return checklist["completed_criteria"] >= checklist["total_criteria"]
+
+
+def checklist_version(checklist: Dict) -> Tuple[Optional[str], int]:
+    """Версия чек-листа для кэшей: время создания (чек-лист могли пересоздать) и номер изменения"""
+    return checklist.get("created_at"), checklist.get("version", 0)
+
+
+def apply_criterion(checklists: Dict, place_id: str, section: str, criterion_number: int,
+                    complies: bool, comment: str, photo_path: Optional[str], ts: str,
+                    subdivision: Optional[str] = None, index: Optional[ChecklistIndex] = None) -> bool:
+    """Записывает статус критерия в чек-лист и обновляет счетчики.
+
+    С индексом критерий находится за O(1), без него - линейным поиском.
+    """
+    if place_id not in checklists:
+        return False
+
+    checklist = checklists[place_id]
+    if section not in checklist["checklist_data"]["sections"]:
+        return False
+
+    if index is not None:
+        criterion = index.get(section, criterion_number, subdivision)
+    else:
+        criterion = find_criterion(checklist["checklist_data"], section, criterion_number, subdivision)
+
+    if criterion is not None:
+        old_complies = criterion.get('complies')
+
+        criterion["complies"] = complies
+        criterion["does_not_comply"] = not complies
+        criterion["comment"] = comment
+        if photo_path:
+            criterion["photo_path"] = photo_path
+
+        # Обновляем счетчики заполненных критериев
+        if old_complies is None and complies is not None:
+            checklist["completed_criteria"] += 1
+            if index is not None:
+                index.section_filled[section] += 1
+
+    checklist["updated_at"] = ts
+    checklist["version"] = checklist.get("version", 0) + 1
+
+    # Проверяем, завершен ли чек-лист
+    if is_checklist_completed(checklist):
+        checklist["status"] = "completed"
+        checklist["completed_at"] = ts
+
+    return True
+
+
+def checklist_progress(checklist: Optional[Dict]) -> Dict:
+    """Возвращает прогресс заполнения чек-листа"""
+    if not checklist:
+        return {"completed": 0, "total": 0, "percentage": 0}
+
+    completed = checklist.get("completed_criteria", 0)
+    total = checklist.get("total_criteria", 0)
+    percentage = (completed / total * 100) if total > 0 else 0
+
+    return {
+        "completed": completed,
+        "total": total,
+        "percentage": round(percentage, 1)
+    }
@@ -1,150 +1,381 @@
+import copy
+import hashlib
 import json
 import os
-import shutil
-from typing import Dict, Optional
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
 
+from config import STORAGE_BACKEND, SQLITE_PATH, CHECKLIST_CACHE_SIZE
+from database.checklist_data import (
+    ChecklistIndex,
+    CriterionKey,
+    apply_criterion,
+    checklist_progress,
+    count_completed_criteria,
+    count_total_criteria
+)
+from database.flusher import dump_json, flusher, serialize_json, write_json_text
+from database.journal import ChecklistJournal
+from database.migrations import SCHEMA_VERSION, migrate_checklists, pack_shard, unpack_shard, unpack_snapshot
+
+
+# Символы, которые не попадают в имя файла места как есть: "/", "..", зарезервированные ОС
+_UNSAFE_FILE_CHARS = re.compile(r"[^\w-]")
+
+
+def shard_file_name(place_id: str) -> str:
+    """Имя файла места: id как есть, если он безопасен, иначе очищенный id и короткий хэш.
+
+    Точка в безопасном имени невозможна, поэтому имена с хэшем не пересекаются с обычными.
+    """
+    if place_id and not _UNSAFE_FILE_CHARS.search(place_id):
+        return f"{place_id}.json"
+    digest = hashlib.sha1(place_id.encode('utf-8')).hexdigest()[:10]
+    return f"{_UNSAFE_FILE_CHARS.sub('_', place_id)[:64]}.{digest}.json"
+
 
 class ChecklistsDB:
-    def __init__(self, db_path: str = "data/checklists.json", photos_folder: str = "data/checklist_photos"):
+    """Чек-листы по одному файлу на место: data/checklists/<place_id>.json (см. shard_file_name).
+
+    Файл места читается при первом обращении, в памяти держится не больше cache_size
+    чек-листов (LRU). Места с изменениями, еще не записанными в свой файл, из кэша не вытесняются.
+    """
+
+    def __init__(self, db_path: str = "data/checklists", journal_mode: bool = True, compact_every: int = 500,
+                 cache_size: int = 256, legacy_path: str = "data/checklists.json"):
         self.db_path = db_path
-        self.photos_folder = photos_folder
-        self.checklists = self._load_checklists()
-
-        # Создаем папку для фото если нет
-        os.makedirs(photos_folder, exist_ok=True)
-
-    def _load_checklists(self) -> Dict:
-        if os.path.exists(self.db_path):
-            try:
-                with open(self.db_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Миграция старых данных
-                    for place_id, checklist in data.items():
-                        if "completed_criteria" not in checklist:
-                            checklist["completed_criteria"] = self._count_completed_criteria(checklist)
-                        if "total_criteria" not in checklist:
-                            checklist["total_criteria"] = self._count_total_criteria(checklist["checklist_data"])
-                    return data
-            except:
-                return {}
-        return {}
-
-    def _save_checklists(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with open(self.db_path, 'w', encoding='utf-8') as f:
-            json.dump(self.checklists, f, ensure_ascii=False, indent=2)
-
-    def _count_completed_criteria(self, checklist: Dict) -> int:
-        """Подсчитывает количество заполненных критериев"""
-        completed = 0
-        checklist_data = checklist["checklist_data"]
-        for section_data in checklist_data["sections"].values():
-            for criterion in section_data["criteria"]:
-                if criterion.get('complies') is not None:
-                    completed += 1
-        return completed
-
-    def _count_total_criteria(self, checklist_data: Dict) -> int:
-        """Подсчитывает общее количество критериев"""
-        total = 0
-        for section_data in checklist_data["sections"].values():
-            total += len(section_data["criteria"])
-        return total
+        self.compact_every = compact_every
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._compaction_thread = None
+        os.makedirs(db_path, exist_ok=True)
+
+        # place_id -> (чек-лист, индекс) в порядке последнего обращения
+        self._cache: "OrderedDict[str, Tuple[Dict, ChecklistIndex]]" = OrderedDict()
+        # Места, изменения которых пока есть только в журнале (текущем или сворачиваемом)
+        # или ждут отложенной записи; такие места нельзя вытеснять из кэша
+        self._journal_places: Set[str] = set()
+        self._compacting_places: Set[str] = set()
+        self._unsaved_places: Dict[str, int] = {}
+        self._writers: Dict[str, Callable[[], None]] = {}
+
+        self._split_legacy_snapshot(legacy_path)
+
+        # В режиме журнала изменения дописываются в лог, а файлы мест переписываются только при компактации
+        self.journal = None
+        if journal_mode:
+            self.journal = ChecklistJournal(os.path.splitext(legacy_path)[0] + ".journal")
+            # Журнал прошлого запуска сразу переносится в файлы мест, до первых апдейтов:
+            # иначе все его места пришлось бы держать в кэше сверх cache_size до компактации
+            self.journal.rotate()
+            self._compact_rotated()
+
+    def _split_legacy_snapshot(self, legacy_path: str):
+        """Разовая миграция: общий checklists.json раскладывается по файлам мест"""
+        if not os.path.exists(legacy_path):
+            return
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            version, checklists = unpack_snapshot(json.load(f))
+        migrate_checklists(checklists, version)
+        for place_id, checklist in checklists.items():
+            self._write_shard(place_id, checklist)
+        # Журнал прежнего формата совместим: он применится к файлам мест при загрузке
+        os.replace(legacy_path, f"{legacy_path}.bak")
+
+    def _shard_path(self, place_id: str) -> str:
+        return os.path.join(self.db_path, shard_file_name(place_id))
+
+    def _place_id_from_file(self, file_name: str) -> Optional[str]:
+        stem = file_name[:-len(".json")]
+        if "." not in stem:
+            return stem
+        # Имя с хэшем: настоящий id записан в самом файле
+        try:
+            with open(os.path.join(self.db_path, file_name), 'r', encoding='utf-8') as f:
+                return json.load(f).get("place_id")
+        except (OSError, ValueError):
+            return None
+
+    def _read_shard(self, place_id: str) -> Tuple[int, Optional[Dict]]:
+        path = self._shard_path(place_id)
+        if not os.path.exists(path):
+            return SCHEMA_VERSION, None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return unpack_shard(json.load(f))
+        except:
+            return SCHEMA_VERSION, None
+
+    def _write_shard(self, place_id: str, checklist: Dict):
+        """Атомарно записывает файл места с текущей версией схемы"""
+        dump_json(self._shard_path(place_id), pack_shard(place_id, checklist))
+
+    def _is_pinned(self, place_id: str) -> bool:
+        return (place_id in self._journal_places or place_id in self._compacting_places
+                or place_id in self._unsaved_places)
+
+    def _remember(self, place_id: str, checklist: Dict) -> Tuple[Dict, ChecklistIndex]:
+        entry = (checklist, ChecklistIndex(checklist["checklist_data"]))
+        self._cache[place_id] = entry
+        self._evict(keep=place_id)
+        return entry
+
+    def _evict(self, keep: str = None):
+        """Вытесняет самые давние чек-листы сверх лимита, пропуская незаписанные и keep"""
+        excess = len(self._cache) - self.cache_size
+        if excess <= 0:
+            return
+        for place_id in list(self._cache):
+            if excess <= 0:
+                break
+            if place_id != keep and not self._is_pinned(place_id):
+                del self._cache[place_id]
+                excess -= 1
+
+    def _load(self, place_id: str) -> Optional[Tuple[Dict, ChecklistIndex]]:
+        """Возвращает чек-лист с индексом из кэша или читает файл места"""
+        with self._lock:
+            entry = self._cache.get(place_id)
+            if entry:
+                self._cache.move_to_end(place_id)
+                return entry
+
+            version, checklist = self._read_shard(place_id)
+            if checklist is None:
+                return None
+            # Файл старой версии обновляется один раз при первом чтении
+            if migrate_checklists({place_id: checklist}, version):
+                self._write_shard(place_id, checklist)
+            return self._remember(place_id, checklist)
+
+    def _save_shard(self, place_id: str):
+        """Отложенная запись файла одного места; повторные запросы схлопываются"""
+        self._unsaved_places[place_id] = self._unsaved_places.get(place_id, 0) + 1
+        writer = self._writers.get(place_id)
+        if writer is None:
+            writer = self._writers[place_id] = lambda: self._write_unsaved(place_id)
+        flusher.request_save(writer)
+
+    def _write_unsaved(self, place_id: str):
+        with self._lock:
+            version = self._unsaved_places.get(place_id)
+            entry = self._cache.get(place_id)
+            if version is None or entry is None:
+                return
+            # Снимок под той же блокировкой, под которой update_criterion меняет чек-лист
+            text = serialize_json(pack_shard(place_id, entry[0]))
+        write_json_text(self._shard_path(place_id), text)
+        with self._lock:
+            # Если за время записи пришли новые изменения, место остается закрепленным до следующей
+            if self._unsaved_places.get(place_id) == version:
+                del self._unsaved_places[place_id]
+                self._evict()
+
+    def _persist(self, place_id: str, record: Dict):
+        """Фиксирует изменение: запись в журнал или перезапись файла этого места"""
+        if self.journal is None:
+            self._save_shard(place_id)
+            return
+
+        self.journal.append(record)
+        self._journal_places.add(place_id)
+        if self.journal.records_count >= self.compact_every:
+            self._start_compaction()
+
+    def _rotate_journal(self):
+        self.journal.rotate()
+        self._compacting_places |= self._journal_places
+        self._journal_places = set()
+
+    def _start_compaction(self):
+        """Ротирует журнал и переносит его записи в файлы мест в фоновом потоке"""
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._rotate_journal()
+        self._compaction_thread = threading.Thread(target=self._compact_rotated, daemon=True)
+        self._compaction_thread.start()
+
+    def _compact_rotated(self):
+        """Применяет ротированный журнал к файлам мест и переписывает только затронутые.
+
+        Работает с копиями, прочитанными с диска, поэтому не блокирует обработчики.
+        """
+        records_by_place: Dict[str, List[Dict]] = {}
+        for record in ChecklistJournal._read(self.journal.rotated_path):
+            records_by_place.setdefault(record.get("place_id"), []).append(record)
+
+        for place_id, records in records_by_place.items():
+            version, checklist = self._read_shard(place_id)
+            checklists = {}
+            if checklist is not None:
+                migrate_checklists({place_id: checklist}, version)
+                checklists[place_id] = checklist
+            for record in records:
+                self._apply_record(checklists, record)
+            if place_id in checklists:
+                self._write_shard(place_id, checklists[place_id])
+
+        self.journal.drop_rotated()
+        with self._lock:
+            self._compacting_places = set()
+            self._evict()
+
+    def compact(self):
+        """Синхронно переносит весь журнал в файлы мест"""
+        if self.journal is None:
+            return
+        # Фоновую компактацию ждем без блокировки: в конце она сама берет self._lock
+        while True:
+            if self._compaction_thread:
+                self._compaction_thread.join()
+            with self._lock:
+                if not (self._compaction_thread and self._compaction_thread.is_alive()):
+                    self._rotate_journal()
+                    # Пока журнал сворачивается здесь, _start_compaction не начнет фоновую
+                    self._compaction_thread = threading.current_thread()
+                    break
+        try:
+            self._compact_rotated()
+        finally:
+            with self._lock:
+                self._compaction_thread = None
+
+    def close(self):
+        """Дожидается фоновой компактации и закрывает журнал"""
+        if self._compaction_thread:
+            self._compaction_thread.join()
+        if self.journal:
+            self.journal.close()
+
+    @staticmethod
+    def _apply_record(checklists: Dict, record: Dict) -> bool:
+        """Применяет запись журнала к словарю чек-листов (повторное применение безопасно)"""
+        op = record.get("op")
+        if op == "create":
+            checklists[record["place_id"]] = record["checklist"]
+            return True
+        if op == "criterion":
+            return apply_criterion(
+                checklists, record["place_id"], record["section"], record["number"],
+                record["complies"], record.get("comment", ""), record.get("photo_path"), record["ts"],
+                record.get("subdivision")
+            )
+        return False
 
     def create_checklist(self, place_id: str, inspector_name: str, checklist_data: Dict) -> bool:
-        total_criteria = self._count_total_criteria(checklist_data)
-        completed_criteria = self._count_completed_criteria({"checklist_data": checklist_data})
+        # Шаблон общий для всех мест - у каждого чек-листа должна быть своя копия
+        checklist_data = copy.deepcopy(checklist_data)
+        total_criteria = count_total_criteria(checklist_data)
+        completed_criteria = count_completed_criteria({"checklist_data": checklist_data})
 
-        self.checklists[place_id] = {
+        checklist = {
             "checklist_data": checklist_data,
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat(),
             "status": "draft",
             "inspector_name": inspector_name,
             "completed_criteria": completed_criteria,
-            "total_criteria": total_criteria
+            "total_criteria": total_criteria,
+            "version": 0
         }
-        self._save_checklists()
+        with self._lock:
+            self._remember(place_id, checklist)
+            self._persist(place_id, {"op": "create", "place_id": place_id, "checklist": checklist})
         return True
 
     def get_checklist(self, place_id: str) -> Optional[Dict]:
-        checklist = self.checklists.get(place_id)
-        if checklist and "completed_criteria" not in checklist:
-            # Миграция для старых записей
-            checklist["completed_criteria"] = self._count_completed_criteria(checklist)
-            checklist["total_criteria"] = self._count_total_criteria(checklist["checklist_data"])
-            self._save_checklists()
-        return checklist
+        entry = self._load(place_id)
+        return entry[0] if entry else None
 
-    def update_criterion(self, place_id: str, section: str, criterion_number: int,
-                         complies: bool, comment: str = "", photo_path: str = None) -> bool:
-        if place_id not in self.checklists:
-            return False
-
-        checklist_data = self.checklists[place_id]["checklist_data"]
-        section_data = checklist_data["sections"].get(section)
-
-        if not section_data:
-            return False
-
-        # Находим критерий и обновляем
-        for criterion in section_data["criteria"]:
-            if criterion["number"] == criterion_number:
-                old_complies = criterion.get('complies')
-
-                criterion["complies"] = complies
-                criterion["does_not_comply"] = not complies
-                criterion["comment"] = comment
-                if photo_path:
-                    criterion["photo_path"] = photo_path
-
-                # Обновляем счетчик completed_criteria
-                if old_complies is None and complies is not None:
-                    self.checklists[place_id]["completed_criteria"] += 1
-                break
+    def iter_checklists(self) -> Iterator[Tuple[str, Dict]]:
+        """Обходит все чек-листы; не попавшие в кэш читаются с диска без кэширования"""
+        for file_name in sorted(os.listdir(self.db_path)):
+            if not file_name.endswith(".json"):
+                continue
+            place_id = self._place_id_from_file(file_name)
+            if place_id is None:
+                continue
+            entry = self._cache.get(place_id)
+            if entry:
+                yield place_id, entry[0]
+                continue
+            version, checklist = self._read_shard(place_id)
+            if checklist is not None:
+                migrate_checklists({place_id: checklist}, version)
+                yield place_id, checklist
 
-        self.checklists[place_id]["updated_at"] = datetime.now().isoformat()
+    def get_checklists_by_status(self, status: str) -> Dict:
+        """Возвращает чек-листы с указанным статусом"""
+        return {place_id: checklist for place_id, checklist in self.iter_checklists()
+                if checklist.get("status") == status}
 
-        # Проверяем, завершен ли чек-лист
-        if self._is_checklist_completed(place_id):
-            self.checklists[place_id]["status"] = "completed"
-            self.checklists[place_id]["completed_at"] = datetime.now().isoformat()
+    def get_criterion(self, place_id: str, section: str, criterion_number: int,
+                      subdivision: str = None) -> Optional[Dict]:
+        """Возвращает критерий по адресу (раздел, подраздел, номер)"""
+        entry = self._load(place_id)
+        return entry[1].get(section, criterion_number, subdivision) if entry else None
 
-        self._save_checklists()
-        return True
+    def get_section_keys(self, place_id: str, section: str) -> List[CriterionKey]:
+        """Возвращает адреса критериев раздела в порядке заполнения"""
+        entry = self._load(place_id)
+        return entry[1].section_keys.get(section, []) if entry else []
 
-    def _is_checklist_completed(self, place_id: str) -> bool:
-        """Проверяет, заполнен ли весь чек-лист"""
-        checklist = self.checklists[place_id]
-        return checklist["completed_criteria"] >= checklist["total_criteria"]
+    def get_section_progress(self, place_id: str) -> Dict[str, Dict[str, int]]:
+        """Возвращает количество заполненных критериев по разделам"""
+        entry = self._load(place_id)
+        return entry[1].section_progress() if entry else {}
 
-    def save_photo(self, place_id: str, section: str, criterion_number: int, photo_file_id: str) -> str:
-        """Сохраняет фото для критерия и возвращает путь"""
-        photo_folder = os.path.join(self.photos_folder, place_id, section)
-        os.makedirs(photo_folder, exist_ok=True)
+    def update_criterion(self, place_id: str, section: str, criterion_number: int,
+                         complies: bool, comment: str = "", photo_path: str = None,
+                         subdivision: str = None) -> bool:
+        ts = datetime.now().isoformat()
+        with self._lock:
+            entry = self._load(place_id)
+            if entry is None:
+                return False
+            checklist, index = entry
+            if not apply_criterion({place_id: checklist}, place_id, section, criterion_number,
+                                   complies, comment, photo_path, ts, subdivision, index):
+                return False
 
-        photo_path = os.path.join(photo_folder, f"criterion_{criterion_number}.jpg")
-        # Здесь должна быть логика сохранения файла из file_id
-        # Пока просто возвращаем путь
-        return photo_path
+            self._persist(place_id, {
+                "op": "criterion",
+                "place_id": place_id,
+                "section": section,
+                "subdivision": subdivision,
+                "number": criterion_number,
+                "complies": complies,
+                "comment": comment,
+                "photo_path": photo_path,
+                "ts": ts
+            })
+        return True
 
     def get_checklist_progress(self, place_id: str) -> Dict:
         """Возвращает прогресс заполнения чек-листа"""
-        checklist = self.get_checklist(place_id)
-        if not checklist:
-            return {"completed": 0, "total": 0, "percentage": 0}
-
-        completed = checklist.get("completed_criteria", 0)
-        total = checklist.get("total_criteria", 0)
-        percentage = (completed / total * 100) if total > 0 else 0
-
-        return {
-            "completed": completed,
-            "total": total,
-            "percentage": round(percentage, 1)
-        }
+        return checklist_progress(self.get_checklist(place_id))
+
+
+# Глобальный экземпляр создается при первом обращении, а не при импорте
+_checklists_db = None
+
+
+def get_checklists_db():
+    """Возвращает общее хранилище чек-листов"""
+    global _checklists_db
+    if _checklists_db is None:
+        if STORAGE_BACKEND == "sqlite":
+            from database.sqlite_db import SQLiteChecklistsDB
+            _checklists_db = SQLiteChecklistsDB(SQLITE_PATH)
+        else:
+            _checklists_db = ChecklistsDB(cache_size=CHECKLIST_CACHE_SIZE)
+    return _checklists_db
 
 
-# Глобальный экземпляр
-checklists_db = ChecklistsDB()
\ No newline at end of file
+def close_checklists_db():
+    """Закрывает хранилище, если оно создавалось"""
+    if _checklists_db is not None:
+        _checklists_db.close()
\ No newline at end of file
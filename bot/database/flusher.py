@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from config import FLUSH_INTERVAL_MS
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def write_json_text(path: str, text: str) -> None:
+    """Атомарно записывает готовый JSON: сначала во временный файл, затем rename"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with metrics.timer("storage_save", store="json"):
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except Exception:
+            # Недописанный временный файл не должен оставаться рядом с данными
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    metrics.inc("storage_bytes", size, store="json")
+
+
+def snapshot_records(records: Dict) -> Dict:
+    """Копия словаря записей на два уровня.
+
+    Обработчики меняют записи на месте, а значения в записях - строки и числа, поэтому
+    такой копии достаточно, чтобы сериализовать ее в рабочем потоке. Она в разы дешевле json.dumps.
+    """
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in records.items()}
+
+
+def dump_json(path: str, data) -> None:
+    """Атомарно записывает JSON; data не должна меняться во время вызова"""
+    write_json_text(path, serialize_json(data))
+
+
+class JsonFlusher:
+    """Отложенная (write-behind) запись JSON-хранилищ.
+
+    Изменение хранилища только помечает его функцию записи как "грязную".
+    Фоновая задача не чаще раза в interval_ms вызывает накопленные функции
+    в рабочем потоке, так что пачка изменений превращается в одну запись файла,
+    а обработчики не ждут диска. Пока задача не запущена (скрипты, бенчмарки),
+    запись выполняется сразу.
+
+    Хранилища, которые обработчики меняют без блокировки, регистрируют снимок
+    (request_snapshot): в потоке событий, пока данные никто не меняет, снимается
+    дешевая копия (snapshot_records), а сериализация и запись идут в рабочем потоке.
+    """
+
+    def __init__(self, interval_ms: int = 200):
+        self.interval = interval_ms / 1000
+        # функция -> True, если это снимок, возвращающий функцию записи
+        self._dirty: Dict[Callable, bool] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def request_save(self, write: Callable[[], None]):
+        """Планирует запись; повторные запросы до сброса схлопываются в один"""
+        if not self.running:
+            write()
+            return
+        self._dirty[write] = False
+        self._wakeup.set()
+
+    def request_snapshot(self, snapshot: Callable[[], Callable[[], None]]):
+        """Планирует запись снимка: snapshot вызывается в потоке событий, копирует данные и возвращает запись"""
+        if not self.running:
+            snapshot()()
+            return
+        self._dirty[snapshot] = True
+        self._wakeup.set()
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Ждем интервал, чтобы собрать в одну запись все изменения за это время
+            await asyncio.sleep(self.interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Немедленно записывает все накопленные изменения"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            writers = list(self._dirty.items())
+            self._dirty.clear()
+            for write, is_snapshot in writers:
+                try:
+                    if is_snapshot:
+                        write = write()
+                    await asyncio.to_thread(write)
+                except Exception:
+                    logger.exception("Ошибка записи хранилища")
+
+    async def stop(self):
+        """Останавливает фоновую задачу и сбрасывает все изменения на диск"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Общий экземпляр для всех JSON-хранилищ бота
+flusher = JsonFlusher(FLUSH_INTERVAL_MS)
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import FSM_STATE_TTL, FSM_STORAGE, SQLITE_PATH
+from database.flusher import flusher
+from database.sqlite_db import get_storage
+
+# Как часто удалять брошенные состояния, сек
+CLEANUP_INTERVAL = 60
+
+
+class SQLiteFSMStorage(BaseStorage):
+    """FSM-хранилище aiogram в SQLite: состояние переживает перезапуск и общее для нескольких процессов.
+
+    Смена состояния записывается сразу, поэтому другой процесс не обработает апдейт в старом
+    состоянии. Данные (set_data) копятся в памяти и записываются одной транзакцией через общий
+    flusher: другой процесс видит их с задержкой до FLUSH_INTERVAL_MS.
+    Состояния, которые не менялись дольше ttl секунд, считаются брошенными и удаляются.
+    """
+
+    def __init__(self, path: str = "data/bot.sqlite3", ttl: int = 7 * 24 * 3600, key_builder: KeyBuilder = None):
+        self.storage = get_storage(path)
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True
+        )
+        # ключ -> (состояние, данные, время изменения) еще не записанных изменений
+        self._pending: Dict[str, Tuple[Optional[str], Dict, float]] = {}
+        self._pending_lock = threading.Lock()
+        # Запись из flusher и немедленная запись смены состояния не должны обгонять друг друга
+        self._write_lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    def _read(self, key: StorageKey) -> Tuple[Optional[str], Dict]:
+        storage_key = self.key_builder.build(key)
+        with self._pending_lock:
+            entry = self._pending.get(storage_key)
+        if entry:
+            return entry[0], entry[1]
+
+        rows = self.storage.query("SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (storage_key,))
+        if not rows or rows[0]["updated_at"] < time.time() - self.ttl:
+            return None, {}
+        return rows[0]["state"], json.loads(rows[0]["data"])
+
+    def _write(self, key: StorageKey, state: Optional[str], data: Dict, immediate: bool = False):
+        with self._pending_lock:
+            self._pending[self.key_builder.build(key)] = (state, data, time.time())
+        if immediate:
+            self._write_pending()
+        else:
+            flusher.request_save(self._write_pending)
+
+    def _write_pending(self):
+        """Записывает накопленные изменения одной транзакцией и удаляет брошенные состояния"""
+        with self._write_lock:
+            self._write_batch()
+
+    def _write_batch(self):
+        with self._pending_lock:
+            batch = dict(self._pending)
+        now = time.time()
+
+        with self.storage.transaction() as conn:
+            for storage_key, (state, data, updated_at) in batch.items():
+                if state is None and not data:
+                    conn.execute("DELETE FROM fsm_states WHERE key = ?", (storage_key,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                        (storage_key, state, json.dumps(data, ensure_ascii=False), updated_at)
+                    )
+            if now - self._last_cleanup >= CLEANUP_INTERVAL:
+                conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (now - self.ttl,))
+                self._last_cleanup = now
+
+        # Убираем только то, что не успело измениться за время записи
+        with self._pending_lock:
+            for storage_key, entry in batch.items():
+                if self._pending.get(storage_key) is entry:
+                    del self._pending[storage_key]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data = self._read(key)
+        self._write(key, state.state if isinstance(state, State) else state, data, immediate=True)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = self._read(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        state, _ = self._read(key)
+        self._write(key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = self._read(key)
+        return data.copy()
+
+    async def close(self) -> None:
+        self._write_pending()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """FSM-хранилище для Dispatcher по настройке FSM_STORAGE"""
+    if FSM_STORAGE == "sqlite":
+        return SQLiteFSMStorage(SQLITE_PATH, FSM_STATE_TTL)
+    return MemoryStorage()
@@ -0,0 +1,83 @@
+import re
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def natural_key(value: str) -> Tuple:
+    """Ключ сортировки, при котором place_2 идет раньше place_10"""
+    return tuple(int(part) if part.isdigit() else part for part in re.split(r'(\d+)', value))
+
+
+def natural_sort_key(value: str) -> str:
+    """natural_key в виде строки для SQLite: строки сравниваются так же, как кортежи natural_key.
+
+    Текст заканчивается символом \x00 (меньше любого другого), число пишется длиной
+    в две цифры и самим числом без ведущих нулей. Сам id в конце делает ключ уникальным.
+    """
+    parts = []
+    for position, part in enumerate(re.split(r'(\d+)', value)):
+        if position % 2:
+            digits = part.lstrip('0') or '0'
+            parts.append(f"{len(digits):02d}{digits}")
+        else:
+            parts.append(part + "\x00")
+    return "".join(parts) + "\x01" + value
+
+
+class SortedIndex:
+    """Инвертированный индекс: значение -> отсортированный список place_id.
+
+    Добавление и удаление - через bisect, выборка страницы после курсора - O(log n + limit).
+    """
+
+    def __init__(self):
+        self._items: Dict[str, List[str]] = {}
+
+    def add(self, key: str, place_id: str):
+        if not self.contains(key, place_id):
+            insort(self._items.setdefault(key, []), place_id, key=natural_key)
+
+    def remove(self, key: str, place_id: str):
+        items = self._items.get(key)
+        if not items:
+            return
+        position = bisect_right(items, natural_key(place_id), key=natural_key)
+        if position and items[position - 1] == place_id:
+            del items[position - 1]
+        if not items:
+            del self._items[key]
+
+    def get(self, key: str) -> List[str]:
+        return self._items.get(key, [])
+
+    def contains(self, key: str, place_id: str) -> bool:
+        items = self._items.get(key, [])
+        position = bisect_right(items, natural_key(place_id), key=natural_key)
+        return bool(position) and items[position - 1] == place_id
+
+    def page(self, key: str, after: Optional[str] = None, limit: int = 10) -> List[str]:
+        """Возвращает до limit значений, следующих за курсором after"""
+        items = self._items.get(key, [])
+        start = bisect_right(items, natural_key(after), key=natural_key) if after else 0
+        return items[start:start + limit]
+
+    def page_before(self, key: str, before: str, limit: int = 10) -> List[str]:
+        """Возвращает до limit значений, предшествующих курсору before (по возрастанию)"""
+        items = self._items.get(key, [])
+        end = bisect_left(items, natural_key(before), key=natural_key)
+        return items[max(0, end - limit):end]
+
+    def rebuild(self, pairs: Iterable[Tuple[str, str]]):
+        self._items = {}
+        for key, place_id in pairs:
+            self.add(key, place_id)
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Приводит номер к виду 7XXXXXXXXXX: Telegram присылает номер то с "+", то без"""
+    if not phone:
+        return None
+    digits = re.sub(r'\D', '', phone)
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    return digits or None
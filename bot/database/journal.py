@@ -0,0 +1,68 @@
+import json
+import os
+from typing import Dict, Iterator
+
+from utils.metrics import metrics
+
+
+class ChecklistJournal:
+    """Append-only журнал изменений чек-листов (одна компактная JSON-запись на строку)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rotated_path = f"{path}.1"
+        self.records_count = 0
+        self._file = None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def append(self, record: Dict):
+        """Дописывает одну запись в конец журнала"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with metrics.timer("storage_save", store="journal"):
+            self._file.write(line)
+            self._file.flush()
+        self.records_count += 1
+        metrics.inc("storage_bytes", len(line.encode('utf-8')), store="journal")
+
+    def rotate(self):
+        """Переносит текущий журнал в .1 и начинает новый.
+
+        Записи из .1 остаются на диске, пока снимок с ними не будет записан (см. drop_rotated).
+        """
+        self.close()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            if os.path.exists(self.rotated_path):
+                # Предыдущая компактация не завершилась - склеиваем журналы
+                with open(self.rotated_path, 'a', encoding='utf-8') as dst, \
+                        open(self.path, 'r', encoding='utf-8') as src:
+                    dst.write(src.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+        self.records_count = 0
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def drop_rotated(self):
+        """Удаляет ротированный журнал после успешной записи снимка"""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    @staticmethod
+    def _read(path: str) -> Iterator[Dict]:
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Оборванная последняя запись (падение во время записи) - пропускаем
+                    continue
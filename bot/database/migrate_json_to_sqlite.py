@@ -0,0 +1,71 @@
+"""Одноразовый перенос данных из JSON-файлов в SQLite.
+
+Запуск из папки bot:
+    python -m database.migrate_json_to_sqlite [путь_к_sqlite]
+
+После переноса установите STORAGE_BACKEND=sqlite в .env.
+"""
+import json
+import os
+import sys
+
+from config import SQLITE_PATH
+from database.checklists_db import ChecklistsDB
+from database.indexes import natural_sort_key
+from database.sqlite_db import SQLiteChecklistsDB, SQLitePlacesDB, SQLiteSimpleDB, get_storage
+
+
+def _load_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def migrate(sqlite_path: str = SQLITE_PATH, users_file: str = "users.json", places_file: str = "places.json",
+            search_file: str = "search.json", checklists_dir: str = "data/checklists") -> dict:
+    """Переносит пользователей, места, проверки и чек-листы; повторный запуск перезаписывает записи"""
+    storage = get_storage(sqlite_path)
+    users = _load_json(users_file)
+    places = _load_json(places_file)
+    search = _load_json(search_file)
+
+    # Чек-листы читаем через ChecklistsDB, чтобы учесть файлы мест вместе с журналом
+    json_checklists = ChecklistsDB(checklists_dir)
+    json_checklists.compact()
+    json_checklists.close()
+    checklists = dict(json_checklists.iter_checklists())
+
+    with storage.transaction() as conn:
+        for key, value in users.items():
+            if key == 'inspections':
+                for inspection_id, inspection_data in value.items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO user_inspections (inspection_id, data) VALUES (?, ?)",
+                        (inspection_id, json.dumps(inspection_data, ensure_ascii=False))
+                    )
+            elif key.isdigit():
+                SQLiteSimpleDB._write_user(conn, value)
+
+        for place_id, supervisor_id in places.items():
+            conn.execute("INSERT OR REPLACE INTO places (place_id, supervisor_id, sort_key) VALUES (?, ?, ?)",
+                         (place_id, supervisor_id, natural_sort_key(place_id)))
+
+        for place_id, inspection_data in search.items():
+            SQLitePlacesDB._write_inspection(conn, place_id, inspection_data)
+
+        for place_id, checklist in checklists.items():
+            SQLiteChecklistsDB._write(conn, place_id, checklist)
+
+    return {
+        "users": sum(1 for key in users if key.isdigit()),
+        "places": len(places),
+        "inspections": len(search),
+        "checklists": len(checklists)
+    }
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else SQLITE_PATH
+    counts = migrate(target)
+    print(f"✅ Данные перенесены в {target}: " + ", ".join(f"{k}: {v}" for k, v in counts.items()))
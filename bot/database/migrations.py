@@ -0,0 +1,48 @@
+"""Версии схемы хранилища чек-листов и разовые миграции между ними.
+
+Файл места хранится как {"schema_version": N, "checklist": {...}}. Общий снимок прежнего
+формата - {"schema_version": N, "checklists": {...}} или просто словарь чек-листов (версия 0).
+"""
+from typing import Callable, Dict, List, Tuple
+
+from database.checklist_data import count_completed_criteria, count_total_criteria
+
+
+def _add_criteria_counters(checklists: Dict):
+    """0 -> 1: счетчики заполненных и всех критериев (с учетом подразделов)"""
+    for checklist in checklists.values():
+        checklist["completed_criteria"] = count_completed_criteria(checklist)
+        checklist["total_criteria"] = count_total_criteria(checklist["checklist_data"])
+
+
+# MIGRATIONS[i] переводит данные из версии i в версию i + 1
+MIGRATIONS: List[Callable[[Dict], None]] = [
+    _add_criteria_counters,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def unpack_snapshot(data: Dict) -> Tuple[int, Dict]:
+    """Возвращает версию схемы и словарь чек-листов из общего снимка"""
+    if "schema_version" in data and "checklists" in data:
+        return data["schema_version"], data["checklists"]
+    return 0, data
+
+
+def unpack_shard(data: Dict) -> Tuple[int, Dict]:
+    """Возвращает версию схемы и чек-лист из файла места"""
+    return data["schema_version"], data["checklist"]
+
+
+def pack_shard(place_id: str, checklist: Dict) -> Dict:
+    """Файл места; id хранится рядом с чек-листом, потому что имя файла может быть хэшем id"""
+    return {"schema_version": SCHEMA_VERSION, "place_id": place_id, "checklist": checklist}
+
+
+def migrate_checklists(checklists: Dict, version: int) -> bool:
+    """Доводит данные до текущей версии; возвращает True, если что-то менялось"""
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Версия схемы чек-листов {version} новее поддерживаемой {SCHEMA_VERSION}")
+    for migration in MIGRATIONS[version:]:
+        migration(checklists)
+    return version < SCHEMA_VERSION
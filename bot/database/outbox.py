@@ -0,0 +1,90 @@
+import sqlite3
+import time
+from typing import List, Optional
+
+from config import SQLITE_PATH
+from database.sqlite_db import get_storage
+
+# Отправленные сообщения хранятся сутки, чтобы повтор с тем же ключом не ушел второй раз
+SENT_RETENTION = 24 * 3600
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+class Outbox:
+    """Очередь исходящих уведомлений в SQLite.
+
+    Уведомление сначала записывается на диск, а отправляет его фоновый OutboxSender,
+    поэтому перезапуск бота или недоступность Telegram его не теряют.
+    Ключ идемпотентности уникален: повторная постановка того же уведомления игнорируется.
+    """
+
+    def __init__(self, path: str = "data/bot.sqlite3"):
+        self.storage = get_storage(path)
+
+    def add(self, key: str, chat_id: int, text: str, reply_markup: str = None) -> bool:
+        """Ставит уведомление в очередь; False, если уведомление с таким ключом уже есть"""
+        now = time.time()
+        with self.storage.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, chat_id, text, reply_markup, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, int(chat_id), text, reply_markup, now, now)
+            )
+        return cursor.rowcount > 0
+
+    def due(self, limit: int = 50) -> List[sqlite3.Row]:
+        """Уведомления, которые пора отправить, в порядке постановки"""
+        return self.storage.query(
+            "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (OutboxStatus.PENDING, time.time(), limit)
+        )
+
+    def next_attempt_at(self) -> Optional[float]:
+        """Время ближайшей запланированной попытки"""
+        rows = self.storage.query(
+            "SELECT MIN(next_attempt_at) AS next_at FROM outbox WHERE status = ?", (OutboxStatus.PENDING,)
+        )
+        return rows[0]["next_at"] if rows else None
+
+    def mark_sent(self, ids: List[int]):
+        with self.storage.transaction() as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+                [(OutboxStatus.SENT, item_id) for item_id in ids]
+            )
+
+    def mark_failed(self, item_id: int, retry_at: Optional[float], error: str):
+        """Откладывает уведомление до retry_at; без retry_at попытки исчерпаны"""
+        status = OutboxStatus.PENDING if retry_at is not None else OutboxStatus.DEAD
+        with self.storage.transaction() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                "WHERE id = ?",
+                (status, retry_at or time.time(), error, item_id)
+            )
+
+    def purge_sent(self):
+        with self.storage.transaction() as conn:
+            conn.execute(
+                "DELETE FROM outbox WHERE status = ? AND created_at < ?",
+                (OutboxStatus.SENT, time.time() - SENT_RETENTION)
+            )
+
+    def count(self, status: str) -> int:
+        return self.storage.query("SELECT COUNT(*) AS n FROM outbox WHERE status = ?", (status,))[0]["n"]
+
+
+_outbox = None
+
+
+def get_outbox() -> Outbox:
+    """Очередь уведомлений создается при первом обращении"""
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox(SQLITE_PATH)
+    return _outbox
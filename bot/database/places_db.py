@@ -1,7 +1,14 @@
 import json
 import os
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set
+
+from config import STORAGE_BACKEND, SQLITE_PATH
+from database.flusher import dump_json, flusher, snapshot_records
+from database.indexes import SortedIndex
+
+# Значения даты, при которых проверка считается несогласованной
+UNSCHEDULED_DATES = (None, 'Не назначена', 'date')
 
 
 class PlacesDB:
@@ -11,6 +18,16 @@ class PlacesDB:
         self.places = self._load_places()
         self.search = self._load_search()
 
+        # Вторичные индексы: проверяющий, бригадир и статус -> place_id
+        self.by_inspector = SortedIndex()
+        self.by_supervisor = SortedIndex()
+        self.by_status = SortedIndex()
+        # Согласованные проверки проверяющего - отдельно, чтобы листать их без фильтрации
+        self.approved_by_inspector = SortedIndex()
+        self.by_supervisor.rebuild((str(supervisor_id), place_id) for place_id, supervisor_id in self.places.items())
+        for place_id in self.search:
+            self._index_inspection(place_id)
+
     def _load_places(self) -> Dict:
         """Загружает данные о местах и бригадирах"""
         if os.path.exists(self.places_file):
@@ -32,54 +49,79 @@ class PlacesDB:
         return {}
 
     def _save_search(self):
-        """Сохраняет данные о проверках"""
-        with open(self.search_file, 'w', encoding='utf-8') as f:
-            json.dump(self.search, f, ensure_ascii=False, indent=2)
+        """Сохраняет данные о проверках (отложенно, через flusher)"""
+        flusher.request_snapshot(self._snapshot_search)
+
+    def _snapshot_search(self):
+        search = snapshot_records(self.search)
+        return lambda: dump_json(self.search_file, search)
+
+    @staticmethod
+    def _status_buckets(inspection_data: Dict) -> Set[str]:
+        """Статусы, в которые попадает проверка: pending/approved и available"""
+        buckets = {'pending' if inspection_data.get('date', 'Не назначена') in UNSCHEDULED_DATES else 'approved'}
+        if not inspection_data.get('inspector') or inspection_data.get('inspector') == 'date':
+            buckets.add('available')
+        return buckets
+
+    def _index_inspection(self, place_id: str):
+        inspection_data = self.search[place_id]
+        buckets = self._status_buckets(inspection_data)
+        if inspection_data.get('inspector'):
+            self.by_inspector.add(str(inspection_data['inspector']), place_id)
+            if 'approved' in buckets:
+                self.approved_by_inspector.add(str(inspection_data['inspector']), place_id)
+        for bucket in buckets:
+            self.by_status.add(bucket, place_id)
+
+    def _unindex_inspection(self, place_id: str):
+        inspection_data = self.search.get(place_id)
+        if not inspection_data:
+            return
+        if inspection_data.get('inspector'):
+            self.by_inspector.remove(str(inspection_data['inspector']), place_id)
+            self.approved_by_inspector.remove(str(inspection_data['inspector']), place_id)
+        for bucket in self._status_buckets(inspection_data):
+            self.by_status.remove(bucket, place_id)
+
+    def _update_inspection(self, place_id: str, **changes) -> bool:
+        if place_id not in self.search:
+            return False
+
+        self._unindex_inspection(place_id)
+        self.search[place_id].update(changes)
+        self._index_inspection(place_id)
+        self._save_search()
+        return True
+
+    def get_inspection(self, place_id: str) -> Optional[Dict]:
+        """Возвращает данные проверки места"""
+        return self.search.get(place_id)
 
     def get_inspections_by_inspector(self, inspector_id: str) -> Dict:
         """Возвращает проверки для конкретного проверяющего"""
-        inspector_id_str = str(inspector_id)
-        inspections = {}
-
-        for place_id, inspection_data in self.search.items():
-            if inspection_data.get('inspector') == inspector_id_str:
-                inspections[place_id] = inspection_data
-            print(place_id)
-            print(inspection_data)
-        return inspections
+        return {place_id: self.search[place_id] for place_id in self.by_inspector.get(str(inspector_id))}
 
     def get_available_inspections(self) -> Dict:
         """Возвращает свободные проверки (без назначенного проверяющего)"""
-        available = {}
-
-        for place_id, inspection_data in self.search.items():
-            if not inspection_data.get('inspector') or inspection_data.get('inspector') == 'date':
-                available[place_id] = inspection_data
-
-        return available
+        return {place_id: self.search[place_id] for place_id in self.by_status.get('available')}
 
     def assign_inspector_to_inspection(self, place_id: str, inspector_id: str) -> bool:
         """Назначает проверяющего на проверку"""
-        if place_id not in self.search:
-            return False
-
-        self.search[place_id]['inspector'] = str(inspector_id)
-        self._save_search()
-        return True
+        return self._update_inspection(place_id, inspector=str(inspector_id))
 
     def update_inspection_date(self, place_id: str, date: str) -> bool:
         """Обновляет дату проверки"""
-        if place_id not in self.search:
-            return False
-
-        self.search[place_id]['date'] = date
-        self._save_search()
-        return True
+        return self._update_inspection(place_id, date=date)
 
     def get_supervisor_by_place(self, place_id: str) -> Optional[str]:
         """Возвращает логин бригадира для места"""
         return self.places.get(place_id)
 
+    def get_places_by_supervisor(self, supervisor_id: str) -> List[str]:
+        """Возвращает места, закрепленные за бригадиром"""
+        return list(self.by_supervisor.get(str(supervisor_id)))
+
     def get_all_places(self) -> Dict:
         """Возвращает все места"""
         return self.places
@@ -93,36 +135,58 @@ class PlacesDB:
         if place_id not in self.places:
             return False
 
+        self._unindex_inspection(place_id)
         self.search[place_id] = {
             'date': date or 'Не назначена',
             'inspector': inspector_id or 'Не назначен'
         }
+        self._index_inspection(place_id)
         self._save_search()
         return True
 
     def get_approved_inspections_by_inspector(self, inspector_id: str) -> Dict:
         """Возвращает согласованные проверки для проверяющего (с назначенным временем)"""
-        inspector_id_str = str(inspector_id)
-        approved_inspections = {}
+        return {place_id: self.search[place_id] for place_id in self.approved_by_inspector.get(str(inspector_id))}
 
-        for place_id, inspection_data in self.search.items():
-            if (inspection_data.get('inspector') == inspector_id_str and
-                    inspection_data.get('date') not in [None, 'Не назначена', 'date'] and
-                    inspection_data.get('date') != 'Не назначена'):
-                approved_inspections[place_id] = inspection_data
+    @staticmethod
+    def _page(index: SortedIndex, key: str, after: Optional[str], before: Optional[str], limit: int) -> List[str]:
+        if before:
+            return index.page_before(key, before, limit)
+        return index.page(key, after, limit)
 
-        return approved_inspections
+    def page_inspections_by_inspector(self, inspector_id: str, after: str = None, before: str = None,
+                                      limit: int = 10) -> List[str]:
+        """Страница проверок проверяющего: до limit place_id после курсора after или перед before"""
+        return self._page(self.by_inspector, str(inspector_id), after, before, limit)
+
+    def page_approved_inspections_by_inspector(self, inspector_id: str, after: str = None, before: str = None,
+                                               limit: int = 10) -> List[str]:
+        """Страница согласованных проверок проверяющего"""
+        return self._page(self.approved_by_inspector, str(inspector_id), after, before, limit)
+
+    def page_places_by_supervisor(self, supervisor_id: str, after: str = None, before: str = None,
+                                  limit: int = 10) -> List[str]:
+        """Страница мест бригадира"""
+        return self._page(self.by_supervisor, str(supervisor_id), after, before, limit)
 
     def get_inspection_status(self, place_id: str) -> str:
         """Возвращает статус проверки"""
-        inspection_data = self.search.get(place_id, {})
-        date = inspection_data.get('date', 'Не назначена')
-
-        if date in [None, 'Не назначена', 'date']:
-            return 'pending'
-        else:
+        if self.by_status.contains('approved', place_id):
             return 'approved'
+        return 'pending'
 
 
-# Глобальный экземпляр БД
-places_db = PlacesDB()
\ No newline at end of file
+# Глобальный экземпляр БД создается при первом обращении, а не при импорте
+_places_db = None
+
+
+def get_places_db():
+    """Возвращает общее хранилище мест и проверок"""
+    global _places_db
+    if _places_db is None:
+        if STORAGE_BACKEND == "sqlite":
+            from database.sqlite_db import SQLitePlacesDB
+            _places_db = SQLitePlacesDB(SQLITE_PATH)
+        else:
+            _places_db = PlacesDB()
+    return _places_db
\ No newline at end of file
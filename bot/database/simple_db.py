@@ -2,6 +2,12 @@ import json
 import os
 from datetime import datetime
 from enum import Enum
+from typing import Dict, Tuple
+
+from config import STORAGE_BACKEND, SQLITE_PATH
+from database.flusher import dump_json, flusher, snapshot_records
+from database.indexes import SortedIndex, normalize_phone
+from database.user_cache import user_cache
 
 
 class UserRole(Enum):
@@ -18,136 +24,183 @@ class InspectionStatus(Enum):
     COMPLETED = "completed"  # Завершена
 
 
+def default_users() -> dict:
+    """Предзаполненные пользователи"""
+    return {
+        "123456789": {
+            'telegram_id': 123456789,
+            'username': 'admin_user',
+            'first_name': 'Иван',
+            'last_name': 'Петров',
+            'phone': '+79991234567',
+            'role': UserRole.ADMIN.value,
+            'registered_at': datetime.now().isoformat(),
+            'is_active': True
+        },
+        "987654321": {
+            'telegram_id': 987654321,
+            'username': 'manager_user',
+            'first_name': 'Мария',
+            'last_name': 'Сидорова',
+            'phone': '+79997654321',
+            'role': UserRole.MANAGER.value,
+            'registered_at': datetime.now().isoformat(),
+            'is_active': True
+        },
+        "555555555": {
+            'telegram_id': 555555555,
+            'username': 'inspector_user',
+            'first_name': 'Алексей',
+            'last_name': 'Козлов',
+            'phone': '+79995555555',
+            'role': UserRole.INSPECTOR.value,
+            'registered_at': datetime.now().isoformat(),
+            'is_active': True
+        },
+        "111111111": {
+            'telegram_id': 111111111,
+            'username': 'worker1',
+            'first_name': 'Сергей',
+            'last_name': 'Иванов',
+            'phone': '+79991111111',
+            'role': UserRole.WORKER.value,
+            'registered_at': datetime.now().isoformat(),
+            'is_active': True
+        },
+        "222222222": {
+            'telegram_id': 222222222,
+            'username': 'worker2',
+            'first_name': 'Ольга',
+            'last_name': 'Смирнова',
+            'phone': '+79992222222',
+            'role': UserRole.WORKER.value,
+            'registered_at': datetime.now().isoformat(),
+            'is_active': True
+        }
+    }
+
+
+def default_inspections() -> dict:
+    """Тестовые проверки"""
+    return {
+        "1": {
+            'id': 1,
+            'location': 'Строительная площадка №1',
+            'manager_id': 987654321,  # ID бригадира
+            'inspector_id': 555555555,  # ID проверяющего
+            'scheduled_time': None,
+            'status': InspectionStatus.PENDING.value,
+            'created_at': datetime.now().isoformat(),
+            'proposed_time': None,
+            'rejection_reason': None,
+            'alternative_time': None
+        },
+        "2": {
+            'id': 2,
+            'location': 'Офисное здание №2',
+            'manager_id': 987654321,
+            'inspector_id': None,  # Свободная проверка
+            'scheduled_time': None,
+            'status': InspectionStatus.PENDING.value,
+            'created_at': datetime.now().isoformat(),
+            'proposed_time': None,
+            'rejection_reason': None,
+            'alternative_time': None
+        }
+    }
+
+
 class SimpleDB:
     def __init__(self, db_file: str = "users.json"):
         self.db_file = db_file
-        self.users = self._load_data()
+        # Пользователи и тестовые проверки хранятся в одном файле, но в памяти разделены
+        self.users, self.inspections = self._load_data()
+
+        # Индексы: роль -> telegram_id, телефон -> telegram_id
+        self.by_role = SortedIndex()
+        self.by_phone: Dict[str, str] = {}
+        for user_id, user_data in self.users.items():
+            self._index_user(user_id, user_data)
+
         self._create_default_users()
         self._create_default_inspections()
 
-    def _load_data(self):
+    def _load_data(self) -> Tuple[Dict, Dict]:
+        data = {}
         if os.path.exists(self.db_file):
             try:
                 with open(self.db_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    data = json.load(f)
             except:
-                return {}
-        return {}
+                data = {}
+        inspections = data.pop('inspections', {})
+        users = {k: v for k, v in data.items() if k.isdigit()}
+        return users, inspections
 
     def _save_data(self):
-        with open(self.db_file, 'w', encoding='utf-8') as f:
-            json.dump(self.users, f, ensure_ascii=False, indent=2)
+        flusher.request_snapshot(self._snapshot_data)
+
+    def _snapshot_data(self):
+        data = {**snapshot_records(self.users), 'inspections': snapshot_records(self.inspections)}
+        return lambda: dump_json(self.db_file, data)
+
+    def _index_user(self, user_id: str, user_data: Dict):
+        self.by_role.add(user_data.get('role'), user_id)
+        phone = normalize_phone(user_data.get('phone'))
+        if phone:
+            self.by_phone[phone] = user_id
+
+    def _unindex_user(self, user_id: str):
+        user_data = self.users.get(user_id)
+        if not user_data:
+            return
+        self.by_role.remove(user_data.get('role'), user_id)
+        phone = normalize_phone(user_data.get('phone'))
+        if phone and self.by_phone.get(phone) == user_id:
+            del self.by_phone[phone]
 
     def _create_default_users(self):
-        # Предзаполненные пользователи
-        default_users = {
-            "123456789": {
-                'telegram_id': 123456789,
-                'username': 'admin_user',
-                'first_name': 'Иван',
-                'last_name': 'Петров',
-                'phone': '+79991234567',
-                'role': UserRole.ADMIN.value,
-                'registered_at': datetime.now().isoformat(),
-                'is_active': True
-            },
-            "987654321": {
-                'telegram_id': 987654321,
-                'username': 'manager_user',
-                'first_name': 'Мария',
-                'last_name': 'Сидорова',
-                'phone': '+79997654321',
-                'role': UserRole.MANAGER.value,
-                'registered_at': datetime.now().isoformat(),
-                'is_active': True
-            },
-            "555555555": {
-                'telegram_id': 555555555,
-                'username': 'inspector_user',
-                'first_name': 'Алексей',
-                'last_name': 'Козлов',
-                'phone': '+79995555555',
-                'role': UserRole.INSPECTOR.value,
-                'registered_at': datetime.now().isoformat(),
-                'is_active': True
-            },
-            "111111111": {
-                'telegram_id': 111111111,
-                'username': 'worker1',
-                'first_name': 'Сергей',
-                'last_name': 'Иванов',
-                'phone': '+79991111111',
-                'role': UserRole.WORKER.value,
-                'registered_at': datetime.now().isoformat(),
-                'is_active': True
-            },
-            "222222222": {
-                'telegram_id': 222222222,
-                'username': 'worker2',
-                'first_name': 'Ольга',
-                'last_name': 'Смирнова',
-                'phone': '+79992222222',
-                'role': UserRole.WORKER.value,
-                'registered_at': datetime.now().isoformat(),
-                'is_active': True
-            }
-        }
-
-        # Добавляем только тех пользователей, которых еще нет в базе
-        for user_id, user_data in default_users.items():
+        # Добавляем только тех пользователей, которых еще нет в базе; файл пишется, только если они были
+        added = False
+        for user_id, user_data in default_users().items():
             if user_id not in self.users:
                 self.users[user_id] = user_data
+                self._index_user(user_id, user_data)
+                added = True
 
-        self._save_data()
+        if added:
+            self._save_data()
 
     def _create_default_inspections(self):
         """Создает тестовые проверки"""
-        if 'inspections' not in self.users:
-            self.users['inspections'] = {}
-
-        default_inspections = {
-            "1": {
-                'id': 1,
-                'location': 'Строительная площадка №1',
-                'manager_id': 987654321,  # ID бригадира
-                'inspector_id': 555555555,  # ID проверяющего
-                'scheduled_time': None,
-                'status': InspectionStatus.PENDING.value,
-                'created_at': datetime.now().isoformat(),
-                'proposed_time': None,
-                'rejection_reason': None,
-                'alternative_time': None
-            },
-            "2": {
-                'id': 2,
-                'location': 'Офисное здание №2',
-                'manager_id': 987654321,
-                'inspector_id': None,  # Свободная проверка
-                'scheduled_time': None,
-                'status': InspectionStatus.PENDING.value,
-                'created_at': datetime.now().isoformat(),
-                'proposed_time': None,
-                'rejection_reason': None,
-                'alternative_time': None
-            }
-        }
+        added = False
+        for inspection_id, inspection_data in default_inspections().items():
+            if inspection_id not in self.inspections:
+                self.inspections[inspection_id] = inspection_data
+                added = True
 
-        for inspection_id, inspection_data in default_inspections.items():
-            if inspection_id not in self.users['inspections']:
-                self.users['inspections'][inspection_id] = inspection_data
-
-        self._save_data()
+        if added:
+            self._save_data()
 
     def get_user(self, telegram_id: int):
         return self.users.get(str(telegram_id))
 
+    def get_user_by_phone(self, phone: str):
+        """Возвращает пользователя по номеру телефона"""
+        user_id = self.by_phone.get(normalize_phone(phone))
+        return self.users.get(user_id) if user_id else None
+
     def get_all_users(self):
-        """Возвращает всех пользователей"""
-        return {k: v for k, v in self.users.items() if k.isdigit()}
+        """Возвращает всех пользователей (копию словаря, чтобы вызывающий не обошел индексы)"""
+        return dict(self.users)
+
+    def get_users_by_role(self, role: UserRole):
+        """Возвращает пользователей с указанной ролью"""
+        return {user_id: self.users[user_id] for user_id in self.by_role.get(role.value)}
 
     def get_managers(self):
         """Возвращает всех руководителей"""
-        return {k: v for k, v in self.users.items() if k.isdigit() and v.get('role') == UserRole.MANAGER.value}
+        return self.get_users_by_role(UserRole.MANAGER)
 
 
     def create_user(self, telegram_id: int, username: str, first_name: str,
@@ -162,18 +215,38 @@ class SimpleDB:
             'registered_at': datetime.now().isoformat(),
             'is_active': True
         }
-        self.users[str(telegram_id)] = user_data
+        user_id = str(telegram_id)
+        self._unindex_user(user_id)
+        self.users[user_id] = user_data
+        self._index_user(user_id, user_data)
         self._save_data()
+        user_cache.invalidate(telegram_id)
         return user_data
 
     def update_user_role(self, telegram_id: int, new_role: UserRole):
-        user = self.get_user(telegram_id)
+        user_id = str(telegram_id)
+        user = self.users.get(user_id)
         if user:
+            self.by_role.remove(user['role'], user_id)
             user['role'] = new_role.value
+            self.by_role.add(user['role'], user_id)
             self._save_data()
+            user_cache.invalidate(telegram_id)
             return True
         return False
 
 
-# Глобальный экземпляр БД
-db = SimpleDB()
\ No newline at end of file
+# Глобальный экземпляр БД создается при первом обращении, а не при импорте
+_db = None
+
+
+def get_db():
+    """Возвращает общее хранилище пользователей"""
+    global _db
+    if _db is None:
+        if STORAGE_BACKEND == "sqlite":
+            from database.sqlite_db import SQLiteSimpleDB
+            _db = SQLiteSimpleDB(SQLITE_PATH)
+        else:
+            _db = SimpleDB()
+    return _db
\ No newline at end of file
@@ -0,0 +1,484 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from database.checklist_data import (
+    ChecklistIndex,
+    CriterionKey,
+    apply_criterion,
+    checklist_progress,
+    count_completed_criteria,
+    count_total_criteria
+)
+from database.indexes import natural_sort_key, normalize_phone
+from database.user_cache import user_cache
+from utils.metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checklists (
+    place_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    inspector_name TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    completed_at TEXT,
+    completed_criteria INTEGER NOT NULL DEFAULT 0,
+    total_criteria INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    checklist_data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checklists_status ON checklists(status);
+
+CREATE TABLE IF NOT EXISTS places (
+    place_id TEXT PRIMARY KEY,
+    supervisor_id TEXT,
+    sort_key TEXT
+);
+
+CREATE TABLE IF NOT EXISTS inspections (
+    place_id TEXT PRIMARY KEY,
+    inspector TEXT,
+    date TEXT,
+    data TEXT NOT NULL,
+    sort_key TEXT
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    role TEXT NOT NULL,
+    phone TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
+
+CREATE TABLE IF NOT EXISTS user_inspections (
+    inspection_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states(updated_at);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    chat_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    reply_markup TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+"""
+
+# Индексы по ключу естественного порядка создаются после того, как старые базы получили колонку sort_key
+SORT_KEY_SCHEMA = """
+DROP INDEX IF EXISTS idx_places_supervisor;
+DROP INDEX IF EXISTS idx_places_supervisor_place;
+DROP INDEX IF EXISTS idx_inspections_inspector;
+DROP INDEX IF EXISTS idx_inspections_inspector_place;
+CREATE INDEX IF NOT EXISTS idx_places_supervisor_sort ON places(supervisor_id, sort_key);
+CREATE INDEX IF NOT EXISTS idx_inspections_inspector_sort ON inspections(inspector, sort_key);
+"""
+
+# Значения даты, при которых проверка считается несогласованной (как в PlacesDB)
+UNSCHEDULED_DATES = (None, 'Не назначена', 'date')
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class SQLiteStorage:
+    """Общее подключение к SQLite (WAL) для всех хранилищ бота"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Базы, созданные до появления версии чек-листа
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(checklists)")}
+        if "version" not in columns:
+            self.conn.execute("ALTER TABLE checklists ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._add_sort_keys()
+        self.conn.executescript(SORT_KEY_SCHEMA)
+        self.lock = threading.RLock()
+
+    def _add_sort_keys(self):
+        """Базы, созданные до появления sort_key: заполняет ключи естественного порядка"""
+        with self.conn:
+            for table in ("places", "inspections"):
+                columns = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                if "sort_key" in columns:
+                    continue
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN sort_key TEXT")
+                place_ids = [row["place_id"] for row in self.conn.execute(f"SELECT place_id FROM {table}")]
+                self.conn.executemany(
+                    f"UPDATE {table} SET sort_key = ? WHERE place_id = ?",
+                    [(natural_sort_key(place_id), place_id) for place_id in place_ids]
+                )
+
+    @contextmanager
+    def transaction(self):
+        with self.lock, metrics.timer("storage_save", store="sqlite"), self.conn:
+            yield self.conn
+
+    def query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_storages: Dict[str, SQLiteStorage] = {}
+
+
+def get_storage(path: str) -> SQLiteStorage:
+    """Возвращает общее подключение для файла БД"""
+    if path not in _storages:
+        _storages[path] = SQLiteStorage(path)
+    return _storages[path]
+
+
+class SQLiteChecklistsDB:
+    """Хранилище чек-листов в SQLite с тем же API, что и ChecklistsDB"""
+
+    def __init__(self, db_path: str = "data/bot.sqlite3"):
+        self.storage = get_storage(db_path)
+        # place_id -> (updated_at, чек-лист, индекс); запись сверяется по updated_at,
+        # поэтому изменения из другого процесса не теряются
+        self._cache: Dict[str, Tuple[str, Dict, ChecklistIndex]] = {}
+
+    def _load(self, place_id: str, conn: sqlite3.Connection = None) -> Optional[Tuple[Dict, ChecklistIndex]]:
+        """Возвращает чек-лист с индексом, перечитывая строку только если она изменилась"""
+        execute = conn.execute if conn else self.storage.conn.execute
+        with self.storage.lock:
+            row = execute("SELECT updated_at FROM checklists WHERE place_id = ?", (place_id,)).fetchone()
+            if not row:
+                self._cache.pop(place_id, None)
+                return None
+
+            cached = self._cache.get(place_id)
+            if cached and cached[0] == row["updated_at"]:
+                return cached[1], cached[2]
+
+            row = execute("SELECT * FROM checklists WHERE place_id = ?", (place_id,)).fetchone()
+        checklist = self._row_to_checklist(row)
+        index = ChecklistIndex(checklist["checklist_data"])
+        self._cache[place_id] = (checklist["updated_at"], checklist, index)
+        return checklist, index
+
+    @staticmethod
+    def _row_to_checklist(row: sqlite3.Row) -> Dict:
+        checklist = {
+            "checklist_data": json.loads(row["checklist_data"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "status": row["status"],
+            "inspector_name": row["inspector_name"],
+            "completed_criteria": row["completed_criteria"],
+            "total_criteria": row["total_criteria"],
+            "version": row["version"]
+        }
+        if row["completed_at"]:
+            checklist["completed_at"] = row["completed_at"]
+        return checklist
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, place_id: str, checklist: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO checklists (place_id, status, inspector_name, created_at, updated_at,"
+            " completed_at, completed_criteria, total_criteria, version, checklist_data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (place_id, checklist["status"], checklist.get("inspector_name"), checklist.get("created_at"),
+             checklist.get("updated_at"), checklist.get("completed_at"), checklist["completed_criteria"],
+             checklist["total_criteria"], checklist.get("version", 0), _dumps(checklist["checklist_data"]))
+        )
+
+    def create_checklist(self, place_id: str, inspector_name: str, checklist_data: Dict) -> bool:
+        checklist = {
+            "checklist_data": checklist_data,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+            "status": "draft",
+            "inspector_name": inspector_name,
+            "completed_criteria": count_completed_criteria({"checklist_data": checklist_data}),
+            "total_criteria": count_total_criteria(checklist_data),
+            "version": 0
+        }
+        with self.storage.transaction() as conn:
+            self._write(conn, place_id, checklist)
+        return True
+
+    def get_checklist(self, place_id: str) -> Optional[Dict]:
+        loaded = self._load(place_id)
+        return loaded[0] if loaded else None
+
+    def get_criterion(self, place_id: str, section: str, criterion_number: int,
+                      subdivision: str = None) -> Optional[Dict]:
+        loaded = self._load(place_id)
+        return loaded[1].get(section, criterion_number, subdivision) if loaded else None
+
+    def get_section_keys(self, place_id: str, section: str) -> List[CriterionKey]:
+        loaded = self._load(place_id)
+        return loaded[1].section_keys.get(section, []) if loaded else []
+
+    def get_section_progress(self, place_id: str) -> Dict[str, Dict[str, int]]:
+        loaded = self._load(place_id)
+        return loaded[1].section_progress() if loaded else {}
+
+    def get_checklists_by_status(self, status: str) -> Dict:
+        rows = self.storage.query("SELECT * FROM checklists WHERE status = ?", (status,))
+        return {row["place_id"]: self._row_to_checklist(row) for row in rows}
+
+    def update_criterion(self, place_id: str, section: str, criterion_number: int,
+                         complies: bool, comment: str = "", photo_path: str = None,
+                         subdivision: str = None) -> bool:
+        with self.storage.transaction() as conn:
+            loaded = self._load(place_id, conn)
+            if not loaded:
+                return False
+
+            checklist, index = loaded
+            try:
+                if not apply_criterion({place_id: checklist}, place_id, section, criterion_number,
+                                       complies, comment, photo_path, datetime.now().isoformat(),
+                                       subdivision, index):
+                    return False
+                self._write(conn, place_id, checklist)
+            except Exception:
+                self._cache.pop(place_id, None)
+                raise
+            self._cache[place_id] = (checklist["updated_at"], checklist, index)
+        return True
+
+    def get_checklist_progress(self, place_id: str) -> Dict:
+        """Возвращает прогресс заполнения чек-листа"""
+        return checklist_progress(self.get_checklist(place_id))
+
+    def compact(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLitePlacesDB:
+    """Хранилище мест и проверок в SQLite с тем же API, что и PlacesDB"""
+
+    def __init__(self, db_path: str = "data/bot.sqlite3"):
+        self.storage = get_storage(db_path)
+
+    def _inspections(self, where: str = "", params=()) -> Dict:
+        rows = self.storage.query(f"SELECT place_id, data FROM inspections {where} ORDER BY place_id", params)
+        return {row["place_id"]: json.loads(row["data"]) for row in rows}
+
+    @staticmethod
+    def _write_inspection(conn: sqlite3.Connection, place_id: str, inspection_data: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO inspections (place_id, inspector, date, data, sort_key) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (place_id, inspection_data.get('inspector'), inspection_data.get('date'), _dumps(inspection_data),
+             natural_sort_key(place_id))
+        )
+
+    def _update_inspection(self, place_id: str, **changes) -> bool:
+        with self.storage.transaction() as conn:
+            row = conn.execute("SELECT data FROM inspections WHERE place_id = ?", (place_id,)).fetchone()
+            if not row:
+                return False
+            inspection_data = json.loads(row["data"])
+            inspection_data.update(changes)
+            self._write_inspection(conn, place_id, inspection_data)
+        return True
+
+    def get_inspection(self, place_id: str) -> Optional[Dict]:
+        rows = self.storage.query("SELECT data FROM inspections WHERE place_id = ?", (place_id,))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def get_inspections_by_inspector(self, inspector_id: str) -> Dict:
+        return self._inspections("WHERE inspector = ?", (str(inspector_id),))
+
+    def get_available_inspections(self) -> Dict:
+        return self._inspections("WHERE inspector IS NULL OR inspector = '' OR inspector = 'date'")
+
+    def assign_inspector_to_inspection(self, place_id: str, inspector_id: str) -> bool:
+        return self._update_inspection(place_id, inspector=str(inspector_id))
+
+    def update_inspection_date(self, place_id: str, date: str) -> bool:
+        return self._update_inspection(place_id, date=date)
+
+    def get_supervisor_by_place(self, place_id: str) -> Optional[str]:
+        rows = self.storage.query("SELECT supervisor_id FROM places WHERE place_id = ?", (place_id,))
+        return rows[0]["supervisor_id"] if rows else None
+
+    def get_places_by_supervisor(self, supervisor_id: str) -> List[str]:
+        rows = self.storage.query(
+            "SELECT place_id FROM places WHERE supervisor_id = ? ORDER BY place_id", (str(supervisor_id),)
+        )
+        return [row["place_id"] for row in rows]
+
+    def get_all_places(self) -> Dict:
+        rows = self.storage.query("SELECT place_id, supervisor_id FROM places ORDER BY place_id")
+        return {row["place_id"]: row["supervisor_id"] for row in rows}
+
+    def get_all_inspections(self) -> Dict:
+        return self._inspections()
+
+    def create_inspection(self, place_id: str, inspector_id: str = None, date: str = None) -> bool:
+        if self.get_supervisor_by_place(place_id) is None:
+            return False
+
+        with self.storage.transaction() as conn:
+            self._write_inspection(conn, place_id, {
+                'date': date or 'Не назначена',
+                'inspector': inspector_id or 'Не назначен'
+            })
+        return True
+
+    def get_approved_inspections_by_inspector(self, inspector_id: str) -> Dict:
+        return self._inspections(
+            "WHERE inspector = ? AND date IS NOT NULL AND date NOT IN ('Не назначена', 'date')",
+            (str(inspector_id),)
+        )
+
+    def _page(self, table: str, where: str, params: tuple, after: Optional[str], before: Optional[str],
+              limit: int) -> List[str]:
+        """До limit place_id после курсора after или перед before.
+
+        Порядок - по sort_key, то есть тот же естественный порядок, что у SortedIndex JSON-хранилища
+        (place_2 раньше place_10), поэтому курсор одинаково работает на обоих бэкендах.
+        """
+        if before:
+            rows = self.storage.query(
+                f"SELECT place_id FROM {table} WHERE ({where}) AND sort_key < ? ORDER BY sort_key DESC LIMIT ?",
+                params + (natural_sort_key(before), limit)
+            )
+            return [row["place_id"] for row in reversed(rows)]
+        rows = self.storage.query(
+            f"SELECT place_id FROM {table} WHERE ({where}) AND sort_key > ? ORDER BY sort_key LIMIT ?",
+            params + (natural_sort_key(after) if after else "", limit)
+        )
+        return [row["place_id"] for row in rows]
+
+    def page_inspections_by_inspector(self, inspector_id: str, after: str = None, before: str = None,
+                                      limit: int = 10) -> List[str]:
+        return self._page("inspections", "inspector = ?", (str(inspector_id),), after, before, limit)
+
+    def page_approved_inspections_by_inspector(self, inspector_id: str, after: str = None, before: str = None,
+                                               limit: int = 10) -> List[str]:
+        return self._page(
+            "inspections", "inspector = ? AND date IS NOT NULL AND date NOT IN ('Не назначена', 'date')",
+            (str(inspector_id),), after, before, limit
+        )
+
+    def page_places_by_supervisor(self, supervisor_id: str, after: str = None, before: str = None,
+                                  limit: int = 10) -> List[str]:
+        return self._page("places", "supervisor_id = ?", (str(supervisor_id),), after, before, limit)
+
+    def get_inspection_status(self, place_id: str) -> str:
+        inspection_data = self.get_inspection(place_id) or {}
+        if inspection_data.get('date', 'Не назначена') in UNSCHEDULED_DATES:
+            return 'pending'
+        return 'approved'
+
+
+class SQLiteSimpleDB:
+    """Хранилище пользователей в SQLite с тем же API, что и SimpleDB"""
+
+    def __init__(self, db_path: str = "data/bot.sqlite3"):
+        # Импорт здесь: simple_db сам создает этот класс при STORAGE_BACKEND=sqlite
+        from database.simple_db import default_users, default_inspections
+
+        self.storage = get_storage(db_path)
+        with self.storage.transaction() as conn:
+            for user_id, user_data in default_users().items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO users (user_id, role, phone, data) VALUES (?, ?, ?, ?)",
+                    (user_id, user_data['role'], normalize_phone(user_data.get('phone')), _dumps(user_data))
+                )
+            for inspection_id, inspection_data in default_inspections().items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO user_inspections (inspection_id, data) VALUES (?, ?)",
+                    (inspection_id, _dumps(inspection_data))
+                )
+
+    @staticmethod
+    def _write_user(conn: sqlite3.Connection, user_data: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO users (user_id, role, phone, data) VALUES (?, ?, ?, ?)",
+            (str(user_data['telegram_id']), user_data['role'], normalize_phone(user_data.get('phone')),
+             _dumps(user_data))
+        )
+
+    def _users(self, where: str = "", params=()) -> Dict:
+        rows = self.storage.query(f"SELECT user_id, data FROM users {where}", params)
+        return {row["user_id"]: json.loads(row["data"]) for row in rows}
+
+    def get_user(self, telegram_id: int):
+        rows = self.storage.query("SELECT data FROM users WHERE user_id = ?", (str(telegram_id),))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def get_user_by_phone(self, phone: str):
+        """Возвращает пользователя по номеру телефона"""
+        rows = self.storage.query("SELECT data FROM users WHERE phone = ?", (normalize_phone(phone),))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def get_all_users(self):
+        """Возвращает всех пользователей"""
+        return self._users()
+
+    def get_users_by_role(self, role):
+        """Возвращает пользователей с указанной ролью"""
+        return self._users("WHERE role = ?", (role.value,))
+
+    def get_managers(self):
+        """Возвращает всех руководителей"""
+        from database.simple_db import UserRole
+        return self.get_users_by_role(UserRole.MANAGER)
+
+    def create_user(self, telegram_id: int, username: str, first_name: str,
+                    last_name: str, role, phone: str = None):
+        user_data = {
+            'telegram_id': telegram_id,
+            'username': username,
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone': phone,
+            'role': role.value,
+            'registered_at': datetime.now().isoformat(),
+            'is_active': True
+        }
+        with self.storage.transaction() as conn:
+            self._write_user(conn, user_data)
+        user_cache.invalidate(telegram_id)
+        return user_data
+
+    def update_user_role(self, telegram_id: int, new_role):
+        user = self.get_user(telegram_id)
+        if user:
+            user['role'] = new_role.value
+            with self.storage.transaction() as conn:
+                self._write_user(conn, user)
+            user_cache.invalidate(telegram_id)
+            return True
+        return False
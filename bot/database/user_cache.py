@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config import USER_CACHE_SIZE
+
+# Отметка "пользователь не зарегистрирован" (None - законное значение в кэше)
+_MISSING = object()
+
+
+class UserCache:
+    """LRU-кэш пользователей по telegram_id поверх общего хранилища.
+
+    Незарегистрированные тоже запоминаются, чтобы их апдейты не ходили в хранилище.
+    Хранилище сбрасывает запись в create_user и update_user_role.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+
+    def get(self, telegram_id: int) -> Optional[Dict]:
+        key = str(telegram_id)
+        user = self._cache.get(key, _MISSING)
+        if user is not _MISSING:
+            self._cache.move_to_end(key)
+            return user
+
+        from database.simple_db import get_db
+        user = get_db().get_user(telegram_id)
+        self._cache[key] = user
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return user
+
+    def invalidate(self, telegram_id: int):
+        self._cache.pop(str(telegram_id), None)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def has_role(user: Optional[Dict], *roles) -> bool:
+    """Есть ли у пользователя одна из ролей (UserRole)"""
+    return bool(user) and user['role'] in {role.value for role in roles}
+
+
+# Общий кэш пользователей
+user_cache = UserCache(USER_CACHE_SIZE)
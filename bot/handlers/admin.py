@@ -1,31 +1,29 @@
+import copy
+import time
+
 from aiogram import Router, F
 from aiogram.types import Message, ReplyKeyboardRemove, FSInputFile, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command, StateFilter
-import os
+from importlib.util import find_spec
 
-from database.simple_db import db, UserRole
+from database.simple_db import get_db, UserRole
+from database.user_cache import has_role, user_cache
+from utils.metrics import metrics
+from utils.pager import escape, pager
+from utils.report_queue import JobStatus, ReportJob, report_queue
 from utils.states import AdminStates
 from keyboards.admin_keyboards import get_admin_main_keyboard, get_cancel_keyboard, get_back_to_admin_keyboard
 
-# Пробуем импортировать PDF генератор
-try:
-    from ..utils.pdf_generator import generate_users_pdf
-    PDF_AVAILABLE = True
-except ImportError:
-    try:
-        from ..utils.pdf_generator import generate_users_pdf_simple as generate_users_pdf
-        PDF_AVAILABLE = True
-    except ImportError:
-        PDF_AVAILABLE = False
+# PDF генератор (reportlab) импортируется при первом запросе PDF, чтобы не замедлять запуск
+PDF_AVAILABLE = find_spec("reportlab") is not None
 
 router = Router()
 
 
 # Проверка прав администратора
 async def check_admin(user_id: int) -> bool:
-    user = db.get_user(user_id)
-    return user and user['role'] == UserRole.ADMIN.value
+    return has_role(user_cache.get(user_id), UserRole.ADMIN)
 
 
 @router.message(Command("admin"))
@@ -42,12 +40,58 @@ async def cmd_admin(message: Message):
         reply_markup=get_admin_main_keyboard()
     )
 
+def _format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+def _latency_lines(title: str, rows, label_format, errors_metric: str = None) -> list:
+    """Строки таблицы задержек: метки, число вызовов, p50/p95/p99 в мс и ошибки"""
+    if not rows:
+        return []
+    lines = [f"\n<b>{title}</b> (вызовов, p50/p95/p99 мс):\n"]
+    for labels, count, p50, p95, p99 in rows:
+        line = f"• {escape(label_format(labels))}: {count}, {_format_ms(p50)}/{_format_ms(p95)}/{_format_ms(p99)}"
+        errors = metrics.counter_value(errors_metric, **labels) if errors_metric else 0
+        if errors:
+            line += f", ❌ {errors:g}"
+        lines.append(line + "\n")
+    return lines
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """Задержки обработчиков, частота апдейтов, время записи хранилищ и отчетов"""
+    if not await check_admin(message.from_user.id):
+        return
+
+    uptime = int(time.time() - metrics.started_at)
+    updates = sum(row[1] for row in metrics.summary("update_latency"))
+    lines = [
+        "📈 <b>Статистика бота</b>\n\n",
+        f"⏱ Работает: {uptime // 3600} ч {uptime % 3600 // 60} мин\n",
+        f"📨 Апдейтов: {updates}, за последнюю минуту {metrics.rate('updates'):.2f}/с\n",
+    ]
+    lines += _latency_lines(
+        "Апдейты", metrics.summary("update_latency"), lambda labels: labels["type"], "update_errors"
+    )
+    lines += _latency_lines(
+        "Обработчики", metrics.summary("handler_latency"),
+        lambda labels: f"{labels['router']}.{labels['handler']}", "handler_errors"
+    )
+    lines += _latency_lines("Запись хранилищ", metrics.summary("storage_save"), lambda labels: labels["store"])
+    lines += _latency_lines(
+        "Отчеты", metrics.summary("report_render"), lambda labels: labels["kind"], "report_errors"
+    )
+
+    await pager.send(message, lines)
+
+
 @router.message(F.text == "📋 Список пользователей")
 async def list_users(message: Message):
     if not await check_admin(message.from_user.id):
         return
 
-    users = db.get_all_users()
+    users = get_db().get_all_users()
     if not users:
         await message.answer("📭 В базе нет пользователей.", reply_markup=get_admin_main_keyboard())
         return
@@ -70,7 +114,7 @@ async def show_users_in_chat(message: Message):
     if not await check_admin(message.from_user.id):
         return
 
-    users = db.get_all_users()
+    users = get_db().get_all_users()
 
     role_names = {
         UserRole.WORKER.value: "👷 Рабочий",
@@ -79,25 +123,20 @@ async def show_users_in_chat(message: Message):
         UserRole.ADMIN.value: "👨‍💼 Администратор"
     }
 
-    users_list = "📋 Список пользователей:\n\n"
+    lines = ["📋 Список пользователей:\n\n"]
     for user_id, user_data in users.items():
         status = "✅ Активен" if user_data.get('is_active', True) else "❌ Неактивен"
-        users_list += (
-            f"👤 {user_data['first_name']} {user_data.get('last_name', '')}\n"
+        lines.append(
+            f"👤 {escape(user_data['first_name'])} {escape(user_data.get('last_name', ''))}\n"
             f"ID: {user_data['telegram_id']}\n"
             f"Роль: {role_names[user_data['role']]}\n"
-            f"Телефон: {user_data.get('phone', 'Не указан')}\n"
+            f"Телефон: {escape(user_data.get('phone', 'Не указан'))}\n"
             f"Статус: {status}\n"
             f"---\n"
         )
 
-    # Разбиваем сообщение если слишком длинное
-    if len(users_list) > 4000:
-        parts = [users_list[i:i + 4000] for i in range(0, len(users_list), 4000)]
-        for part in parts:
-            await message.answer(part)
-    else:
-        await message.answer(users_list, reply_markup=get_back_to_admin_keyboard())
+    # Длинный список - одно сообщение со страницами
+    await pager.send(message, lines, reply_markup=get_back_to_admin_keyboard())
 
 
 @router.message(F.text == "📊 Скачать PDF")
@@ -120,46 +159,41 @@ async def generate_users_pdf_handler(message: Message):
         )
         return
 
-    users = db.get_all_users()
+    users = get_db().get_all_users()
     if not users:
         await message.answer("📭 В базе нет пользователей.", reply_markup=get_admin_main_keyboard())
         return
 
-    try:
-        # Показываем сообщение о генерации
-        await message.answer("📊 Генерирую PDF файл...")
-
-        # Генерируем PDF
-        filename = "users_list.pdf"
-        pdf_path = generate_users_pdf(users, filename)
-
-        # Отправляем файл
-        document = FSInputFile(pdf_path, filename="Список_пользователей.pdf")
-        await message.answer_document(
-            document,
-            caption="📊 Список пользователей"
-        )
-
-        # Удаляем временный файл
-        try:
-            os.remove(pdf_path)
-        except:
-            pass
-
-        await message.answer("✅ PDF файл успешно сгенерирован!", reply_markup=get_back_to_admin_keyboard())
-
-    except Exception as e:
-        await message.answer(
-            f"❌ Ошибка при генерации PDF: {str(e)}\n\n"
-            f"Показать список в чате?",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=[
-                    [KeyboardButton(text="📄 Показать в чате")],
-                    [KeyboardButton(text="🔙 В админ панель")]
-                ],
-                resize_keyboard=True
+    progress_message = await message.answer("📊 Отчет поставлен в очередь...")
+
+    async def on_progress(job: ReportJob):
+        if job.status == JobStatus.RUNNING:
+            await progress_message.edit_text("📊 Генерирую PDF файл...")
+        elif job.status == JobStatus.DONE:
+            # Файл остается в кэше очереди: повторный запрос с теми же данными отдается сразу
+            document = FSInputFile(job.path, filename="Список_пользователей.pdf")
+            await message.answer_document(
+                document,
+                caption="📊 Список пользователей",
+                reply_markup=get_back_to_admin_keyboard()
             )
-        )
+            await progress_message.edit_text("✅ PDF файл успешно сгенерирован!")
+        elif job.status == JobStatus.FAILED:
+            await progress_message.edit_text(f"❌ Ошибка при генерации PDF: {job.error}")
+            await message.answer(
+                "Показать список в чате?",
+                reply_markup=ReplyKeyboardMarkup(
+                    keyboard=[
+                        [KeyboardButton(text="📄 Показать в чате")],
+                        [KeyboardButton(text="🔙 В админ панель")]
+                    ],
+                    resize_keyboard=True
+                )
+            )
+
+    # Генерация идет в фоне: обработчик не ждет отчет и сразу освобождается.
+    # Отпечаток считается при постановке в очередь, поэтому и данные берутся снимком на этот момент
+    await report_queue.enqueue("users_pdf", {"users_data": copy.deepcopy(users)}, "pdf", on_progress)
 
 
 @router.message(F.text == "👤 Добавить пользователя")
@@ -326,7 +360,7 @@ async def process_telegram_id(message: Message, state: FSMContext):
         user_data = await state.get_data()
 
         # Проверяем, существует ли пользователь с таким ID
-        existing_user = db.get_user(telegram_id)
+        existing_user = get_db().get_user(telegram_id)
         if existing_user:
             await message.answer(
                 f"❌ Пользователь с ID {telegram_id} уже существует!",
@@ -336,7 +370,7 @@ async def process_telegram_id(message: Message, state: FSMContext):
             return
 
         # Создаем пользователя
-        user = db.create_user(
+        user = get_db().create_user(
             telegram_id=telegram_id,
             username="",  # Будет заполнено при первом входе
             first_name=user_data['first_name'],
@@ -415,7 +449,7 @@ async def add_user_process(message: Message, state: FSMContext):
         role = role_mapping[role_str]
 
         # Проверяем, существует ли пользователь
-        existing_user = db.get_user(telegram_id)
+        existing_user = get_db().get_user(telegram_id)
         if existing_user:
             await message.answer(
                 f"❌ Пользователь с ID {telegram_id} уже существует!",
@@ -425,7 +459,7 @@ async def add_user_process(message: Message, state: FSMContext):
             return
 
         # Создаем пользователя
-        user = db.create_user(
+        user = get_db().create_user(
             telegram_id=telegram_id,
             username="",  # Будет заполнено при первом входе
             first_name=first_name,
@@ -494,7 +528,7 @@ async def change_role_process(message: Message, state: FSMContext):
         new_role = role_mapping[new_role_str]
 
         # Проверяем, существует ли пользователь
-        existing_user = db.get_user(telegram_id)
+        existing_user = get_db().get_user(telegram_id)
         if not existing_user:
             await message.answer(
                 f"❌ Пользователь с ID {telegram_id} не найден!",
@@ -504,7 +538,7 @@ async def change_role_process(message: Message, state: FSMContext):
             return
 
         # Меняем роль
-        success = db.update_user_role(telegram_id, new_role)
+        success = get_db().update_user_role(telegram_id, new_role)
 
         if success:
             role_names = {
@@ -1,33 +1,94 @@
+from typing import List, Optional
+
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command, StateFilter
 
-from database.simple_db import db, UserRole
-from database.places_db import places_db
+from database.simple_db import UserRole
+from database.user_cache import has_role, user_cache
+from database.places_db import get_places_db
 from utils.states import InspectorStates
 from utils.inspection_service import inspection_service
 from keyboards.inspector_keyboards import (
     get_inspector_main_keyboard,
     get_inspections_keyboard,
     get_back_to_inspections_keyboard,
-    get_available_inspections_keyboard,
     get_approved_inspections_keyboard,
-    get_checklist_keyboard
+    get_checklist_keyboard,
+    get_criterion_keyboard,
+    get_criterion_skip_keyboard
 )
 # Добавляем импорт чек-листов
-from utils.checklists import checklist_manager
-from database.checklists_db import checklists_db
+from utils.checklists import get_checklist_manager
+from database.checklists_db import get_checklists_db
+from database.checklist_data import CriterionKey
+from utils.pager import CursorPage, cursor_pager, escape, pager
+from utils.photo_storage import photo_storage
 from utils.states import ChecklistStates
 router = Router()
 
 
 # Проверка прав проверяющего
 async def check_inspector(user_id: int) -> bool:
-    user = db.get_user(user_id)
-    if not user:
-        return False
-    return user['role'] == UserRole.INSPECTOR.value
+    return has_role(user_cache.get(user_id), UserRole.INSPECTOR)
+
+
+def _inspections_page(page: CursorPage):
+    """Текст и кнопки страницы "Мои проверки" - только для мест этой страницы"""
+    lines = ["📋 Ваши проверки:\n\n"]
+
+    for place_id in page.ids:
+        info = inspection_service.get_inspection_info(place_id)
+
+        block = (
+            f"🔹 Место: {place_id}\n"
+            f"📍 Адрес: {escape(info['address'])}\n"
+            f"👷 Бригадир: {escape(info['supervisor_name'])}\n"
+            f"📞 Телефон: {escape(info['supervisor_phone'])}\n"
+            f"🆔 ID бригадира: {info['supervisor_id']}\n"
+            f"📅 Время проверки: {escape(info['date'])}\n"
+        )
+
+        if info['date'] == "Не назначена":
+            block += "⚠️ Время не назначено - свяжитесь с бригадиром\n"
+
+        lines.append(block + "────────────────────\n")
+
+    return "".join(lines), get_inspections_keyboard(page)
+
+
+def _approved_inspections_page(page: CursorPage):
+    """Текст и кнопки страницы согласованных проверок"""
+    lines = ["✅ Согласованные проверки:\n\n"]
+
+    for place_id in page.ids:
+        info = inspection_service.get_inspection_info(place_id)
+
+        lines.append(
+            f"🔹 Место: {place_id}\n"
+            f"📍 Адрес: {escape(info['address'])}\n"
+            f"👷 Бригадир: {escape(info['supervisor_name'])}\n"
+            f"📞 Телефон: {escape(info['supervisor_phone'])}\n"
+            f"⏰ Время проверки: {escape(info['date'])}\n"
+            f"────────────────────\n"
+        )
+
+    return "".join(lines), get_approved_inspections_keyboard(page)
+
+
+cursor_pager.register(
+    "ins",
+    lambda user_id, after, before, limit: get_places_db().page_inspections_by_inspector(user_id, after, before, limit),
+    _inspections_page
+)
+cursor_pager.register(
+    "ok",
+    lambda user_id, after, before, limit: get_places_db().page_approved_inspections_by_inspector(
+        user_id, after, before, limit
+    ),
+    _approved_inspections_page
+)
 
 
 @router.message(F.text == "📋 Мои проверки")
@@ -36,9 +97,9 @@ async def my_inspections(message: Message):
         await message.answer("❌ У вас нет прав доступа к этой функции.")
         return
 
-    inspections = places_db.get_inspections_by_inspector(message.from_user.id)
+    page = cursor_pager.get_page("ins", message.from_user.id)
 
-    if not inspections:
+    if not page.ids:
         await message.answer(
             "📭 У вас нет назначенных проверок.",
             reply_markup=ReplyKeyboardMarkup(
@@ -48,37 +109,12 @@ async def my_inspections(message: Message):
         )
         return
 
-    inspections_list = "📋 Ваши проверки:\n\n"
-
-    for place_id, inspection_data in inspections.items():
-        info = inspection_service.get_inspection_info(place_id)
-
-        inspections_list += (
-            f"🔹 Место: {place_id}\n"
-            f"📍 Адрес: {info['address']}\n"
-            f"👷 Бригадир: {info['supervisor_name']}\n"
-            f"📞 Телефон: {info['supervisor_phone']}\n"
-            f"🆔 ID бригадира: {info['supervisor_id']}\n"
-            f"📅 Время проверки: {info['date']}\n"
-        )
-
-        if info['date'] == "Не назначена":
-            inspections_list += "⚠️ Время не назначено - свяжитесь с бригадиром\n"
-
-        inspections_list += f"────────────────────\n"
-
-    # Отправляем список и клавиатуру с кнопками для каждой проверки
-    if len(inspections_list) > 4000:
-        parts = [inspections_list[i:i + 4000] for i in range(0, len(inspections_list), 4000)]
-        for part in parts:
-            await message.answer(part)
-        await message.answer("Выберите проверку для связи с бригадиром:",
-                             reply_markup=get_inspections_keyboard(inspections))
-    else:
-        await message.answer(
-            inspections_list + "\nВыберите проверку для связи с бригадиром:",
-            reply_markup=get_inspections_keyboard(inspections)
-        )
+    # Первая страница списка с кнопками ее проверок; остальные - листанием
+    await cursor_pager.send(
+        message, page,
+        reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="🔙 Назад")]], resize_keyboard=True),
+        footer="Выберите проверку для связи с бригадиром:"
+    )
 
 # Добавляем новые обработчики:
 
@@ -90,9 +126,9 @@ async def approved_inspections(message: Message):
         return
 
     # Получаем только проверки с назначенным временем
-    inspections = places_db.get_approved_inspections_by_inspector(message.from_user.id)
+    page = cursor_pager.get_page("ok", message.from_user.id)
 
-    if not inspections:
+    if not page.ids:
         await message.answer(
             "📭 У вас нет согласованных проверок.\n"
             "Согласованные проверки - это проверки с назначенным временем.",
@@ -103,32 +139,34 @@ async def approved_inspections(message: Message):
         )
         return
 
-    inspections_list = "✅ Согласованные проверки:\n\n"
+    # Первая страница списка с кнопками чек-листов; остальные - листанием
+    await cursor_pager.send(
+        message, page,
+        reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="🔙 Назад")]], resize_keyboard=True),
+        footer="Выберите проверку для работы с чек-листом:"
+    )
 
-    for place_id, inspection_data in inspections.items():
-        info = inspection_service.get_inspection_info(place_id)
 
-        inspections_list += (
-            f"🔹 Место: {place_id}\n"
-            f"📍 Адрес: {info['address']}\n"
-            f"👷 Бригадир: {info['supervisor_name']}\n"
-            f"📞 Телефон: {info['supervisor_phone']}\n"
-            f"⏰ Время проверки: {info['date']}\n"
-            f"────────────────────\n"
-        )
+async def send_checklist_options(message: Message, user_id: int, place_id: str):
+    """Опции работы с чек-листом согласованной проверки проверяющего"""
+    # Проверяем, что проверка согласована и принадлежит проверяющему
+    inspection_data = get_places_db().get_inspection(place_id)
+    if (not inspection_data or
+            inspection_data.get('inspector') != str(user_id) or
+            get_places_db().get_inspection_status(place_id) != 'approved'):
+        await message.answer("❌ Проверка не найдена или не согласована.")
+        return
 
-    # Отправляем список и клавиатуру с кнопками чек-листов
-    if len(inspections_list) > 4000:
-        parts = [inspections_list[i:i + 4000] for i in range(0, len(inspections_list), 4000)]
-        for part in parts:
-            await message.answer(part)
-        await message.answer("Выберите проверку для работы с чек-листом:",
-                             reply_markup=get_approved_inspections_keyboard(inspections))
-    else:
-        await message.answer(
-            inspections_list + "\nВыберите проверку для работы с чек-листом:",
-            reply_markup=get_approved_inspections_keyboard(inspections)
-        )
+    info = inspection_service.get_inspection_info(place_id)
+
+    await message.answer(
+        f"📋 Работа с чек-листом\n\n"
+        f"🏢 Место: {place_id}\n"
+        f"📍 Адрес: {info['address']}\n"
+        f"⏰ Время проверки: {info['date']}\n\n"
+        f"Выберите действие:",
+        reply_markup=get_checklist_keyboard(place_id)
+    )
 
 
 @router.message(F.text.startswith("📝 Чек-лист #"))
@@ -140,28 +178,21 @@ async def show_checklist_options(message: Message):
     try:
         # Извлекаем ID места из текста кнопки
         place_id = message.text.split('#')[1]
+        await send_checklist_options(message, message.from_user.id, place_id)
 
-        # Проверяем, что проверка согласована и принадлежит проверяющему
-        inspection_data = places_db.search.get(place_id)
-        if (not inspection_data or
-                inspection_data.get('inspector') != str(message.from_user.id) or
-                places_db.get_inspection_status(place_id) != 'approved'):
-            await message.answer("❌ Проверка не найдена или не согласована.")
-            return
+    except (ValueError, IndexError):
+        await message.answer("❌ Ошибка при обработке запроса.")
 
-        info = inspection_service.get_inspection_info(place_id)
 
-        await message.answer(
-            f"📋 Работа с чек-листом\n\n"
-            f"🏢 Место: {place_id}\n"
-            f"📍 Адрес: {info['address']}\n"
-            f"⏰ Время проверки: {info['date']}\n\n"
-            f"Выберите действие:",
-            reply_markup=get_checklist_keyboard(place_id)
-        )
+@router.callback_query(F.data.startswith("ins:cl:"))
+async def checklist_options_callback(callback: CallbackQuery):
+    """Кнопка чек-листа в списке согласованных проверок"""
+    if not await check_inspector(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа к этой функции.")
+        return
 
-    except (ValueError, IndexError):
-        await message.answer("❌ Ошибка при обработке запроса.")
+    await callback.answer()
+    await send_checklist_options(callback.message, callback.from_user.id, callback.data.split(":", 2)[2])
 
 
 @router.message(F.text.startswith("📋 Открыть чек-лист #"))
@@ -174,33 +205,46 @@ async def open_checklist(message: Message):
         place_id = message.text.split('#')[1]
 
         # Проверяем доступ к проверке
-        inspection_data = places_db.search.get(place_id)
+        inspection_data = get_places_db().get_inspection(place_id)
         if (not inspection_data or
                 inspection_data.get('inspector') != str(message.from_user.id)):
             await message.answer("❌ Проверка не найдена.")
             return
 
         # Получаем актуальные данные чек-листа
-        checklist = checklists_db.get_checklist(place_id)
+        checklist = get_checklists_db().get_checklist(place_id)
         if not checklist:
             # Создаем новый если нет
             inspector_name = f"{message.from_user.first_name}"
-            template = checklist_manager.get_checklist_template(place_id)
-            checklists_db.create_checklist(place_id, inspector_name, template)
-            checklist = checklists_db.get_checklist(place_id)
-
-        # Форматируем чек-лист с актуальными статусами
-        checklist_message = checklist_manager.format_checklist_message(place_id, checklist)
-
-        await message.answer(
-            checklist_message,
-            reply_markup=get_checklist_keyboard(place_id)
+            template = get_checklist_manager().get_checklist_template(place_id)
+            get_checklists_db().create_checklist(place_id, inspector_name, template)
+            checklist = get_checklists_db().get_checklist(place_id)
+
+        # Чек-лист с актуальными статусами (из кэша, если он не менялся с прошлого просмотра)
+        await pager.send(
+            message,
+            source="inspector_checklist",
+            key=place_id,
+            reply_markup=get_checklist_keyboard(place_id),
+            footer="Выберите действие с чек-листом:"
         )
 
     except (ValueError, IndexError):
         await message.answer("❌ Ошибка при обработке запроса.")
 
 
+def _inspector_checklist_pages(place_id: str, user_id: int) -> Optional[List[str]]:
+    """Страницы чек-листа для проверяющего этой проверки"""
+    inspection_data = get_places_db().get_inspection(place_id)
+    if not inspection_data or inspection_data.get('inspector') != str(user_id):
+        return None
+    checklist = get_checklists_db().get_checklist(place_id)
+    return get_checklist_manager().render_checklist_parts(place_id, checklist) if checklist else None
+
+
+pager.register("inspector_checklist", _inspector_checklist_pages)
+
+
 @router.message(F.text.startswith("✅ Заполнить чек-лист #"))
 async def start_fill_checklist(message: Message, state: FSMContext):
     """Начинает процесс заполнения чек-листа"""
@@ -211,25 +255,26 @@ async def start_fill_checklist(message: Message, state: FSMContext):
         place_id = message.text.split('#')[1]
 
         # Проверяем доступ к проверке
-        inspection_data = places_db.search.get(place_id)
+        inspection_data = get_places_db().get_inspection(place_id)
         if (not inspection_data or
                 inspection_data.get('inspector') != str(message.from_user.id)):
             await message.answer("❌ Проверка не найдена.")
             return
 
         # Создаем чек-лист если его нет
-        checklist = checklists_db.get_checklist(place_id)
+        checklist = get_checklists_db().get_checklist(place_id)
         if not checklist:
             inspector_name = f"{message.from_user.first_name}"
-            template = checklist_manager.get_checklist_template(place_id)
-            checklists_db.create_checklist(place_id, inspector_name, template)
-            checklist = checklists_db.get_checklist(place_id)
+            template = get_checklist_manager().get_checklist_template(place_id)
+            get_checklists_db().create_checklist(place_id, inspector_name, template)
+            checklist = get_checklists_db().get_checklist(place_id)
 
         # Показываем меню заполнения
         template = checklist['checklist_data']
 
         # Показываем прогресс
-        progress = checklists_db.get_checklist_progress(place_id)
+        progress = get_checklists_db().get_checklist_progress(place_id)
+        section_progress = get_checklists_db().get_section_progress(place_id)
 
         keyboard = []
         for section_key in template['sections'].keys():
@@ -243,10 +288,9 @@ async def start_fill_checklist(message: Message, state: FSMContext):
 
         for section_key, section_data in template['sections'].items():
             sections_info += f"🔹 Раздел {section_key}: {section_data['description']}\n"
-            criteria_count = len(section_data['criteria'])
-            # Считаем заполненные критерии в разделе
-            filled = sum(1 for c in section_data['criteria'] if c.get('complies') is not None)
-            sections_info += f"   📊 Заполнено: {filled}/{criteria_count}\n\n"
+            # Счетчики раздела ведет индекс чек-листа
+            counts = section_progress.get(section_key, {"filled": 0, "total": 0})
+            sections_info += f"   📊 Заполнено: {counts['filled']}/{counts['total']}\n\n"
 
         await message.answer(
             sections_info,
@@ -270,12 +314,12 @@ async def fill_section(message: Message, state: FSMContext):
         place_id = text_parts[4].split('#')[1]
 
         # Проверяем доступ
-        inspection_data = places_db.search.get(place_id)
+        inspection_data = get_places_db().get_inspection(place_id)
         if not inspection_data or inspection_data.get('inspector') != str(message.from_user.id):
             await message.answer("❌ Нет доступа к проверке.")
             return
 
-        checklist = checklists_db.get_checklist(place_id)
+        checklist = get_checklists_db().get_checklist(place_id)
         if not checklist:
             await message.answer("❌ Чек-лист не найдена.")
             return
@@ -287,17 +331,16 @@ async def fill_section(message: Message, state: FSMContext):
             await message.answer(f"❌ Раздел {section} не найден.")
             return
 
-        # Показываем первый критерий раздела
-        criteria = section_data['criteria']
-        if not criteria:
+        # Показываем первый критерий раздела (включая критерии подразделов)
+        if not get_checklists_db().get_section_keys(place_id, section):
             await message.answer(f"❌ В разделе {section} нет критериев.")
             return
 
+        # В состоянии храним только адрес текущего критерия, сами критерии берем из хранилища
         await state.set_state(ChecklistStates.filling_section)
         await state.update_data(
             current_section=section,
             current_place_id=place_id,
-            current_criteria=criteria,
             current_index=0
         )
 
@@ -308,182 +351,209 @@ async def fill_section(message: Message, state: FSMContext):
         await state.clear()
 
 
-async def show_current_criterion(message: Message, state: FSMContext):
-    """Показывает текущий критерий для заполнения"""
-    user_data = await state.get_data()
+def get_current_criterion_key(user_data: dict) -> CriterionKey:
+    """Возвращает (подраздел, номер) текущего критерия по данным состояния"""
+    keys = get_checklists_db().get_section_keys(user_data['current_place_id'], user_data['current_section'])
+    return keys[user_data['current_index']]
 
-    section = user_data['current_section']
-    place_id = user_data['current_place_id']
-    criteria = user_data['current_criteria']
-    current_index = user_data['current_index']
 
-    criterion = criteria[current_index]
+def format_criterion_view(place_id: str, section: str, current_index: int, notice: str = "") -> str:
+    """Текст сообщения с текущим критерием; notice - итог предыдущего шага"""
+    criteria = get_checklists_db().get_section_keys(place_id, section)
+    subdivision, number = criteria[current_index]
+    criterion = get_checklists_db().get_criterion(place_id, section, number, subdivision)
 
-    # Проверяем текущий статус - БЛЯТЬ ТЕПЕРЬ ПРАВИЛЬНО!
     current_status = ""
     if criterion.get('complies') is True:
         current_status = "\n📊 Текущий статус: ✅ Соответствует"
     elif criterion.get('does_not_comply') is True:
-        current_status = f"\n📊 Текущий статус: ❌ Не соответствует\n💬 Комментарий: {criterion.get('comment', 'нет')}"
+        current_status = f"\n📊 Текущий статус: ❌ Не соответствует\n💬 Комментарий: {escape(criterion.get('comment', 'нет'))}"
 
-    await message.answer(
+    return (
+        f"{notice}"
         f"📝 Раздел {section}\n"
         f"🔸 Критерий {current_index + 1} из {len(criteria)}:\n\n"
-        f"{criterion['description']}"
+        f"{escape(criterion['description'])}"
         f"{current_status}\n\n"
-        f"Выберите статус:",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton(text="✅ Соответствует"), KeyboardButton(text="❌ Не соответствует")],
-                [KeyboardButton(text="⏩ Пропустить"), KeyboardButton(text="🔙 Назад")]
-            ],
-            resize_keyboard=True
-        )
+        f"Выберите статус:"
     )
 
 
-@router.message(ChecklistStates.filling_section, F.text.in_(["✅ Соответствует", "❌ Не соответствует", "⏩ Пропустить"]))
-async def process_criterion_choice(message: Message, state: FSMContext):
-    """Обрабатывает выбор статуса критерия"""
-    user_data = await state.get_data()
+async def show_current_criterion(message: Message, state: FSMContext, notice: str = "", view: Message = None):
+    """Показывает текущий критерий.
 
-    section = user_data['current_section']
-    place_id = user_data['current_place_id']
-    criteria = user_data['current_criteria']
+    С view сообщение с критерием редактируется на месте (ответ кнопкой под ним),
+    без него отправляется новое и запоминается как текущее.
+    """
+    user_data = await state.get_data()
     current_index = user_data['current_index']
+    text = format_criterion_view(user_data['current_place_id'], user_data['current_section'], current_index, notice)
+
+    if view:
+        await view.edit_text(text, reply_markup=get_criterion_keyboard(current_index))
+    else:
+        sent = await message.answer(text, reply_markup=get_criterion_keyboard(current_index))
+        await state.update_data({'view_message_id': sent.message_id})
+
+
+async def check_criterion_callback(callback: CallbackQuery, state: FSMContext) -> bool:
+    """Нажатие относится к текущему критерию и текущему сообщению, а не к устаревшему"""
+    user_data = await state.get_data()
+    index = int(callback.data.split(':')[2])
+    if index != user_data.get('current_index') or callback.message.message_id != user_data.get('view_message_id'):
+        await callback.answer("Этот критерий уже обработан")
+        return False
+    return True
 
-    current_criterion = criteria[current_index]
 
-    if message.text == "⏩ Пропустить":
-        # Просто переходим к следующему
-        await go_to_next_criterion(message, state)
+@router.callback_query(ChecklistStates.filling_section, F.data.startswith("crit:"))
+async def process_criterion_choice(callback: CallbackQuery, state: FSMContext):
+    """Обрабатывает выбор статуса критерия"""
+    if not await check_criterion_callback(callback, state):
         return
 
-    # Сохраняем базовый статус
-    complies = message.text == "✅ Соответствует"
+    action = callback.data.split(':')[1]
+    user_data = await state.get_data()
+    place_id = user_data['current_place_id']
 
-    if not complies:  # Если не соответствует - запрашиваем комментарий
-        await state.update_data(
-            pending_criterion=current_criterion,
-            pending_complies=complies
+    if action == "skip":
+        await callback.answer()
+        await go_to_next_criterion(callback.message, state, view=callback.message)
+    elif action == "ok":
+        subdivision, number = get_current_criterion_key(user_data)
+        get_checklists_db().update_criterion(
+            place_id=place_id,
+            section=user_data['current_section'],
+            criterion_number=number,
+            complies=True,
+            comment="",
+            subdivision=subdivision
         )
+        await callback.answer("✅ Статус сохранен")
+        await go_to_next_criterion(callback.message, state, notice="✅ Статус сохранен\n\n", view=callback.message)
+    elif action == "no":
+        # Ответ относится к текущему критерию (current_index), отдельно его адрес не храним
+        await state.update_data({'pending_complies': False})
         await state.set_state(ChecklistStates.waiting_for_comment)
-
-        await message.answer(
-            f"❌ Критерий не соответствует требованиям.\n\n"
-            f"Пожалуйста, укажите комментарий о выявленном несоответствии:",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=[[KeyboardButton(text="⏩ Без комментария")]],
-                resize_keyboard=True
-            )
+        await callback.answer()
+        await callback.message.edit_text(
+            "❌ Критерий не соответствует требованиям.\n\n"
+            "Пожалуйста, укажите комментарий о выявленном несоответствии:",
+            reply_markup=get_criterion_skip_keyboard("nocomment", "⏩ Без комментария", user_data['current_index'])
         )
+    elif action == "back":
+        await callback.answer()
+        await back_from_filling(callback.message, state)
     else:
-        # Если соответствует - просто сохраняем
-        checklists_db.update_criterion(
-            place_id=place_id,
-            section=section,
-            criterion_number=current_criterion['number'],
-            complies=complies,
-            comment=""
-        )
-        await message.answer("✅ Статус сохранен")
-        await go_to_next_criterion(message, state)
+        await callback.answer()
+
+
+@router.callback_query(ChecklistStates.waiting_for_comment, F.data.startswith("crit:nocomment:"))
+async def skip_comment(callback: CallbackQuery, state: FSMContext):
+    """Несоответствие без комментария"""
+    if not await check_criterion_callback(callback, state):
+        return
+    await callback.answer()
+    await ask_for_photo(callback.message, state, "", view=callback.message)
 
 
 @router.message(ChecklistStates.waiting_for_comment, F.text)
 async def process_comment(message: Message, state: FSMContext):
     """Обрабатывает комментарий для несоответствия"""
-    user_data = await state.get_data()
-
-    section = user_data['current_section']
-    place_id = user_data['current_place_id']
-    current_criterion = user_data['pending_criterion']
-    complies = user_data['pending_complies']
-
     comment = message.text if message.text != "⏩ Без комментария" else ""
+    await ask_for_photo(message, state, comment)
+
 
-    # Запрашиваем фото
-    await state.update_data(pending_comment=comment)
+async def ask_for_photo(message: Message, state: FSMContext, comment: str, view: Message = None):
+    await state.update_data({'pending_comment': comment})
     await state.set_state(ChecklistStates.waiting_for_photo)
 
-    await message.answer(
-        f"📸 Теперь пришлите фото несоответствия:\n\n"
-        f"<i>Или нажмите '⏩ Без фото' чтобы продолжить</i>",
-        parse_mode="HTML",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="⏩ Без фото")]],
-            resize_keyboard=True
-        )
+    user_data = await state.get_data()
+    text = (
+        "📸 Теперь пришлите фото несоответствия:\n\n"
+        "<i>Или нажмите '⏩ Без фото' чтобы продолжить</i>"
     )
+    keyboard = get_criterion_skip_keyboard("nophoto", "⏩ Без фото", user_data['current_index'])
+    if view:
+        await view.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    else:
+        sent = await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+        await state.update_data({'view_message_id': sent.message_id})
+
+
+@router.callback_query(ChecklistStates.waiting_for_photo, F.data.startswith("crit:nophoto:"))
+async def skip_photo(callback: CallbackQuery, state: FSMContext):
+    """Несоответствие без фото: сохраняем и редактируем то же сообщение до следующего критерия"""
+    if not await check_criterion_callback(callback, state):
+        return
+    await callback.answer()
+    await save_non_compliance(callback.message, state, None, view=callback.message)
 
 
-@router.message(ChecklistStates.waiting_for_photo, F.text == "⏩ Без фото")
 @router.message(ChecklistStates.waiting_for_photo, F.photo)
 async def process_photo(message: Message, state: FSMContext):
-    """Обрабатывает фото или пропуск фото"""
-    user_data = await state.get_data()
+    """Обрабатывает фото несоответствия"""
+    # Фото скачивается в фоне, в чек-лист сразу пишем его путь
+    photo = message.photo[-1]
+    photo_path = photo_storage.submit(message.bot, photo.file_id, photo.file_unique_id)
+    await save_non_compliance(message, state, photo_path)
 
-    section = user_data['current_section']
-    place_id = user_data['current_place_id']
-    current_criterion = user_data['pending_criterion']
-    complies = user_data['pending_complies']
+
+@router.callback_query(F.data.startswith("crit:"))
+async def stale_criterion_callback(callback: CallbackQuery):
+    """Кнопки под сообщением раздела, заполнение которого уже закончено"""
+    await callback.answer("Заполнение раздела уже завершено")
+
+
+async def save_non_compliance(message: Message, state: FSMContext, photo_path: str = None, view: Message = None):
+    """Сохраняет несоответствие и показывает следующий критерий"""
+    user_data = await state.get_data()
+    subdivision, number = get_current_criterion_key(user_data)
     comment = user_data['pending_comment']
 
-    photo_path = None
-    if message.photo:
-        # Сохраняем информацию о фото
-        photo_file_id = message.photo[-1].file_id
-        photo_path = checklists_db.save_photo(place_id, section, current_criterion['number'], photo_file_id)
-        photo_text = "✅ Фото сохранено"
-    else:
-        photo_text = "📷 Фото не прикреплено"
-
-    # Сохраняем критерий со всей информацией
-    checklists_db.update_criterion(
-        place_id=place_id,
-        section=section,
-        criterion_number=current_criterion['number'],
-        complies=complies,
+    get_checklists_db().update_criterion(
+        place_id=user_data['current_place_id'],
+        section=user_data['current_section'],
+        criterion_number=number,
+        complies=user_data['pending_complies'],
         comment=comment,
-        photo_path=photo_path
+        photo_path=photo_path,
+        subdivision=subdivision
     )
 
-    await message.answer(
+    # Итог сохранения показываем в том же сообщении, что и следующий критерий
+    notice = (
         f"❌ Несоответствие сохранено!\n"
-        f"💬 Комментарий: {comment if comment else 'нет'}\n"
-        f"{photo_text}",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton(text="✅ Соответствует"), KeyboardButton(text="❌ Не соответствует")],
-                [KeyboardButton(text="⏩ Пропустить"), KeyboardButton(text="🔙 Назад")]
-            ],
-            resize_keyboard=True
-        )
+        f"💬 Комментарий: {escape(comment) if comment else 'нет'}\n"
+        f"{'✅ Фото сохранено' if photo_path else '📷 Фото не прикреплено'}\n\n"
     )
 
     # Возвращаемся к заполнению и переходим к следующему критерию
     await state.set_state(ChecklistStates.filling_section)
-    await go_to_next_criterion(message, state)
+    await go_to_next_criterion(message, state, notice=notice, view=view)
 
 
-async def go_to_next_criterion(message: Message, state: FSMContext):
+async def go_to_next_criterion(message: Message, state: FSMContext, notice: str = "", view: Message = None):
     """Переходит к следующему критерию или завершает раздел"""
     user_data = await state.get_data()
 
-    criteria = user_data['current_criteria']
+    section = user_data['current_section']
+    place_id = user_data['current_place_id']
+    criteria = get_checklists_db().get_section_keys(place_id, section)
     current_index = user_data['current_index'] + 1
 
     if current_index < len(criteria):
-        await state.update_data(current_index=current_index)
-        await show_current_criterion(message, state)
+        # Ответ на предыдущий критерий из состояния убираем
+        await state.set_data({
+            'current_section': section,
+            'current_place_id': place_id,
+            'current_index': current_index,
+            'view_message_id': user_data.get('view_message_id')
+        })
+        await show_current_criterion(message, state, notice, view)
     else:
-        # Раздел завершен - БЛЯТЬ ВОЗВРАЩАЕМ ПРАВИЛЬНУЮ КЛАВИАТУРУ!
-        section = user_data['current_section']
-        place_id = user_data['current_place_id']
-
-        # Получаем актуальные данные для прогресса
-        checklist = checklists_db.get_checklist(place_id)
-        progress = checklists_db.get_checklist_progress(place_id)
+        # Раздел завершен
+        checklist = get_checklists_db().get_checklist(place_id)
 
         completion_text = ""
         if checklist["status"] == "completed":
@@ -491,12 +561,17 @@ async def go_to_next_criterion(message: Message, state: FSMContext):
             completion_text += f"✅ Все критерии проверены\n"
             completion_text += f"📊 Итоговый прогресс: 100%"
 
-        await message.answer(
+        text = (
+            f"{notice}"
             f"🎉 Раздел {section} заполнен!\n"
             f"✅ Обработано критериев: {len(criteria)}"
-            f"{completion_text}",
-            reply_markup=get_checklist_keyboard(place_id)  # ← БЛЯТЬ ВОТ ОНА ПРАВИЛЬНАЯ КЛАВИАТУРА!
+            f"{completion_text}"
         )
+        if view:
+            # Клавиатура разделов под полем ввода осталась с начала заполнения
+            await view.edit_text(text)
+        else:
+            await message.answer(text, reply_markup=get_checklist_keyboard(place_id))
         await state.clear()
 
 
@@ -548,6 +623,33 @@ async def back_to_approved_inspections(message: Message):
 
     await approved_inspections(message)
 
+async def start_contact_manager(message: Message, state: FSMContext, user_id: int, place_id: str):
+    """Показывает контакты бригадира и ждет предложенное время проверки"""
+    inspection_data = get_places_db().get_inspection(place_id)
+    if not inspection_data or inspection_data.get('inspector') != str(user_id):
+        await message.answer("❌ Проверка не найдена или не принадлежит вам.")
+        return
+
+    info = inspection_service.get_inspection_info(place_id)
+
+    await message.answer(
+        f"📞 Связь с бригадиром\n\n"
+        f"🏢 Место: {place_id}\n"
+        f"📍 Адрес: {info['address']}\n"
+        f"👷 Бригадир: {info['supervisor_name']}\n"
+        f"📞 Телефон: {info['supervisor_phone']}\n"
+        f"🆔 ID бригадира: {info['supervisor_id']}\n"
+        f"📅 Текущее время: {info['date']}\n\n"
+        f"Введите предложенное время для проверки:\n"
+        f"<i>Пример: 25.12.2023 14:30</i>",
+        parse_mode="HTML",
+        reply_markup=get_back_to_inspections_keyboard()
+    )
+
+    await state.update_data(place_id=place_id, supervisor_id=info['supervisor_id'])
+    await state.set_state(InspectorStates.waiting_for_proposed_time)
+
+
 @router.message(F.text.startswith("📞 Связаться #"))
 async def contact_manager_from_list(message: Message, state: FSMContext):
     """Обработчик кнопки связи с бригадиром из списка"""
@@ -557,33 +659,21 @@ async def contact_manager_from_list(message: Message, state: FSMContext):
     try:
         # Извлекаем ID места из текста кнопки
         place_id = message.text.split('#')[1].split(' -')[0]
+        await start_contact_manager(message, state, message.from_user.id, place_id)
 
-        inspection_data = places_db.search.get(place_id)
-        if not inspection_data or inspection_data.get('inspector') != str(message.from_user.id):
-            await message.answer("❌ Проверка не найдена или не принадлежит вам.")
-            return
-
-        info = inspection_service.get_inspection_info(place_id)
+    except (ValueError, IndexError):
+        await message.answer("❌ Ошибка при обработке запроса.")
 
-        await message.answer(
-            f"📞 Связь с бригадиром\n\n"
-            f"🏢 Место: {place_id}\n"
-            f"📍 Адрес: {info['address']}\n"
-            f"👷 Бригадир: {info['supervisor_name']}\n"
-            f"📞 Телефон: {info['supervisor_phone']}\n"
-            f"🆔 ID бригадира: {info['supervisor_id']}\n"
-            f"📅 Текущее время: {info['date']}\n\n"
-            f"Введите предложенное время для проверки:\n"
-            f"<i>Пример: 25.12.2023 14:30</i>",
-            parse_mode="HTML",
-            reply_markup=get_back_to_inspections_keyboard()
-        )
 
-        await state.update_data(place_id=place_id, supervisor_id=info['supervisor_id'])
-        await state.set_state(InspectorStates.waiting_for_proposed_time)
+@router.callback_query(F.data.startswith("ins:call:"))
+async def contact_manager_callback(callback: CallbackQuery, state: FSMContext):
+    """Кнопка связи с бригадиром в списке проверок"""
+    if not await check_inspector(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа к этой функции.")
+        return
 
-    except (ValueError, IndexError):
-        await message.answer("❌ Ошибка при обработке запроса.")
+    await callback.answer()
+    await start_contact_manager(callback.message, state, callback.from_user.id, callback.data.split(":", 2)[2])
 
 
 @router.message(F.text == "📊 Статус заполнения")
@@ -608,12 +698,13 @@ async def process_proposed_time(message: Message, state: FSMContext, bot: Bot):
     supervisor_id = user_data['supervisor_id']
 
     # Обновляем дату проверки
-    success = places_db.update_inspection_date(place_id, proposed_time)
+    success = get_places_db().update_inspection_date(place_id, proposed_time)
 
     if success:
         # Отправляем уведомление бригадиру через сервис
         await inspection_service.send_proposal_to_supervisor(
-            bot, place_id, supervisor_id, message.from_user.first_name, proposed_time
+            bot, place_id, supervisor_id, message.from_user.first_name, proposed_time,
+            event_id=f"{message.chat.id}:{message.message_id}"
         )
 
         await message.answer(
@@ -659,8 +750,8 @@ async def debug_places(message: Message):
     if not await check_inspector(message.from_user.id):
         return
 
-    all_places = places_db.get_all_places()
-    all_inspections = places_db.get_all_inspections()
+    all_places = get_places_db().get_all_places()
+    all_inspections = get_places_db().get_all_inspections()
 
     debug_info = "🧪 ДЕБАГ ИНФОРМАЦИЯ:\n\n"
     debug_info += f"📍 Всего мест: {len(all_places)}\n"
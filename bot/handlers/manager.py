@@ -6,6 +6,8 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import FSInputFile
 
 from database import db
+from database.simple_db import UserRole
+from database.user_cache import has_role, user_cache
 from keyboards.manager_kb import (
     get_schedules_keyboard, 
     get_reports_keyboard, 
@@ -18,10 +20,7 @@ router = Router()
 
 # Проверка прав менеджера
 async def check_manager(user_id: int) -> bool:
-    user = db.get_user(user_id)
-    if not user:
-        return False
-    return user['role'] == 'manager'
+    return has_role(user_cache.get(user_id), UserRole.MANAGER)
 
 
 class ScheduleStates(StatesGroup):
@@ -367,7 +366,7 @@ async def debug_manager(message: types.Message):
     if not await check_manager(message.from_user.id):
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     
     debug_info = (
         "🧪 <b>ДЕБАГ ИНФОРМАЦИЯ МЕНЕДЖЕРА</b>\n\n"
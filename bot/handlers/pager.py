@@ -0,0 +1,18 @@
+from aiogram import Router, F
+from aiogram.types import CallbackQuery
+
+from utils.pager import cursor_pager, pager
+
+router = Router()
+
+
+@router.callback_query(F.data.startswith("pg:"))
+async def turn_page(callback: CallbackQuery):
+    """Листание многостраничных сообщений"""
+    await pager.turn(callback)
+
+
+@router.callback_query(F.data.startswith("cl:"))
+async def turn_list_page(callback: CallbackQuery):
+    """Листание списков мест по курсору"""
+    await cursor_pager.turn(callback)
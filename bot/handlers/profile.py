@@ -2,6 +2,7 @@ from aiogram import Router, types
 from aiogram.filters import Text
 
 from database import db
+from database.user_cache import user_cache
 from keyboards.main_menu import get_main_menu
 
 router = Router()
@@ -9,7 +10,7 @@ router = Router()
 @router.message(Text("👤 Мой профиль"))
 async def show_profile(message: types.Message):
     """Показать профиль пользователя"""
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     
     if not user:
         await message.answer("❌ Профиль не найден")
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.filters import Command
@@ -7,7 +9,7 @@ from aiogram.types import Message, ReplyKeyboardRemove
 from utils.states import RegistrationStates
 from keyboards.auth_keyboards import get_phone_keyboard, get_role_keyboard
 from keyboards.inspector_keyboards import get_inspector_main_keyboard
-from database.simple_db import db, UserRole
+from database.simple_db import get_db, UserRole
 
 # Добавляем импорт для бригадира
 try:
@@ -47,8 +49,7 @@ def get_main_keyboard(user_role: UserRole):
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
 
 @router.message(F.text == "🔄 Сменить роль")
-async def cmd_change_role(message: Message, state: FSMContext):
-    user = db.get_user(message.from_user.id)
+async def cmd_change_role(message: Message, state: FSMContext, user: Optional[dict]):
 
     if not user:
         await message.answer("❌ Вы не зарегистрированы в системе.")
@@ -63,7 +64,7 @@ async def cmd_change_role(message: Message, state: FSMContext):
 
 @router.message(RegistrationStates.waiting_for_role_change,
                 F.text.in_(["👷 Рабочий", "👨‍💼 Руководитель", "👁️ Проверяющий"]))
-async def process_role_change(message: Message, state: FSMContext):
+async def process_role_change(message: Message, state: FSMContext, user: Optional[dict]):
     role_mapping = {
         "👷 Рабочий": UserRole.WORKER,
         "👨‍💼 Руководитель": UserRole.MANAGER,
@@ -71,7 +72,6 @@ async def process_role_change(message: Message, state: FSMContext):
     }
 
     new_role = role_mapping[message.text]
-    user = db.get_user(message.from_user.id)
 
     if not user:
         await message.answer("❌ Пользователь не найден.")
@@ -87,11 +87,10 @@ async def process_role_change(message: Message, state: FSMContext):
     }[UserRole(user['role'])]
 
     # Обновляем роль пользователя
-    success = db.update_user_role(message.from_user.id, new_role)
+    success = get_db().update_user_role(message.from_user.id, new_role)
 
     if success:
-        new_user_data = db.get_user(message.from_user.id)
-        user_role = UserRole(new_user_data['role'])
+        user_role = new_role
 
         await message.answer(
             f"✅ Роль успешно изменена!\n"
@@ -109,8 +108,7 @@ async def process_role_change(message: Message, state: FSMContext):
 
 
 @router.message(RegistrationStates.waiting_for_role_change, F.text == "❌ Отмена")
-async def cancel_role_change(message: Message, state: FSMContext):
-    user = db.get_user(message.from_user.id)
+async def cancel_role_change(message: Message, state: FSMContext, user: Optional[dict]):
     if user:
         user_role = UserRole(user['role'])
         await message.answer(
@@ -123,8 +121,7 @@ async def cancel_role_change(message: Message, state: FSMContext):
 
 @router.message(Command("start"))
 @router.message(F.text == "🔙 В главное меню")
-async def cmd_start(message: Message):
-    user = db.get_user(message.from_user.id)
+async def cmd_start(message: Message, user: Optional[dict]):
 
     if not user:
         keyboard = []
@@ -161,9 +158,8 @@ async def cmd_start(message: Message):
 
 
 @router.message(F.text == "Пройти регистрацию")
-async def cmd_register(message: Message, state: FSMContext):
+async def cmd_register(message: Message, state: FSMContext, user: Optional[dict]):
     print(message.from_user.id)
-    user = db.get_user(message.from_user.id)
     if user:
         await message.answer("Вы уже зарегистрированы!")
         return
@@ -183,6 +179,16 @@ async def process_phone(message: Message, state: FSMContext):
         await message.answer("Пожалуйста, поделитесь своим номером телефона.")
         return
 
+    owner = get_db().get_user_by_phone(contact.phone_number)
+    if owner and str(owner['telegram_id']) != str(message.from_user.id):
+        await message.answer(
+            "❌ Этот номер телефона уже привязан к другому аккаунту.\n"
+            "Обратитесь к администратору.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        await state.clear()
+        return
+
     await state.update_data(phone=contact.phone_number)
     await message.answer(
         "Отлично! Теперь выберите вашу роль:",
@@ -202,7 +208,7 @@ async def process_role(message: Message, state: FSMContext):
     role = role_mapping[message.text]
     user_data = await state.get_data()
 
-    user = db.create_user(
+    user = get_db().create_user(
         telegram_id=message.from_user.id,
         username=message.from_user.username,
         first_name=message.from_user.first_name,
@@ -227,8 +233,7 @@ async def cancel_registration(message: Message, state: FSMContext):
     await state.clear()
 
 @router.message(F.text == "👤 Мой профиль")
-async def cmd_profile(message: Message):
-    user = db.get_user(message.from_user.id)
+async def cmd_profile(message: Message, user: Optional[dict]):
 
     if not user:
         await message.answer("❌ Вы не зарегистрированы в системе.")
@@ -254,8 +259,7 @@ async def cmd_profile(message: Message):
 
 
 @router.message(F.text == "ℹ️ Помощь")
-async def cmd_help(message: Message):
-    user = db.get_user(message.from_user.id)
+async def cmd_help(message: Message, user: Optional[dict]):
 
     if not user:
         await message.answer("❌ Вы не зарегистрированы в системе.")
@@ -284,8 +288,7 @@ async def cmd_help(message: Message):
     await message.answer(help_text)
 
 @router.message(F.text == "👷 Панель бригадира")
-async def supervisor_panel(message: Message):
-    user = db.get_user(message.from_user.id)
+async def supervisor_panel(message: Message, user: Optional[dict]):
 
     if not user or UserRole(user['role']) != UserRole.MANAGER:
         await message.answer("❌ У вас нет прав доступа к панели бригадира.")
@@ -298,8 +301,7 @@ async def supervisor_panel(message: Message):
     )
 
 @router.message(F.text == "👁️ Панель проверяющего")
-async def inspector_panel(message: Message):
-    user = db.get_user(message.from_user.id)
+async def inspector_panel(message: Message, user: Optional[dict]):
 
     if not user or UserRole(user['role']) != UserRole.INSPECTOR:
         await message.answer("❌ У вас нет прав доступа к панели проверяющего.")
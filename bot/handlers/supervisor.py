@@ -1,23 +1,35 @@
+import zlib
+from typing import List, Optional
+
 from aiogram import Router, F, Bot
-from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import (
+    Message,
+    CallbackQuery,
+    ReplyKeyboardMarkup,
+    KeyboardButton,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup
+)
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 
-from database.simple_db import db, UserRole
-from database.places_db import places_db
-from database.checklists_db import checklists_db
+from database.simple_db import UserRole
+from database.user_cache import has_role, user_cache
+from database.places_db import get_places_db
+from database.checklists_db import get_checklists_db
+from database.checklist_data import checklist_progress, checklist_version, iter_criteria, iter_section_criteria
 from utils.inspection_service import inspection_service
 from utils.states import SupervisorStates
-from utils.checklists import checklist_manager
+from utils.checklists import ChecklistManager
+from utils.pager import CursorPage, cursor_pager, escape, page_navigation, pager
+from utils.render_cache import render_cache
 
 router = Router()
 
 
 # Проверка прав бригадира
 async def check_supervisor(user_id: int) -> bool:
-    user = db.get_user(user_id)
-    if not user:
-        return False
-    return user['role'] == UserRole.MANAGER.value
+    return has_role(user_cache.get(user_id), UserRole.MANAGER)
 
 
 # Клавиатура для бригадира
@@ -32,17 +44,14 @@ def get_supervisor_main_keyboard():
     )
 
 
-def get_checklists_keyboard(places_data):
-    """Клавиатура с чек-листами объектов бригадира"""
-    keyboard = []
-
-    for place_id in places_data:
-        button_text = f"📋 Чек-лист #{place_id}"
-        keyboard.append([KeyboardButton(text=button_text)])
-
-    keyboard.append([KeyboardButton(text="🔙 Назад")])
-
-    return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
+def get_checklists_keyboard(page: CursorPage):
+    """Inline-клавиатура страницы объектов бригадира с чек-листами"""
+    keyboard = [
+        [InlineKeyboardButton(text=f"📋 Чек-лист #{place_id}", callback_data=f"sv:cl:{place_id}")]
+        for place_id in page.ids
+    ]
+    keyboard.extend(page_navigation(page))
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
 def get_checklist_view_keyboard(place_id):
@@ -56,6 +65,41 @@ def get_checklist_view_keyboard(place_id):
     )
 
 
+def _checklists_page(page: CursorPage):
+    """Текст и кнопки страницы объектов бригадира - только для объектов этой страницы"""
+    places_list = "👁️ Ваши объекты для просмотра чек-листов:\n\n"
+
+    for place_id in page.ids:
+        checklist = get_checklists_db().get_checklist(place_id)
+
+        places_list += f"🔹 Объект: {place_id}\n"
+
+        # Получаем информацию о проверке если есть
+        inspection_data = get_places_db().get_inspection(place_id) or {}
+        if inspection_data:
+            places_list += f"📍 Адрес: {escape(inspection_data.get('address', 'Не указан'))}\n"
+            places_list += f"👤 Проверяющий: {escape(inspection_data.get('inspector', 'Не назначен'))}\n"
+
+        if checklist:
+            progress = get_checklists_db().get_checklist_progress(place_id)
+            status = "✅ Завершен" if checklist.get('status') == 'completed' else "🟡 В процессе"
+            places_list += f"📊 Чек-лист: {status}\n"
+            places_list += f"   Прогресс: {progress['percentage']}% ({progress['completed']}/{progress['total']})\n"
+        else:
+            places_list += f"📊 Чек-лист: ⚪ Не начат\n"
+
+        places_list += f"────────────────────\n"
+
+    return places_list, get_checklists_keyboard(page)
+
+
+cursor_pager.register(
+    "sv",
+    lambda user_id, after, before, limit: get_places_db().page_places_by_supervisor(user_id, after, before, limit),
+    _checklists_page
+)
+
+
 @router.message(F.text == "👁️ Просмотр чек-листов")
 async def view_checklists(message: Message):
     """Показывает чек-листы объектов бригадира"""
@@ -63,169 +107,230 @@ async def view_checklists(message: Message):
         await message.answer("❌ У вас нет прав доступа к этой функции.")
         return
 
-    # Получаем объекты бригадира из places.json
-    supervisor_places = []
-    user_id_str = str(message.from_user.id)
-
-    for place_id, supervisor_id in places_db.places.items():
-        if supervisor_id == user_id_str:
-            supervisor_places.append(place_id)
+    # Первая страница объектов бригадира; остальные - листанием
+    page = cursor_pager.get_page("sv", message.from_user.id)
 
-    if not supervisor_places:
+    if not page.ids:
         await message.answer(
             "📭 У вас нет закрепленных объектов.",
             reply_markup=get_supervisor_main_keyboard()
         )
         return
 
-    # Формируем список объектов с информацией о чек-листах
-    places_list = "👁️ Ваши объекты для просмотра чек-листов:\n\n"
+    await cursor_pager.send(
+        message, page,
+        reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="🔙 Назад")]], resize_keyboard=True),
+        footer="Выберите объект для просмотра чек-листа:"
+    )
 
-    for place_id in supervisor_places:
-        checklist = checklists_db.get_checklist(place_id)
 
-        places_list += f"🔹 Объект: {place_id}\n"
+def _part_hash(part: str) -> str:
+    return f"{zlib.crc32(part.encode('utf-8')):x}"
 
-        # Получаем информацию о проверке если есть
-        inspection_data = places_db.search.get(place_id, {})
-        if inspection_data:
-            places_list += f"📍 Адрес: {inspection_data.get('address', 'Не указан')}\n"
-            places_list += f"👤 Проверяющий: {inspection_data.get('inspector', 'Не назначен')}\n"
 
-        if checklist:
-            progress = checklists_db.get_checklist_progress(place_id)
-            status = "✅ Завершен" if checklist.get('status') == 'completed' else "🟡 В процессе"
-            places_list += f"📊 Чек-лист: {status}\n"
-            places_list += f"   Прогресс: {progress['percentage']}% ({progress['completed']}/{progress['total']})\n"
-        else:
-            places_list += f"📊 Чек-лист: ⚪ Не начат\n"
+def _checklist_refresh_buttons(place_id: str, page: int, pages: List[str]) -> List[List[InlineKeyboardButton]]:
+    """Кнопка обновления; отпечаток показанной страницы позволяет не редактировать сообщение без изменений"""
+    return [[InlineKeyboardButton(
+        text="🔄 Обновить",
+        callback_data=f"sv_refresh:{place_id}:{page}:{_part_hash(pages[page])}"
+    )]]
 
-        places_list += f"────────────────────\n"
 
-    await message.answer(
-        places_list + "\nВыберите объект для просмотра чек-листа:",
-        reply_markup=get_checklists_keyboard(supervisor_places)
+def _supervisor_checklist_pages(place_id: str, user_id: int) -> Optional[List[str]]:
+    checklist = _get_supervisor_checklist(user_id, place_id)
+    return _render_checklist_for_supervisor(place_id, checklist) if checklist else None
+
+
+pager.register("supervisor_checklist", _supervisor_checklist_pages, _checklist_refresh_buttons)
+
+
+async def send_checklist_view(message: Message, state: FSMContext, place_id: str):
+    """Отправляет чек-лист одним сообщением со страницами и запоминает его для обновления"""
+    sent = await pager.send(
+        message,
+        source="supervisor_checklist",
+        key=place_id,
+        reply_markup=get_checklist_view_keyboard(place_id),
+        footer="Выберите действие:"
     )
+    await state.update_data({'checklist_view': {'place_id': place_id, 'message_id': sent.message_id}})
+
+
+def _get_supervisor_checklist(user_id: int, place_id: str) -> Optional[dict]:
+    """Чек-лист объекта, если объект принадлежит бригадиру"""
+    supervisor_id = get_places_db().get_supervisor_by_place(place_id)
+    if not supervisor_id or supervisor_id != str(user_id):
+        return None
+    return get_checklists_db().get_checklist(place_id)
+
+
+async def open_checklist_for_supervisor(message: Message, state: FSMContext, user_id: int, place_id: str):
+    """Отправляет чек-лист объекта бригадиру, если объект его"""
+    # Проверяем, что объект принадлежит бригадиру
+    supervisor_id = get_places_db().get_supervisor_by_place(place_id)
+    if not supervisor_id or supervisor_id != str(user_id):
+        await message.answer("❌ У вас нет доступа к этому объекту.")
+        return
+
+    # Получаем чек-лист
+    checklist = get_checklists_db().get_checklist(place_id)
+
+    if not checklist:
+        await message.answer(
+            f"📭 Чек-лист для объекта {place_id} еще не создан.\n"
+            f"Проверяющий еще не начал заполнение.",
+            reply_markup=get_checklists_keyboard(CursorPage("sv", [place_id], False, False))
+        )
+        return
+
+    # Отправляем чек-лист (страницы берутся из кэша, если чек-лист не менялся)
+    await send_checklist_view(message, state, place_id)
 
 
 @router.message(F.text.startswith("📋 Чек-лист #"))
-async def show_checklist_for_supervisor(message: Message):
+async def show_checklist_for_supervisor(message: Message, state: FSMContext):
     """Показывает чек-лист конкретного места для бригадира"""
     if not await check_supervisor(message.from_user.id):
         return
 
     try:
         place_id = message.text.split('#')[1]
+        await open_checklist_for_supervisor(message, state, message.from_user.id, place_id)
 
-        # Проверяем, что объект принадлежит бригадиру
-        supervisor_id = places_db.places.get(place_id)
-        if not supervisor_id or supervisor_id != str(message.from_user.id):
-            await message.answer("❌ У вас нет доступа к этому объекту.")
-            return
+    except Exception as e:
+        await message.answer(f"❌ Ошибка: {str(e)}")
 
-        # Получаем чек-лист
-        checklist = checklists_db.get_checklist(place_id)
 
-        if not checklist:
-            await message.answer(
-                f"📭 Чек-лист для объекта {place_id} еще не создан.\n"
-                f"Проверяющий еще не начал заполнение.",
-                reply_markup=get_checklists_keyboard([place_id])
-            )
-            return
+@router.callback_query(F.data.startswith("sv:cl:"))
+async def checklist_for_supervisor_callback(callback: CallbackQuery, state: FSMContext):
+    """Кнопка чек-листа в списке объектов бригадира"""
+    if not await check_supervisor(callback.from_user.id):
+        await callback.answer("❌ У вас нет прав доступа к этой функции.")
+        return
 
-        # Форматируем чек-лист для просмотра (как у инспектора)
-        checklist_message = _format_checklist_for_supervisor(place_id, checklist)
+    await callback.answer()
+    await open_checklist_for_supervisor(callback.message, state, callback.from_user.id, callback.data.split(":", 2)[2])
 
-        # Отправляем чек-лист
-        if len(checklist_message) > 4000:
-            parts = [checklist_message[i:i + 4000] for i in range(0, len(checklist_message), 4000)]
-            for part in parts:
-                await message.answer(part)
-        else:
-            await message.answer(checklist_message)
 
-        # Показываем кнопки действий
-        await message.answer(
-            "Выберите действие:",
-            reply_markup=get_checklist_view_keyboard(place_id)
-        )
+def _render_checklist_for_supervisor(place_id: str, checklist: dict) -> List[str]:
+    """Чек-лист для просмотра бригадиром, разбитый на сообщения.
 
-    except Exception as e:
-        await message.answer(f"❌ Ошибка: {str(e)}")
+    Разделы и статистика зависят только от чек-листа и кэшируются по его версии,
+    шапка с данными проверки собирается заново при каждом просмотре.
+    """
+    header = [f"📋 Чек-лист объекта {place_id}\n"]
 
+    # Добавляем информацию о проверке если есть
+    inspection_data = get_places_db().get_inspection(place_id) or {}
+    if inspection_data:
+        header.append(f"📍 Адрес: {escape(inspection_data.get('address', 'Не указан'))}\n")
+        header.append(f"👤 Проверяющий: {escape(checklist['inspector_name'])}\n")
+        header.append(f"📅 Дата проверки: {escape(inspection_data.get('date', 'Не назначена'))}\n")
 
-def _format_checklist_for_supervisor(place_id: str, checklist: dict) -> str:
-    """Форматирует чек-лист для просмотра бригадиром"""
-    checklist_data = checklist['checklist_data']
+    header.append(f"📅 Создан: {checklist['created_at'][:10]}\n")
+    header.append(f"📊 Статус: {'✅ Завершен' if checklist.get('status') == 'completed' else '🟡 В процессе'}\n\n")
+    header = "".join(header)
 
-    message_text = f"📋 Чек-лист объекта {place_id}\n"
+    return render_cache.get_parts(
+        "supervisor", place_id, (checklist_version(checklist), header),
+        lambda: [header] + _supervisor_checklist_lines(checklist)
+    )
 
-    # Добавляем информацию о проверке если есть
-    inspection_data = places_db.search.get(place_id, {})
-    if inspection_data:
-        message_text += f"📍 Адрес: {inspection_data.get('address', 'Не указан')}\n"
-        message_text += f"👤 Проверяющий: {checklist['inspector_name']}\n"
-        message_text += f"📅 Дата проверки: {inspection_data.get('date', 'Не назначена')}\n"
 
-    message_text += f"📅 Создан: {checklist['created_at'][:10]}\n"
-    message_text += f"📊 Статус: {'✅ Завершен' if checklist.get('status') == 'completed' else '🟡 В процессе'}\n\n"
+def _supervisor_checklist_lines(checklist: dict) -> List[str]:
+    """Разделы, критерии и статистика чек-листа"""
+    checklist_data = checklist['checklist_data']
+    lines = []
 
-    # Добавляем разделы и критерии
     for section_key, section_data in checklist_data['sections'].items():
-        message_text += f"🔹 РАЗДЕЛ {section_key}:\n"
-        message_text += f"{section_data['description']}\n\n"
+        lines.append(f"🔹 РАЗДЕЛ {section_key}:\n{escape(section_data['description'])}\n\n")
 
-        for criterion in section_data['criteria']:
-            status = "⚪ Не проверен"
-            if criterion.get('complies') is True:
-                status = "✅ Соответствует"
-            elif criterion.get('does_not_comply') is True:
-                status = "❌ Не соответствует"
-
-            message_text += f"{criterion['number']}. {criterion['description']}\n"
-            message_text += f"   Статус: {status}\n"
+        current_sub = None
+        for sub_key, criterion in iter_section_criteria(section_data):
+            if sub_key != current_sub:
+                current_sub = sub_key
+                lines.append(ChecklistManager.subdivision_title(section_data, sub_key))
+            lines.append(f"{criterion['number']}. {escape(criterion['description'])}\n")
+            lines.append(f"   Статус: {ChecklistManager.criterion_status(criterion)}\n")
 
             if criterion.get('comment'):
-                message_text += f"   💬 Комментарий: {criterion['comment']}\n"
+                lines.append(f"   💬 Комментарий: {escape(criterion['comment'])}\n")
 
             if criterion.get('does_not_comply') is True:
-                message_text += f"   🚨 Требует внимания!\n"
+                lines.append("   🚨 Требует внимания!\n")
 
-            message_text += "\n"
+            lines.append("\n")
 
-        message_text += "────────────────────\n\n"
+        lines.append("────────────────────\n\n")
 
     # Добавляем статистику
-    progress = checklists_db.get_checklist_progress(place_id)
+    progress = checklist_progress(checklist)
     non_compliant = _count_non_compliant_criteria(checklist_data)
 
-    message_text += f"📈 СТАТИСТИКА:\n"
-    message_text += f"✅ Соответствует: {progress['completed'] - non_compliant}\n"
-    message_text += f"❌ Не соответствует: {non_compliant}\n"
-    message_text += f"⚪ Не проверено: {progress['total'] - progress['completed']}\n"
-    message_text += f"📊 Общий прогресс: {progress['percentage']}%"
-
-    return message_text
+    lines.append(
+        f"📈 СТАТИСТИКА:\n"
+        f"✅ Соответствует: {progress['completed'] - non_compliant}\n"
+        f"❌ Не соответствует: {non_compliant}\n"
+        f"⚪ Не проверено: {progress['total'] - progress['completed']}\n"
+        f"📊 Общий прогресс: {progress['percentage']}%"
+    )
+    return lines
 
 
 def _count_non_compliant_criteria(checklist_data: dict) -> int:
     """Подсчитывает количество несоответствующих критериев"""
-    non_compliant = 0
-    for section_data in checklist_data['sections'].values():
-        for criterion in section_data['criteria']:
-            if criterion.get('does_not_comply') is True:
-                non_compliant += 1
-    return non_compliant
+    return sum(1 for _, _, criterion in iter_criteria(checklist_data)
+               if criterion.get('does_not_comply') is True)
+
+
+@router.callback_query(F.data.startswith("sv_refresh:"))
+async def refresh_checklist_callback(callback: CallbackQuery):
+    """Обновляет показанную страницу чек-листа на месте, если она изменилась"""
+    _, place_id, *shown = callback.data.split(':')
+    # Кнопки старого формата (без страницы и отпечатка) обновляют первую страницу
+    page, shown_hash = shown if len(shown) == 2 else (0, None)
+    pages = _supervisor_checklist_pages(place_id, callback.from_user.id)
+    if not pages:
+        await callback.answer("❌ Чек-лист недоступен.")
+        return
+
+    page = min(int(page), len(pages) - 1)
+    if _part_hash(pages[page]) == shown_hash:
+        await callback.answer("Изменений нет")
+        return
+
+    await callback.answer("🔄 Чек-лист обновлен")
+    await callback.message.edit_text(
+        pages[page],
+        reply_markup=pager.keyboard("supervisor_checklist", place_id, page, pages)
+    )
 
 
 @router.message(F.text == "🔄 Обновить")
-async def refresh_checklist(message: Message):
-    """Обновляет просмотр чек-листа"""
-    # Находим последний просматриваемый объект из контекста
-    # В реальном приложении можно хранить историю в состоянии
-    # Пока просто возвращаем к списку чек-листов
-    await view_checklists(message)
+async def refresh_checklist(message: Message, state: FSMContext, bot: Bot):
+    """Обновляет просмотр чек-листа: показанное сообщение открывается с первой страницы"""
+    view = (await state.get_data()).get('checklist_view')
+    pages = _supervisor_checklist_pages(view['place_id'], message.from_user.id) if view else None
+    if not pages:
+        # Показанного чек-листа нет - возвращаем к списку чек-листов
+        await view_checklists(message)
+        return
+
+    try:
+        await bot.edit_message_text(
+            pages[0],
+            chat_id=message.chat.id,
+            message_id=view['message_id'],
+            reply_markup=pager.keyboard("supervisor_checklist", view['place_id'], 0, pages)
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            await message.answer("Изменений нет")
+            return
+        # Сообщение удалено или слишком старое для редактирования - показываем заново
+        await send_checklist_view(message, state, view['place_id'])
+        return
+    await message.answer("🔄 Чек-лист обновлен")
 
 
 @router.message(F.text == "📊 Детальная статистика")
@@ -234,13 +339,8 @@ async def detailed_statistics(message: Message):
     if not await check_supervisor(message.from_user.id):
         return
 
-    # Получаем объекты бригадира из places.json
-    supervisor_places = []
-    user_id_str = str(message.from_user.id)
-
-    for place_id, supervisor_id in places_db.places.items():
-        if supervisor_id == user_id_str:
-            supervisor_places.append(place_id)
+    # Получаем объекты бригадира
+    supervisor_places = get_places_db().get_places_by_supervisor(message.from_user.id)
 
     if not supervisor_places:
         await message.answer("❌ У вас нет закрепленных объектов.")
@@ -255,12 +355,12 @@ async def detailed_statistics(message: Message):
     total_criteria = 0
 
     for place_id in supervisor_places:
-        checklist = checklists_db.get_checklist(place_id)
+        checklist = get_checklists_db().get_checklist(place_id)
 
         stats_text += f"🔹 {place_id}:\n"
 
         if checklist:
-            progress = checklists_db.get_checklist_progress(place_id)
+            progress = get_checklists_db().get_checklist_progress(place_id)
             non_compliant = _count_non_compliant_criteria(checklist['checklist_data'])
 
             if checklist.get('status') == 'completed':
@@ -331,8 +431,8 @@ async def accept_inspection(callback: CallbackQuery, bot: Bot):
     actual_place_id = None
 
     for place_id in possible_place_ids:
-        if place_id in places_db.search:
-            inspection_data = places_db.search[place_id]
+        inspection_data = get_places_db().get_inspection(place_id)
+        if inspection_data:
             actual_place_id = place_id
             break
 
@@ -349,7 +449,7 @@ async def accept_inspection(callback: CallbackQuery, bot: Bot):
 
     # Просто отправляем подтверждение проверяющему
     success = await inspection_service.send_confirmation_to_inspector(
-        bot, actual_place_id, inspector_id, proposed_time
+        bot, actual_place_id, inspector_id, proposed_time, event_id=callback.id
     )
 
     if success:
@@ -376,9 +476,11 @@ async def decline_inspection(callback: CallbackQuery, state: FSMContext):
         raw_place_id.replace('place_', '')
     ]
 
+    inspection_data = None
     actual_place_id = None
     for place_id in possible_place_ids:
-        if place_id in places_db.search:
+        inspection_data = get_places_db().get_inspection(place_id)
+        if inspection_data:
             actual_place_id = place_id
             break
 
@@ -386,7 +488,6 @@ async def decline_inspection(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Проверка не найдена.")
         return
 
-    inspection_data = places_db.search[actual_place_id]
     inspector_id = inspection_data.get('inspector')
 
     if not inspector_id or inspector_id == 'Не назначен':
@@ -419,7 +520,8 @@ async def process_rejection_reason(message: Message, state: FSMContext, bot: Bot
 
     # Отправляем уведомление об отказе проверяющему
     success = await inspection_service.send_rejection_to_inspector(
-        bot, place_id, inspector_id, rejection_reason
+        bot, place_id, inspector_id, rejection_reason,
+        event_id=f"{message.chat.id}:{message.message_id}"
     )
 
     if success:
@@ -4,6 +4,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command, StateFilter
 
 from database import db
+from database.simple_db import UserRole
+from database.user_cache import has_role, user_cache
 from keyboards.worker_kb import (
     get_worker_main_keyboard,
     get_contact_supervisor_keyboard,
@@ -15,10 +17,7 @@ router = Router()
 
 # Проверка прав работника
 async def check_worker(user_id: int) -> bool:
-    user = db.get_user(user_id)
-    if not user:
-        return False
-    return user['role'] == 'worker'
+    return has_role(user_cache.get(user_id), UserRole.WORKER)
 
 
 @router.message(F.text == "👤 Мой профиль")
@@ -28,7 +27,7 @@ async def worker_profile(message: Message):
         await message.answer("❌ У вас нет прав доступа к этой функции.")
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     
     if not user:
         await message.answer("❌ Профиль не найден")
@@ -67,7 +66,7 @@ async def contact_supervisor_menu(message: Message):
         await message.answer("❌ У вас нет прав доступа к этой функции.")
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     supervisor = db.get_supervisor_by_worker(user['telegram_id'])
     
     if not supervisor:
@@ -95,7 +94,7 @@ async def call_supervisor(message: Message):
     if not await check_worker(message.from_user.id):
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     supervisor = db.get_supervisor_by_worker(user['telegram_id'])
     
     if supervisor and supervisor['phone']:
@@ -120,7 +119,7 @@ async def message_supervisor(message: Message):
     if not await check_worker(message.from_user.id):
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     supervisor = db.get_supervisor_by_worker(user['telegram_id'])
     
     if supervisor:
@@ -182,7 +181,7 @@ async def debug_worker(message: Message):
     if not await check_worker(message.from_user.id):
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     supervisor = db.get_supervisor_by_worker(user['telegram_id'])
     
     debug_info = "🧪 <b>ДЕБАГ ИНФОРМАЦИЯ РАБОТНИКА</b>\n\n"
@@ -210,7 +209,7 @@ async def worker_info(message: Message):
     if not await check_worker(message.from_user.id):
         return
 
-    user = db.get_user(message.from_user.id)
+    user = user_cache.get(message.from_user.id)
     workers_count = len(db.get_workers_by_supervisor(user['supervisor_id'])) if user['supervisor_id'] else 0
     
     info_text = (
@@ -1,5 +1,7 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 
+from utils.pager import CursorPage, page_navigation
+
 
 def get_inspector_main_keyboard():
     return ReplyKeyboardMarkup(
@@ -13,33 +15,24 @@ def get_inspector_main_keyboard():
     )
 
 
-def get_inspections_keyboard(inspections_data):
-    """Создает клавиатуру с кнопками для каждой проверки"""
-    keyboard = []
-
-    for place_id, inspection_data in inspections_data.items():
-        # Создаем кнопку для каждой проверки
-        button_text = f"📞 Связаться #{place_id}"
-        keyboard.append([KeyboardButton(text=button_text)])
-
-    # Добавляем кнопку назад
-    keyboard.append([KeyboardButton(text="🔙 Назад")])
-
-    return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
-
-
-def get_approved_inspections_keyboard(approved_inspections):
-    """Клавиатура для согласованных проверок с чек-листами"""
-    keyboard = []
-
-    for place_id, inspection_data in approved_inspections.items():
-        # Кнопка для открытия чек-листа
-        button_text = f"📝 Чек-лист #{place_id}"
-        keyboard.append([KeyboardButton(text=button_text)])
+def get_inspections_keyboard(page: CursorPage):
+    """Inline-клавиатура страницы проверок: связь с бригадиром и листание"""
+    keyboard = [
+        [InlineKeyboardButton(text=f"📞 Связаться #{place_id}", callback_data=f"ins:call:{place_id}")]
+        for place_id in page.ids
+    ]
+    keyboard.extend(page_navigation(page))
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
-    keyboard.append([KeyboardButton(text="🔙 Назад")])
 
-    return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
+def get_approved_inspections_keyboard(page: CursorPage):
+    """Inline-клавиатура страницы согласованных проверок с чек-листами"""
+    keyboard = [
+        [InlineKeyboardButton(text=f"📝 Чек-лист #{place_id}", callback_data=f"ins:cl:{place_id}")]
+        for place_id in page.ids
+    ]
+    keyboard.extend(page_navigation(page))
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
 def get_checklist_management_keyboard(place_id: str, has_subdivisions: bool = False):
@@ -101,18 +94,6 @@ def get_back_to_inspections_keyboard():
     )
 
 
-def get_available_inspections_keyboard(available_inspections):
-    """Клавиатура для доступных проверок"""
-    keyboard = []
-
-    for place_id, inspection_data in available_inspections.items():
-        button_text = f"✅ Взять проверку #{place_id}"
-        keyboard.append([KeyboardButton(text=button_text)])
-
-    keyboard.append([KeyboardButton(text="🔙 Назад")])
-
-    return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
-
 def get_checklist_management_keyboard(place_id: str, has_subdivisions: bool = False):
     """Клавиатура для управления чек-листом"""
     keyboard = [
@@ -146,4 +127,26 @@ def get_confirm_inspection_keyboard(place_id: str):
                 InlineKeyboardButton(text="❌ Отклонить", callback_data=f"decline_inspection_{place_id}")
             ]
         ]
-    )
\ No newline at end of file
+    )
+
+def get_criterion_keyboard(index: int):
+    """Кнопки ответа на критерий; номер критерия в callback_data отсекает повторные нажатия"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Соответствует", callback_data=f"crit:ok:{index}"),
+                InlineKeyboardButton(text="❌ Не соответствует", callback_data=f"crit:no:{index}")
+            ],
+            [
+                InlineKeyboardButton(text="⏩ Пропустить", callback_data=f"crit:skip:{index}"),
+                InlineKeyboardButton(text="🔙 Назад", callback_data=f"crit:back:{index}")
+            ]
+        ]
+    )
+
+
+def get_criterion_skip_keyboard(action: str, text: str, index: int):
+    """Одна кнопка пропуска шага (комментария или фото) для критерия index"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=text, callback_data=f"crit:{action}:{index}")]]
+    )
@@ -1,11 +1,39 @@
 import asyncio
 import logging
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN,
+    BOT_MODE,
+    MAX_CONCURRENT_UPDATES,
+    METRICS_HOST,
+    METRICS_PORT,
+    WEBHOOK_URL,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS
+)
+from database.checklists_db import close_checklists_db
+from database.flusher import flusher
+from database.fsm_storage import create_fsm_storage
 from handlers import routers
+from middlewares import (
+    AuthMiddleware,
+    ConcurrencyLimitMiddleware,
+    HandlerMetricsMiddleware,
+    UpdateMetricsMiddleware
+)
+from utils.metrics_exporter import MetricsExporter
+from utils.outbox_sender import outbox_sender
+from utils.photo_storage import photo_storage
+from utils.report_queue import report_queue
+from utils.report_service import report_service
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -15,16 +43,89 @@ bot = Bot(
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
 
-async def main():
-    # Инициализация бота
-    dp = Dispatcher()
+
+def create_dispatcher() -> Dispatcher:
+    storage = create_fsm_storage()
+    dp = Dispatcher(storage=storage)
+
+    # Метрики: частота и время апдейтов (с ожиданием очереди), время каждого обработчика
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    dp.message.middleware(handler_metrics)
+    dp.callback_query.middleware(handler_metrics)
+
+    # Не больше MAX_CONCURRENT_UPDATES обработчиков одновременно
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(MAX_CONCURRENT_UPDATES))
+    # Пользователь и его роль загружаются один раз на апдейт
+    dp.update.outer_middleware(AuthMiddleware())
 
     # Регистрация роутеров
     for router in routers:
         dp.include_router(router)
 
-    # Запуск поллинга
-    await dp.start_polling(bot)
+    # Отложенная запись JSON-хранилищ: запускаем вместе с ботом, при остановке сбрасываем на диск
+    dp.startup.register(flusher.start)
+    # Уведомления отправляются из outbox в фоне; неотправленные остаются в SQLite до следующего запуска
+    dp.startup.register(outbox_sender.start)
+    # Локальный экспорт метрик для Prometheus (если задан METRICS_PORT)
+    exporter = MetricsExporter(METRICS_HOST, METRICS_PORT)
+    dp.startup.register(exporter.start)
+    dp.shutdown.register(exporter.stop)
+    dp.shutdown.register(outbox_sender.stop)
+    dp.shutdown.register(photo_storage.stop)
+    dp.shutdown.register(storage.close)
+    dp.shutdown.register(flusher.stop)
+    dp.shutdown.register(close_checklists_db)
+    dp.shutdown.register(report_queue.stop)
+    dp.shutdown.register(report_service.shutdown)
+    return dp
+
+
+async def set_webhook(bot: Bot):
+    """Регистрирует вебхук в Telegram; без WEBHOOK_URL сервер принимает апдейты только локально"""
+    if not WEBHOOK_URL:
+        logging.warning("WEBHOOK_URL не задан: вебхук в Telegram не регистрируется")
+        return
+    await bot.set_webhook(
+        f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET or None,
+        max_connections=WEBHOOK_MAX_CONNECTIONS
+    )
+
+
+async def run_webhook(dp: Dispatcher):
+    """Встроенный aiohttp-сервер; апдейты обрабатываются в фоне, ответ Telegram отдается сразу"""
+    dp.startup.register(set_webhook)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET or None
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logging.info(f"Вебхук слушает http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def main():
+    # Инициализация бота
+    dp = create_dispatcher()
+
+    if BOT_MODE == "webhook":
+        await run_webhook(dp)
+    else:
+        # Вебхук мог остаться от запуска в режиме webhook - с ним getUpdates не работает
+        await bot.delete_webhook()
+        # Запуск поллинга
+        await dp.start_polling(bot)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,3 @@
+from .auth import AuthMiddleware
+from .concurrency import ConcurrencyLimitMiddleware
+from .metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
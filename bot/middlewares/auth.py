@@ -0,0 +1,24 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from database.user_cache import user_cache
+
+
+class AuthMiddleware(BaseMiddleware):
+    """Загружает пользователя бота один раз на апдейт и кладет его в данные обработчика.
+
+    Обработчики получают его аргументом user (None - не зарегистрирован),
+    а проверки ролей читают тот же объект из кэша без обращений к хранилищу.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        from_user: User = data.get("event_from_user")
+        data["user"] = user_cache.get(from_user.id) if from_user else None
+        return await handler(event, data)
@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Ограничивает число апдейтов, которые обрабатываются одновременно.
+
+    Остальные ждут своей очереди, поэтому всплеск апдейтов (вебхук, накопившийся поллинг)
+    не запускает сотни обработчиков разом и не забивает хранилища и сеть.
+    """
+
+    def __init__(self, limit: int = 32):
+        self.limit = limit
+        self._semaphore = None
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        # Семафор создается внутри работающего цикла событий
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            return await handler(event, data)
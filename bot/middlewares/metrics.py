@@ -0,0 +1,68 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import metrics
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Частота апдейтов, полное время их обработки и необработанные апдейты по типам.
+
+    Регистрируется первым внешним middleware, поэтому время включает ожидание
+    своей очереди в ConcurrencyLimitMiddleware - то, что видит пользователь.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        event_type = event.event_type
+        metrics.mark("updates")
+        metrics.inc("updates", type=event_type)
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+        except Exception:
+            metrics.inc("update_errors", type=event_type)
+            raise
+        finally:
+            metrics.observe("update_latency", time.perf_counter() - started, type=event_type)
+
+        if result is UNHANDLED:
+            metrics.inc("updates_unhandled", type=event_type)
+        return result
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Задержка и ошибки каждого обработчика.
+
+    Внутренний middleware: вызывается только для найденного обработчика,
+    а зарегистрированный в диспетчере действует во всех вложенных роутерах.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object: HandlerObject = data["handler"]
+        callback = handler_object.callback
+        labels = {
+            "router": callback.__module__.rsplit(".", 1)[-1],
+            "handler": getattr(callback, "__name__", "unknown")
+        }
+        try:
+            with metrics.timer("handler_latency", **labels):
+                return await handler(event, data)
+        except SkipHandler:
+            raise
+        except Exception:
+            metrics.inc("handler_errors", **labels)
+            raise
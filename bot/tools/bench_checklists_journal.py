@@ -0,0 +1,62 @@
+"""Бенчмарк ChecklistsDB.update_criterion: перезапись файла места против журнала.
+
+Запуск из папки bot:
+    python -m tools.bench_checklists_journal
+"""
+import json
+import os
+import tempfile
+import time
+
+from database.checklists_db import ChecklistsDB
+from utils.checklists import get_checklist_manager
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "analizing_data", "json-templates", "form1.json")
+SIZES = [10, 100, 500, 1000]
+UPDATES = 200
+
+
+def load_template() -> dict:
+    if os.path.exists(TEMPLATE_PATH):
+        with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return get_checklist_manager().get_default_template()
+
+
+def first_section(template: dict):
+    for section_key, section_data in template["sections"].items():
+        if section_data["criteria"]:
+            return section_key, [c["number"] for c in section_data["criteria"]]
+    raise ValueError("В шаблоне нет критериев")
+
+
+def bench(size: int, journal_mode: bool, template: dict) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "checklists")
+        legacy_path = os.path.join(tmp, "checklists.json")
+        seed = ChecklistsDB(db_path, journal_mode=False, legacy_path=legacy_path)
+        for i in range(size):
+            seed.create_checklist(f"place_{i}", "bench", template)
+
+        db = ChecklistsDB(db_path, journal_mode=journal_mode, compact_every=UPDATES * 10,
+                          legacy_path=legacy_path)
+        section, numbers = first_section(template)
+        started = time.perf_counter()
+        for i in range(UPDATES):
+            db.update_criterion(f"place_{i % size}", section, numbers[i % len(numbers)], True)
+        elapsed = time.perf_counter() - started
+        db.close()
+        return elapsed / UPDATES * 1000
+
+
+def main():
+    template = load_template()
+    print(f"{'чек-листов':>12} | {'файл места, мс':>14} | {'журнал, мс':>12}")
+    for size in SIZES:
+        snapshot_ms = bench(size, False, template)
+        journal_ms = bench(size, True, template)
+        print(f"{size:>12} | {snapshot_ms:>14.3f} | {journal_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
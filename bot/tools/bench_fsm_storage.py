@@ -0,0 +1,67 @@
+"""Бенчмарк FSM-хранилищ: операции get/set в секунду.
+
+Сценарий повторяет шаг заполнения чек-листа: get_data, update_data, get_state.
+SQLite-хранилище меряется с отложенной записью (flusher запущен) и с записью на каждую операцию.
+
+Запуск из папки bot:
+    python -m tools.bench_fsm_storage
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from database.flusher import flusher
+from database.fsm_storage import SQLiteFSMStorage
+from utils.states import ChecklistStates
+
+USERS = 50
+STEPS = 4000
+
+
+async def run_steps(storage) -> float:
+    keys = [StorageKey(bot_id=1, chat_id=user_id, user_id=user_id) for user_id in range(USERS)]
+    for key in keys:
+        await storage.set_state(key, ChecklistStates.filling_section)
+        await storage.set_data(key, {"current_place_id": "place_1", "current_section": "А", "current_index": 0})
+
+    started = time.perf_counter()
+    for step in range(STEPS):
+        key = keys[step % USERS]
+        data = await storage.get_data(key)
+        await storage.update_data(key, {"current_index": data["current_index"] + 1})
+        await storage.get_state(key)
+    elapsed = time.perf_counter() - started
+    await storage.close()
+    # Одна итерация - три обращения к хранилищу (update_data внутри читает и пишет)
+    return STEPS * 3 / elapsed
+
+
+async def bench_sqlite(path: str, batched: bool) -> float:
+    if batched:
+        await flusher.start()
+    try:
+        return await run_steps(SQLiteFSMStorage(path))
+    finally:
+        if batched:
+            await flusher.stop()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            ("память", await run_steps(MemoryStorage())),
+            ("SQLite, пакетная запись", await bench_sqlite(os.path.join(tmp, "batched.sqlite3"), True)),
+            ("SQLite, запись сразу", await bench_sqlite(os.path.join(tmp, "direct.sqlite3"), False)),
+        ]
+
+    print(f"Пользователей: {USERS}, шагов: {STEPS}")
+    for name, ops in results:
+        print(f"{name:>24}: {ops:>10.0f} оп/с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Бенчмарк outbox уведомлений: сколько уведомлений в секунду проходит от постановки до отметки "sent".
+
+Telegram подменен сессией-заглушкой с задержкой ответа LATENCY; каждая десятая отправка
+в первый раз падает с сетевой ошибкой и уходит на повтор. Лимиты частоты подняты,
+чтобы мерить саму очередь, а не ограничитель.
+
+Запуск из папки bot:
+    python -m tools.bench_outbox
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramNetworkError
+
+from database.outbox import Outbox, OutboxStatus
+from utils.notifications import NotificationDispatcher
+from utils.outbox_sender import OutboxSender
+import utils.outbox_sender
+
+NOTIFICATIONS = 2000
+CHATS = 500
+LATENCY = 0.02
+
+
+class FakeSession(BaseSession):
+    """Сессия без сети: отвечает через LATENCY секунд, каждый десятый первый запрос - ошибка сети"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+        self._failed = set()
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        number = self.requests
+        await asyncio.sleep(LATENCY)
+        if number % 10 == 0 and method.text not in self._failed:
+            self._failed.add(method.text)
+            raise TelegramNetworkError(method=method, message="bench")
+        return None
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+async def main():
+    # Ошибки сети здесь намеренные, их лог не нужен
+    logging.disable(logging.CRITICAL)
+    # Повторы в бенчмарке не ждут реальные секунды
+    utils.outbox_sender.BACKOFF_BASE = 0.01
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(os.path.join(tmp, "bench.sqlite3"))
+        dispatcher = NotificationDispatcher(global_rate=10000, chat_rate=1000, chat_burst=1000, max_retries=0)
+        sender = OutboxSender(outbox, dispatcher, batch_size=100)
+        session = FakeSession()
+        bot = Bot("123456:bench", session=session)
+
+        started = time.perf_counter()
+        for number in range(NOTIFICATIONS):
+            sender.add(f"bench:{number}", number % CHATS, f"Уведомление {number}")
+        enqueued = time.perf_counter()
+
+        await sender.start(bot)
+        while outbox.count(OutboxStatus.SENT) < NOTIFICATIONS:
+            await asyncio.sleep(0.01)
+        finished = time.perf_counter()
+        await sender.stop()
+
+        # Повторная постановка тех же ключей не создает дублей
+        for number in range(NOTIFICATIONS):
+            sender.add(f"bench:{number}", number % CHATS, f"Уведомление {number}")
+        duplicates = outbox.count(OutboxStatus.PENDING)
+
+    print(f"Уведомлений: {NOTIFICATIONS}, запросов к API: {session.requests}, дублей после повтора: {duplicates}")
+    print(f"{'постановка в outbox':>22}: {NOTIFICATIONS / (enqueued - started):10.0f} ув/с")
+    print(f"{'доставка':>22}: {NOTIFICATIONS / (finished - enqueued):10.0f} ув/с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
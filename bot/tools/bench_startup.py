@@ -0,0 +1,99 @@
+"""Бенчмарк холодного запуска: время до обработки первого апдейта.
+
+Каждый прогон - отдельный процесс: импорт обработчиков, сборка Dispatcher
+и обработка одного сообщения проверяющего (сеть подменена сессией-заглушкой).
+
+Запуск из папки bot:
+    python -m tools.bench_startup
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILES = ["users.json", "places.json", "search.json"]
+RUNS = 10
+
+
+def child():
+    started = time.perf_counter()
+    import asyncio
+    from datetime import datetime
+
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.types import Update
+
+    from handlers import routers
+
+    class NullSession(BaseSession):
+        """Сессия без сети: все запросы к Telegram API возвращают None"""
+
+        async def make_request(self, bot, method, timeout=None):
+            return None
+
+        async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+            yield b""
+
+        async def close(self):
+            pass
+
+    dp = Dispatcher()
+    for router in routers:
+        dp.include_router(router)
+    imported = time.perf_counter()
+
+    bot = Bot("123456:bench", session=NullSession())
+    update = Update.model_validate({
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": int(datetime.now().timestamp()),
+            "chat": {"id": 555555555, "type": "private"},
+            "from": {"id": 555555555, "is_bot": False, "first_name": "Bench"},
+            "text": "📋 Мои проверки"
+        }
+    }, context={"bot": bot})
+    asyncio.run(dp.feed_update(bot, update))
+    handled = time.perf_counter()
+
+    print(json.dumps({"import": imported - started, "first_update": handled - imported}))
+
+
+def run_once(workdir: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=BOT_DIR)
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "tools.bench_startup", "--child"],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Бот работает на копии данных, чтобы прогон не менял рабочие файлы
+        for file_name in DATA_FILES:
+            if os.path.exists(os.path.join(BOT_DIR, file_name)):
+                shutil.copy(os.path.join(BOT_DIR, file_name), tmp)
+
+        results = [run_once(tmp) for _ in range(RUNS)]
+
+    print(f"Прогонов: {RUNS}, медиана, мс")
+    for key, title in (("import", "импорт и Dispatcher"), ("first_update", "первый апдейт после импорта"),
+                       ("process", "процесс целиком")):
+        print(f"{title:>30}: {statistics.median(r[key] for r in results) * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        child()
+    else:
+        main()
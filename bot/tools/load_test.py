@@ -0,0 +1,351 @@
+"""Нагрузочный прогон диспетчера: N виртуальных проверяющих одновременно проходят полный сценарий.
+
+Сценарий пользователя: регистрация проверяющего и его бригадира, согласование времени проверки
+(каждый DECLINE_EVERY-й бригадир сначала отклоняет предложение), ответы на все критерии
+чек-листа своей формы (form1-form6 по кругу, каждый NON_COMPLIANT_EVERY-й критерий -
+несоответствие с комментарием) и просмотр чек-листа.
+
+Апдейты собираются так же, как их присылает Telegram, и подаются в Dispatcher.feed_update;
+Telegram подменен сессией-заглушкой, которая запоминает сообщения бота, чтобы виртуальные
+пользователи нажимали настоящие кнопки. Уведомления бригадиру доходят через outbox, как в работе.
+Прогон полностью офлайн и идет во временной папке: рабочие данные бота не меняются.
+
+Запуск из папки bot:
+    python -m tools.load_test [--users 50] [--backend json|sqlite] [--fsm memory|sqlite]
+                              [--latency 0] [--unthrottled]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage
+from aiogram.types import Chat, InlineKeyboardMarkup, Message, ReplyKeyboardMarkup
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_DIR = os.path.join(BOT_DIR, "..", "analizing_data", "json-templates")
+FORMS = 6
+
+INSPECTOR_BASE = 900000000
+SUPERVISOR_BASE = 910000000
+# Каждый DECLINE_EVERY-й бригадир сначала отклоняет время, каждый NON_COMPLIANT_EVERY-й критерий - несоответствие
+DECLINE_EVERY = 4
+NON_COMPLIANT_EVERY = 5
+# Сколько ждать уведомление из outbox и сколько сообщений бота помнить в каждом чате
+NOTIFICATION_TIMEOUT = 60
+CHAT_HISTORY = 20
+
+
+class ScenarioError(Exception):
+    """Бот ответил не так, как ожидает сценарий (нет нужной кнопки, не пришло уведомление)"""
+
+
+class FakeSession(BaseSession):
+    """Сессия без сети: отвечает через latency секунд и помнит последние сообщения бота в каждом чате"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+        self.message_ids = itertools.count(1)
+        self.chats: Dict[int, "OrderedDict[int, Message]"] = defaultdict(OrderedDict)
+        # Клавиатура под полем ввода не привязана к сообщению - храним последнюю по чату
+        self.reply_keyboards: Dict[int, ReplyKeyboardMarkup] = {}
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(method, SendMessage):
+            return self._store(int(method.chat_id), next(self.message_ids), method.text, method.reply_markup)
+        if isinstance(method, EditMessageText):
+            return self._store(int(method.chat_id), method.message_id, method.text, method.reply_markup)
+        if isinstance(method, EditMessageReplyMarkup):
+            old = self.chats[int(method.chat_id)].get(method.message_id)
+            return self._store(int(method.chat_id), method.message_id, old.text if old else "", method.reply_markup)
+        return True
+
+    def _store(self, chat_id: int, message_id: int, text: str, reply_markup) -> Message:
+        message = Message(
+            message_id=message_id,
+            date=datetime.now(),
+            chat=Chat(id=chat_id, type="private"),
+            text=text,
+            reply_markup=reply_markup if isinstance(reply_markup, InlineKeyboardMarkup) else None
+        )
+        history = self.chats[chat_id]
+        history[message_id] = message
+        if isinstance(reply_markup, ReplyKeyboardMarkup):
+            self.reply_keyboards[chat_id] = reply_markup
+        while len(history) > CHAT_HISTORY:
+            history.popitem(last=False)
+        return message
+
+    def last_message(self, chat_id: int) -> Optional[Message]:
+        history = self.chats[chat_id]
+        return history[max(history)] if history else None
+
+    def find_button(self, chat_id: int, prefix: str, newer_than: int = 0):
+        """(сообщение, callback_data) самой новой inline-кнопки с данными, начинающимися на prefix"""
+        history = self.chats[chat_id]
+        for message_id in sorted(history, reverse=True):
+            if message_id <= newer_than:
+                break
+            markup = history[message_id].reply_markup
+            for row in markup.inline_keyboard if markup else []:
+                for button in row:
+                    if button.callback_data and button.callback_data.startswith(prefix):
+                        return history[message_id], button.callback_data
+        return None, None
+
+    def reply_buttons(self, chat_id: int, prefix: str) -> List[str]:
+        keyboard = self.reply_keyboards.get(chat_id)
+        if keyboard is None:
+            return []
+        return [button.text for row in keyboard.keyboard for button in row if button.text.startswith(prefix)]
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def prepare_workdir(workdir: str, users: int):
+    """Места, проверки и шаблоны форм для виртуальных пользователей во временной папке бота"""
+    templates = os.path.join(workdir, "checklist_templates")
+    os.makedirs(templates)
+    places, search = {}, {}
+    for number in range(1, users + 1):
+        place_id = f"place_{number}"
+        places[place_id] = str(SUPERVISOR_BASE + number)
+        search[place_id] = {"date": "Не назначена", "inspector": str(INSPECTOR_BASE + number)}
+        # Шаблон выбирается по номеру места, поэтому place_7 снова заполняет form1 и т. д.
+        shutil.copy(os.path.join(TEMPLATES_DIR, f"form{(number - 1) % FORMS + 1}.json"),
+                    os.path.join(templates, f"form{number}.json"))
+
+    for file_name, data in (("places.json", places), ("search.json", search)):
+        with open(os.path.join(workdir, file_name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def folder_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class LoadTest:
+    def __init__(self, dp, bot, session: FakeSession):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.update_ids = itertools.count(1)
+        self.latencies: List[float] = []
+        self.criteria_answered = 0
+        self.errors: List[str] = []
+
+    async def feed(self, update: dict):
+        from aiogram.types import Update
+
+        update["update_id"] = next(self.update_ids)
+        started = time.perf_counter()
+        await self.dp.feed_update(self.bot, Update.model_validate(update, context={"bot": self.bot}))
+        self.latencies.append(time.perf_counter() - started)
+
+    def _message(self, user_id: int, **content) -> dict:
+        return {"message": {
+            "message_id": next(self.session.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Нагрузка {user_id}"},
+            **content
+        }}
+
+    async def send(self, user_id: int, text: str):
+        await self.feed(self._message(user_id, text=text))
+
+    async def press(self, user_id: int, prefix: str, newer_than: int = 0) -> Message:
+        message, data = self.session.find_button(user_id, prefix, newer_than)
+        if message is None:
+            raise ScenarioError(f"у {user_id} нет кнопки {prefix}")
+        await self.feed({"callback_query": {
+            "id": str(next(self.update_ids)),
+            "chat_instance": str(user_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Нагрузка {user_id}"},
+            "data": data,
+            "message": message.model_dump(mode="json", exclude_none=True)
+        }})
+        return message
+
+    async def wait_notification(self, user_id: int, prefix: str, newer_than: int) -> int:
+        """Ждет уведомление с кнопкой prefix, отправленное из outbox; возвращает id сообщения"""
+        deadline = time.monotonic() + NOTIFICATION_TIMEOUT
+        while time.monotonic() < deadline:
+            message, _ = self.session.find_button(user_id, prefix, newer_than)
+            if message is not None:
+                return message.message_id
+            await asyncio.sleep(0.01)
+        raise ScenarioError(f"{user_id} не получил уведомление {prefix}")
+
+    async def register(self, user_id: int, phone: str, role_text: str):
+        await self.send(user_id, "/start")
+        await self.send(user_id, "Пройти регистрацию")
+        await self.feed(self._message(user_id, contact={
+            "phone_number": phone, "first_name": f"Нагрузка {user_id}", "user_id": user_id
+        }))
+        await self.send(user_id, role_text)
+
+    async def agree_time(self, inspector: int, supervisor: int, place_id: str, decline_first: bool):
+        """Проверяющий предлагает время, бригадир отклоняет (если decline_first) и подтверждает"""
+        notification = 0
+        for attempt in range(2 if decline_first else 1):
+            await self.send(inspector, "📋 Мои проверки")
+            await self.press(inspector, f"ins:call:{place_id}")
+            await self.send(inspector, f"{10 + attempt}.12.2026 10:00")
+
+            action = "decline" if attempt == 0 and decline_first else "accept"
+            notification = await self.wait_notification(supervisor, f"{action}_inspection_{place_id}", notification)
+            await self.press(supervisor, f"{action}_inspection_{place_id}", notification - 1)
+            if action == "decline":
+                await self.send(supervisor, "В это время на объекте идут работы")
+
+    async def answer_criteria(self, inspector: int, opened_after: int):
+        """Отвечает на критерии раздела, пока у его сообщения есть кнопки ответа.
+
+        Сообщение раздела - самое новое с кнопками ответа после opened_after: уведомления из outbox
+        могут прийти позже него, поэтому просто последнее сообщение чата не подходит.
+        """
+        for answered in range(1, 10000):
+            view, data = self.session.find_button(inspector, "crit:ok:", opened_after)
+            if view is None:
+                return
+            self.criteria_answered += 1
+            if answered % NON_COMPLIANT_EVERY:
+                await self.press(inspector, data, view.message_id - 1)
+                continue
+            await self.press(inspector, "crit:no:", view.message_id - 1)
+            await self.send(inspector, "Нарушение, найденное нагрузочным тестом")
+            await self.press(inspector, "crit:nophoto:", view.message_id)
+        raise ScenarioError(f"{inspector}: раздел не закончился")
+
+    async def run_user(self, number: int):
+        inspector, supervisor, place_id = INSPECTOR_BASE + number, SUPERVISOR_BASE + number, f"place_{number}"
+        try:
+            await self.register(supervisor, f"+7910{number:07d}", "👨‍💼 Руководитель")
+            await self.register(inspector, f"+7900{number:07d}", "👁️ Проверяющий")
+            await self.agree_time(inspector, supervisor, place_id, number % DECLINE_EVERY == 0)
+
+            await self.send(inspector, "✅ Согласованные проверки")
+            await self.press(inspector, f"ins:cl:{place_id}")
+            await self.send(inspector, f"✅ Заполнить чек-лист #{place_id}")
+            for section_button in self.session.reply_buttons(inspector, "📝 Заполнить раздел "):
+                opened_after = self.session.last_message(inspector).message_id
+                await self.send(inspector, section_button)
+                await self.answer_criteria(inspector, opened_after)
+            await self.send(inspector, f"📋 Открыть чек-лист #{place_id}")
+        except Exception as e:
+            self.errors.append(f"пользователь {number}: {type(e).__name__}: {e}")
+
+
+async def run(args) -> None:
+    # Модули бота читают настройки и данные при импорте - импортируем их уже во временной папке
+    from aiogram import Bot
+
+    import main as bot_main
+    from database.checklists_db import get_checklists_db
+    from utils.metrics import metrics
+
+    if args.backend == "sqlite":
+        # Места и проверки переносим тем же путем, что и рабочие данные при переходе на SQLite
+        from database.migrate_json_to_sqlite import migrate
+        migrate()
+
+    session = FakeSession(args.latency / 1000)
+    bot = Bot("123456:load-test", session=session)
+    dp = bot_main.create_dispatcher()
+    test = LoadTest(dp, bot, session)
+
+    size_before = folder_size(os.getcwd())
+    await dp.emit_startup(bot=bot)
+    started = time.perf_counter()
+    await asyncio.gather(*(test.run_user(number) for number in range(1, args.users + 1)))
+    elapsed = time.perf_counter() - started
+
+    completed = sum(
+        1 for number in range(1, args.users + 1)
+        if (get_checklists_db().get_checklist(f"place_{number}") or {}).get("status") == "completed"
+    )
+    await dp.emit_shutdown(bot=bot)
+
+    latencies = sorted(test.latencies)
+    print(f"Пользователей: {args.users}, хранилище: {args.backend}, FSM: {args.fsm}, "
+          f"задержка API: {args.latency} мс{', без лимитов уведомлений' if args.unthrottled else ''}")
+    print(f"Чек-листов заполнено: {completed}/{args.users}, критериев отвечено: {test.criteria_answered}, "
+          f"ошибок сценария: {len(test.errors)}")
+    for error in test.errors[:5]:
+        print(f"  {error}")
+    print(f"Апдейтов: {len(latencies)} за {elapsed:.2f} с - {len(latencies) / elapsed:.0f} апдейтов/с, "
+          f"запросов к API: {session.requests}")
+    print("Обработка апдейта, мс: " + ", ".join(
+        f"{name} {value * 1000:.1f}" for name, value in (
+            ("p50", percentile(latencies, 0.5)), ("p95", percentile(latencies, 0.95)),
+            ("p99", percentile(latencies, 0.99)), ("максимум", latencies[-1] if latencies else 0.0)
+        )
+    ))
+
+    print("Самые частые обработчики (вызовов, p50 / p95 мс):")
+    for labels, count, p50, p95, _ in metrics.summary("handler_latency")[:8]:
+        print(f"  {labels['router']}.{labels['handler']}: {count}, {p50 * 1000:.1f} / {p95 * 1000:.1f}")
+
+    # Байты считают JSON-файлы и журнал; у SQLite - число транзакций, размер файла виден ниже
+    writes = []
+    for labels, count, *_ in sorted(metrics.summary("storage_save"), key=lambda row: row[0]["store"]):
+        written = metrics.counter_value("storage_bytes", store=labels["store"])
+        writes.append(f"{labels['store']} {count} раз" + (f", {written / 1024:.0f} КБ" if written else ""))
+    print("Записи хранилищ: " + ", ".join(writes))
+    print(f"Данные бота на диске: {size_before / 1024:.0f} КБ -> {folder_size(os.getcwd()) / 1024:.0f} КБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон диспетчера с виртуальными пользователями")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--fsm", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа Telegram API, мс")
+    parser.add_argument("--unthrottled", action="store_true",
+                        help="снять лимиты частоты уведомлений (мерить бота, а не ограничитель)")
+    args = parser.parse_args()
+
+    os.environ.update(STORAGE_BACKEND=args.backend, FSM_STORAGE=args.fsm, METRICS_PORT="0")
+    os.environ.setdefault("BOT_TOKEN", "123456:load-test")
+    if args.unthrottled:
+        os.environ.update(NOTIFY_GLOBAL_RATE="100000", NOTIFY_CHAT_RATE="100000", NOTIFY_CHAT_BURST="100000")
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_workdir(tmp, args.users)
+        sys.path.insert(0, BOT_DIR)
+        os.chdir(tmp)
+        try:
+            asyncio.run(run(args))
+        finally:
+            os.chdir(BOT_DIR)
+
+
+if __name__ == "__main__":
+    main()
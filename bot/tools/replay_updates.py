@@ -0,0 +1,73 @@
+"""Отправка записанных апдейтов на вебхук бота - локальная проверка режима webhook.
+
+Бот запускается с BOT_MODE=webhook (WEBHOOK_URL можно не задавать), затем из папки bot:
+    python -m tools.replay_updates [файл.jsonl] [--url http://127.0.0.1:8080/webhook] [--repeat 20] [--concurrency 10]
+
+Файл - по одному JSON-апдейту Telegram на строку (по умолчанию tools/sample_updates.jsonl).
+При повторах update_id делается уникальным, чтобы апдейты не считались дублями.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import aiohttp
+
+from config import WEBHOOK_HOST, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET
+
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), "sample_updates.jsonl")
+
+
+def load_updates(path: str) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def replay(url: str, updates: list, repeat: int, concurrency: int):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET} if WEBHOOK_SECRET else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def post(session: aiohttp.ClientSession, update: dict):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    batch = []
+    for i in range(repeat):
+        for update in updates:
+            batch.append(dict(update, update_id=update["update_id"] + i * len(updates) * 1000))
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, update) for update in batch))
+    elapsed = time.perf_counter() - started
+
+    print(f"Отправлено апдейтов: {len(batch)}, ошибок: {errors}")
+    print(f"Пропускная способность: {len(batch) / elapsed:.0f} апдейтов/с")
+    print(f"Задержка ответа, мс: медиана {statistics.median(latencies) * 1000:.1f}, "
+          f"максимум {max(latencies) * 1000:.1f}")
+
+
+def main():
+    host = "127.0.0.1" if WEBHOOK_HOST == "0.0.0.0" else WEBHOOK_HOST
+    parser = argparse.ArgumentParser(description="Отправка записанных апдейтов на вебхук")
+    parser.add_argument("file", nargs="?", default=DEFAULT_FILE)
+    parser.add_argument("--url", default=f"http://{host}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(replay(args.url, load_updates(args.file), args.repeat, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
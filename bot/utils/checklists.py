@@ -3,6 +3,10 @@ import os
 from typing import Dict, List
 import glob
 
+from database.checklist_data import checklist_version, iter_section_criteria
+from utils.pager import escape
+from utils.render_cache import render_cache
+
 
 class ChecklistManager:
     def __init__(self, templates_folder: str = "checklist_templates"):
@@ -63,38 +67,61 @@ class ChecklistManager:
             "overall_score": None
         }
 
-    def format_checklist_message(self, place_id: str, checklist_data: Dict = None) -> str:
-        """Форматирует чек-лист для отправки в сообщении"""
-        if not checklist_data:
-            template = self.get_checklist_template(place_id)
-        else:
-            template = checklist_data["checklist_data"]
-
-        message = f"📋 {template['section_name']}\n"
-        message += f"📁 Файл: {template['file_name']}\n\n"
+    @staticmethod
+    def criterion_status(criterion: Dict) -> str:
+        if criterion.get('complies') is True:
+            return "✅ Соответствует"
+        if criterion.get('does_not_comply') is True:
+            return "❌ Не соответствует"
+        return "⚪ Не проверен"
+
+    @staticmethod
+    def subdivision_title(section_data: Dict, sub_key: str) -> str:
+        """Заголовок подраздела перед его критериями"""
+        description = section_data['subdivisions'][sub_key].get('description', '')
+        return f"▫️ Подраздел {escape(sub_key)}: {escape(description)}\n\n"
+
+    def _checklist_lines(self, template: Dict) -> List[str]:
+        """Строки сообщения с чек-листом; склеиваются одним join"""
+        lines = [
+            f"📋 {escape(template['section_name'])}\n",
+            f"📁 Файл: {escape(template['file_name'])}\n\n"
+        ]
 
         for section_key, section_data in template['sections'].items():
-            message += f"🔹 РАЗДЕЛ {section_key}:\n"
-            message += f"{section_data['description']}\n\n"
-
-            for criterion in section_data['criteria']:
-                status = "⚪ Не проверен"
-                if criterion.get('complies') is True:
-                    status = "✅ Соответствует"
-                elif criterion.get('does_not_comply') is True:
-                    status = "❌ Не соответствует"
-
-                message += f"{criterion['number']}. {criterion['description']}\n"
-                message += f"   Статус: {status}\n"
+            lines.append(f"🔹 РАЗДЕЛ {section_key}:\n{escape(section_data['description'])}\n\n")
+
+            current_sub = None
+            for sub_key, criterion in iter_section_criteria(section_data):
+                if sub_key != current_sub:
+                    current_sub = sub_key
+                    lines.append(self.subdivision_title(section_data, sub_key))
+                lines.append(f"{criterion['number']}. {escape(criterion['description'])}\n")
+                lines.append(f"   Статус: {self.criterion_status(criterion)}\n")
                 if criterion.get('comment'):
-                    message += f"   💬 {criterion['comment']}\n"
-                message += "\n"
+                    lines.append(f"   💬 {escape(criterion['comment'])}\n")
+                lines.append("\n")
+
+            lines.append("────────────────────\n\n")
+
+        lines.append("Для заполнения нажмите '✅ Заполнить чек-лист'")
+        return lines
 
-            message += "────────────────────\n\n"
+    def render_checklist_parts(self, place_id: str, checklist_data: Dict) -> List[str]:
+        """Чек-лист, разбитый на сообщения; пока версия чек-листа не изменилась, берется из кэша"""
+        return render_cache.get_parts(
+            "inspector", place_id, checklist_version(checklist_data),
+            lambda: self._checklist_lines(checklist_data["checklist_data"])
+        )
 
-        message += "Для заполнения нажмите '✅ Заполнить чек-лист'"
 
-        return message
+# Глобальный экземпляр создается при первом обращении, а не при импорте
+_checklist_manager = None
 
 
-checklist_manager = ChecklistManager()
\ No newline at end of file
+def get_checklist_manager() -> ChecklistManager:
+    """Возвращает общий менеджер шаблонов; шаблоны читаются при первом обращении"""
+    global _checklist_manager
+    if _checklist_manager is None:
+        _checklist_manager = ChecklistManager()
+    return _checklist_manager
\ No newline at end of file
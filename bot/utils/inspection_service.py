@@ -1,7 +1,10 @@
+import uuid
+
 from aiogram import Bot
-from database.simple_db import db
-from database.places_db import places_db
+from database.places_db import get_places_db
+from database.user_cache import user_cache
 from keyboards.inspector_keyboards import get_confirm_inspection_keyboard
+from utils.outbox_sender import outbox_sender
 
 
 class InspectionService:
@@ -17,106 +20,109 @@ class InspectionService:
         }
         return addresses.get(place_id, place_id)
 
+    @staticmethod
+    def notification_key(kind: str, place_id: str, event_id: str = None) -> str:
+        """Ключ идемпотентности уведомления.
+
+        event_id - id действия пользователя (сообщения или callback): при повторной доставке
+        того же апдейта уведомление не ставится второй раз. Без него ключ уникален.
+        """
+        return f"{kind}:{place_id}:{event_id or uuid.uuid4().hex}"
+
     @staticmethod
     async def send_proposal_to_supervisor(
             bot: Bot,
             place_id: str,
             supervisor_id: str,
             inspector_name: str,
-            proposed_time: str
+            proposed_time: str,
+            event_id: str = None
     ) -> bool:
-        """Отправляет предложение о времени проверки бригадиру"""
-        try:
-            supervisor_user = db.get_user(int(supervisor_id))
-            if not supervisor_user:
-                return False
-
-            message_text = (
-                f"🕐 Новое предложение по проверке\n\n"
-                f"🏢 Место: {place_id}\n"
-                f"📍 Адрес: {InspectionService.get_place_address(place_id)}\n"
-                f"👁️ Проверяющий: {inspector_name}\n"
-                f"⏰ Предложенное время: {proposed_time}\n\n"
-                f"Подтвердите время или отклоните с указанием причины:"
-            )
-
-            await bot.send_message(
-                supervisor_user['telegram_id'],
-                message_text,
-                reply_markup=get_confirm_inspection_keyboard(place_id)
-            )
-            return True
-        except Exception as e:
-            print(f"Ошибка отправки сообщения бригадиру: {e}")
+        """Ставит в outbox предложение о времени проверки бригадиру"""
+        supervisor_user = user_cache.get(int(supervisor_id)) if str(supervisor_id).isdigit() else None
+        if not supervisor_user:
             return False
 
+        message_text = (
+            f"🕐 Новое предложение по проверке\n\n"
+            f"🏢 Место: {place_id}\n"
+            f"📍 Адрес: {InspectionService.get_place_address(place_id)}\n"
+            f"👁️ Проверяющий: {inspector_name}\n"
+            f"⏰ Предложенное время: {proposed_time}\n\n"
+            f"Подтвердите время или отклоните с указанием причины:"
+        )
+
+        return outbox_sender.add(
+            InspectionService.notification_key("proposal", place_id, event_id),
+            supervisor_user['telegram_id'],
+            message_text,
+            reply_markup=get_confirm_inspection_keyboard(place_id)
+        )
+
     @staticmethod
     async def send_confirmation_to_inspector(
             bot: Bot,
             place_id: str,
             inspector_id: str,
-            scheduled_time: str
+            scheduled_time: str,
+            event_id: str = None
     ) -> bool:
-        """Отправляет подтверждение проверки проверяющему"""
-        try:
-            inspector_user = db.get_user(int(inspector_id))
-            if not inspector_user:
-                return False
-
-            await bot.send_message(
-                inspector_user['telegram_id'],
-                f"✅ Бригадир подтвердил проверку!\n\n"
-                f"🏢 Место: {place_id}\n"
-                f"📍 Адрес: {InspectionService.get_place_address(place_id)}\n"
-                f"⏰ Подтвержденное время: {scheduled_time}\n\n"
-                f"Проверка запланирована!"
-            )
-            return True
-        except Exception as e:
-            print(f"Ошибка отправки подтверждения проверяющему: {e}")
+        """Ставит в outbox подтверждение проверки проверяющему"""
+        inspector_user = user_cache.get(int(inspector_id)) if str(inspector_id).isdigit() else None
+        if not inspector_user:
             return False
 
+        return outbox_sender.add(
+            InspectionService.notification_key("confirmation", place_id, event_id),
+            inspector_user['telegram_id'],
+            f"✅ Бригадир подтвердил проверку!\n\n"
+            f"🏢 Место: {place_id}\n"
+            f"📍 Адрес: {InspectionService.get_place_address(place_id)}\n"
+            f"⏰ Подтвержденное время: {scheduled_time}\n\n"
+            f"Проверка запланирована!"
+        )
+
     @staticmethod
     async def send_rejection_to_inspector(
             bot: Bot,
             place_id: str,
             inspector_id: str,
             rejection_reason: str,
-            alternative_time: str = None
+            alternative_time: str = None,
+            event_id: str = None
     ) -> bool:
-        """Отправляет уведомление об отказе проверяющему"""
-        try:
-            inspector_user = db.get_user(int(inspector_id))
-            if not inspector_user:
-                return False
-
-            message = (
-                f"❌ Бригадир отклонил предложенное время\n\n"
-                f"🏢 Место: {place_id}\n"
-                f"📍 Адрес: {InspectionService.get_place_address(place_id)}\n"
-                f"📝 Причина: {rejection_reason}\n"
-            )
-
-            if alternative_time:
-                message += f"🕐 Альтернативное время: {alternative_time}\n\n"
-            else:
-                message += "\n"
-
-            message += "Предложите другое время через кнопку 'Связаться с бригадиром'"
-
-            await bot.send_message(inspector_user['telegram_id'], message)
-            return True
-        except Exception as e:
-            print(f"Ошибка отправки отказа проверяющему: {e}")
+        """Ставит в outbox уведомление об отказе проверяющему"""
+        inspector_user = user_cache.get(int(inspector_id)) if str(inspector_id).isdigit() else None
+        if not inspector_user:
             return False
 
+        message = (
+            f"❌ Бригадир отклонил предложенное время\n\n"
+            f"🏢 Место: {place_id}\n"
+            f"📍 Адрес: {InspectionService.get_place_address(place_id)}\n"
+            f"📝 Причина: {rejection_reason}\n"
+        )
+
+        if alternative_time:
+            message += f"🕐 Альтернативное время: {alternative_time}\n\n"
+        else:
+            message += "\n"
+
+        message += "Предложите другое время через кнопку 'Связаться с бригадиром'"
+
+        return outbox_sender.add(
+            InspectionService.notification_key("rejection", place_id, event_id),
+            inspector_user['telegram_id'],
+            message
+        )
+
 
     @staticmethod
     def get_inspection_info(place_id: str) -> dict:
         """Возвращает полную информацию о проверке"""
-        inspection_data = places_db.search.get(place_id, {})
-        supervisor_id = places_db.get_supervisor_by_place(place_id)
-        supervisor = db.get_user(int(supervisor_id)) if supervisor_id and supervisor_id.isdigit() else None
+        inspection_data = get_places_db().get_inspection(place_id) or {}
+        supervisor_id = get_places_db().get_supervisor_by_place(place_id)
+        supervisor = user_cache.get(int(supervisor_id)) if supervisor_id and supervisor_id.isdigit() else None
 
         return {
             'place_id': place_id,
@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Границы корзин гистограмм задержек, сек (как у клиентов Prometheus, с запасом под отчеты)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Окно, за которое считается текущая частота апдейтов, сек
+RATE_WINDOW = 60
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами: запись O(число корзин), память постоянная"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        for position, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            position = len(BUCKETS)
+        self.counts[position] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины (как histogram_quantile в Prometheus)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = BUCKETS[position - 1] if position else 0.0
+                if position == len(BUCKETS):
+                    return lower
+                return lower + (BUCKETS[position] - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+
+class RateMeter:
+    """Число событий за последние RATE_WINDOW секунд (по секундным корзинам)"""
+
+    def __init__(self, window: int = RATE_WINDOW):
+        self.window = window
+        self._seconds: "deque[List[int]]" = deque()
+
+    def mark(self, now: float):
+        second = int(now)
+        if self._seconds and self._seconds[-1][0] == second:
+            self._seconds[-1][1] += 1
+        else:
+            self._seconds.append([second, 1])
+        self._trim(second)
+
+    def _trim(self, second: int):
+        while self._seconds and self._seconds[0][0] <= second - self.window:
+            self._seconds.popleft()
+
+    def per_second(self, now: float) -> float:
+        self._trim(int(now))
+        return sum(count for _, count in self._seconds) / self.window
+
+
+class Metrics:
+    """Счетчики и гистограммы задержек бота в памяти процесса.
+
+    Имена и метки - как в Prometheus; render_prometheus отдает текстовый формат для экспортера,
+    summary - данные для команды /stats. Запись защищена блокировкой: хранилища и отчеты
+    замеряются и из рабочих потоков.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._rates: Dict[str, RateMeter] = {}
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def mark(self, name: str):
+        """Отмечает событие для подсчета текущей частоты"""
+        with self._lock:
+            self._rates.setdefault(name, RateMeter()).mark(time.time())
+
+    def rate(self, name: str) -> float:
+        with self._lock:
+            meter = self._rates.get(name)
+            return meter.per_second(time.time()) if meter else 0.0
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Замеряет время блока (в том числе с await внутри) в гистограмму name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(self._labels(labels), 0)
+
+    def summary(self, name: str) -> List[Tuple[Dict[str, str], int, float, float, float]]:
+        """(метки, число, p50, p95, p99) по каждой серии гистограммы, самые частые - первыми"""
+        with self._lock:
+            series = list(self._histograms.get(name, {}).items())
+            rows = [
+                (dict(key), histogram.count,
+                 histogram.quantile(0.5), histogram.quantile(0.95), histogram.quantile(0.99))
+                for key, histogram in series
+            ]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def render_prometheus(self, prefix: str = "bot_") -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = [
+            f"# TYPE {prefix}uptime_seconds gauge",
+            f"{prefix}uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        with self._lock:
+            for name, meter in sorted(self._rates.items()):
+                lines.append(f"# TYPE {prefix}{name}_per_second gauge")
+                lines.append(f"{prefix}{name}_per_second {meter.per_second(time.time()):.3f}")
+
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}{name}_total counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{prefix}{name}_total{_format_labels(key)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {prefix}{name}_seconds histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (None,), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound is None else f"{bound:g}"
+                        lines.append(
+                            f"{prefix}{name}_seconds_bucket{_format_labels(key + (('le', le),))} {cumulative}"
+                        )
+                    lines.append(f"{prefix}{name}_seconds_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{prefix}{name}_seconds_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+# Общие метрики бота
+metrics = Metrics()
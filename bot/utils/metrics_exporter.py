@@ -0,0 +1,37 @@
+import logging
+from typing import Optional
+
+from aiohttp import web
+
+from utils.metrics import Metrics, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsExporter:
+    """Локальный HTTP-сервер с метриками бота для Prometheus (GET /metrics)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, source: Metrics = metrics):
+        self.host = host
+        self.port = port
+        self.source = source
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.source.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        """Запускает сервер; при port = 0 экспорт выключен"""
+        if not self.port or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Метрики доступны на http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
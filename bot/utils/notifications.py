@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Union
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+
+from config import NOTIFY_CHAT_BURST, NOTIFY_CHAT_RATE, NOTIFY_GLOBAL_RATE, NOTIFY_MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать перед повтором после сетевой ошибки или 5xx, сек (удваивается с каждой попыткой)
+BACKOFF_BASE = 0.5
+# Сколько корзин чатов держать, прежде чем выбросить простаивающие
+MAX_CHAT_BUCKETS = 1000
+
+
+class Delivery:
+    """Итог отправки уведомления"""
+    SENT = "sent"
+    # Лимит Telegram не снят, сеть или 5xx - можно повторить позже
+    RETRY = "retry"
+    # Бот заблокирован, чат не найден, запрос отклонен - повтор не поможет
+    UNDELIVERABLE = "undeliverable"
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+    async def acquire(self):
+        """Ждет, пока появится токен, и забирает его; ожидающие обслуживаются по очереди"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class NotificationDispatcher:
+    """Отправка уведомлений с учетом лимитов Telegram.
+
+    Каждое сообщение берет токен из корзины чата и из общей корзины бота.
+    На 429 (RetryAfter) ждет указанное Telegram время, на сетевые ошибки и 5xx - повторяет
+    с экспоненциальной задержкой. Ошибки получателя (бот заблокирован, чат не найден)
+    не повторяются и возвращаются как Delivery.UNDELIVERABLE, чтобы outbox не тратил
+    на них токены общей корзины.
+    """
+
+    def __init__(self, global_rate: float = 25, chat_rate: float = 1, chat_burst: int = 3, max_retries: int = 3):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                # Полная корзина ничем не отличается от новой, ее можно не хранить
+                for idle_id in [key for key, value in self._chat_buckets.items() if value.idle]:
+                    del self._chat_buckets[idle_id]
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def deliver(self, bot: Bot, chat_id: Union[int, str], text: str, **kwargs) -> str:
+        """Отправляет сообщение и возвращает итог (Delivery)"""
+        chat_id = int(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await self._chat_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                await bot.send_message(chat_id, text, **kwargs)
+                return Delivery.SENT
+            except TelegramRetryAfter as e:
+                logger.warning(f"Лимит Telegram для чата {chat_id}, ждем {e.retry_after} с")
+                await asyncio.sleep(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Не удалось отправить сообщение в чат {chat_id}: {e}")
+                    return Delivery.RETRY
+                await asyncio.sleep(BACKOFF_BASE * 2 ** attempt)
+            except (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound) as e:
+                logger.warning(f"Сообщение в чат {chat_id} не может быть доставлено: {e}")
+                return Delivery.UNDELIVERABLE
+            except Exception as e:
+                logger.error(f"Не удалось отправить сообщение в чат {chat_id}: {e}")
+                return Delivery.RETRY
+
+        logger.error(f"Не удалось отправить сообщение в чат {chat_id}: лимит Telegram не снят")
+        return Delivery.RETRY
+
+
+# Глобальный диспетчер уведомлений
+notifier = NotificationDispatcher(NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_RATE, NOTIFY_CHAT_BURST, NOTIFY_MAX_RETRIES)
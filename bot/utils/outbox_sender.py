@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+
+from config import OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS
+from database.outbox import Outbox, get_outbox
+from utils.notifications import Delivery, NotificationDispatcher, notifier
+
+logger = logging.getLogger(__name__)
+
+# Задержка повтора, сек: BACKOFF_BASE * 2^попытка, но не больше BACKOFF_MAX
+BACKOFF_BASE = 5
+BACKOFF_MAX = 600
+# Как часто проверять очередь без сигнала о новых уведомлениях (отложенные повторы), сек
+POLL_INTERVAL = 5
+# Как часто удалять старые отправленные уведомления, сек
+PURGE_INTERVAL = 3600
+
+
+class OutboxSender:
+    """Фоновая отправка уведомлений из outbox (доставка "хотя бы один раз").
+
+    Уведомление помечается отправленным только после ответа Telegram, поэтому при падении
+    между отправкой и отметкой оно уйдет повторно. Неудачные попытки (лимит, сеть, 5xx)
+    откладываются с экспоненциальной задержкой, после max_attempts уведомление помечается dead.
+    Недоставляемое получателю (бот заблокирован, чат не найден) помечается dead сразу.
+    """
+
+    def __init__(self, outbox: Outbox = None, dispatcher: NotificationDispatcher = notifier,
+                 batch_size: int = 50, max_attempts: int = 10):
+        self._outbox = outbox
+        self.dispatcher = dispatcher
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    @property
+    def outbox(self) -> Outbox:
+        if self._outbox is None:
+            self._outbox = get_outbox()
+        return self._outbox
+
+    def add(self, key: str, chat_id: int, text: str, reply_markup: InlineKeyboardMarkup = None) -> bool:
+        """Записывает уведомление в outbox и будит отправку; True, если уведомление поставлено или уже было"""
+        markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup else None
+        if not self.outbox.add(key, chat_id, text, markup):
+            logger.info(f"Уведомление {key} уже в очереди")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    async def start(self, bot: Bot):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(bot))
+
+    async def stop(self):
+        """Останавливает отправку; неотправленное остается в outbox до следующего запуска"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._wakeup = None
+
+    async def _run(self, bot: Bot):
+        while True:
+            try:
+                sent = await self.drain_once(bot)
+            except Exception:
+                logger.exception("Ошибка отправки уведомлений из outbox")
+                sent = 0
+            if sent:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._idle_timeout())
+            except asyncio.TimeoutError:
+                pass
+
+    def _idle_timeout(self) -> float:
+        next_at = self.outbox.next_attempt_at()
+        if next_at is None:
+            return POLL_INTERVAL
+        return min(POLL_INTERVAL, max(0.0, next_at - time.time()))
+
+    async def drain_once(self, bot: Bot) -> int:
+        """Отправляет одну пачку подошедших уведомлений; возвращает размер пачки"""
+        items = self.outbox.due(self.batch_size)
+        if not items:
+            self._purge()
+            return 0
+
+        results = await asyncio.gather(*(
+            self.dispatcher.deliver(
+                bot,
+                item["chat_id"],
+                item["text"],
+                reply_markup=InlineKeyboardMarkup.model_validate_json(item["reply_markup"])
+                if item["reply_markup"] else None
+            )
+            for item in items
+        ))
+
+        self.outbox.mark_sent([item["id"] for item, result in zip(items, results) if result == Delivery.SENT])
+        for item, result in zip(items, results):
+            if result == Delivery.SENT:
+                continue
+            attempt = item["attempts"] + 1
+            if result == Delivery.UNDELIVERABLE:
+                self.outbox.mark_failed(item["id"], None, "получатель недоступен")
+            elif attempt >= self.max_attempts:
+                logger.error(f"Уведомление {item['key']} не доставлено за {attempt} попыток")
+                self.outbox.mark_failed(item["id"], None, "попытки исчерпаны")
+            else:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+                self.outbox.mark_failed(item["id"], time.time() + delay, "не доставлено")
+        return len(items)
+
+    def _purge(self):
+        now = time.time()
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self.outbox.purge_sent()
+            self._last_purge = now
+
+
+# Глобальный отправитель уведомлений
+outbox_sender = OutboxSender(batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS)
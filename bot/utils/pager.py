@@ -0,0 +1,290 @@
+import html
+import re
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from config import LIST_PAGE_SIZE, PAGER_CACHE_SIZE
+
+# Лимит Telegram на текст сообщения (в UTF-16 единицах, эмодзи занимают две)
+MESSAGE_LIMIT = 4096
+
+# Открытый тег или HTML-сущность в конце куска, который нельзя разрезать
+_UNFINISHED_MARKUP = re.compile(r"<[^>]*$|&[#\w]*$")
+_TAG = re.compile(r"<(/?)([a-zA-Z-]+)[^>]*>")
+# Запас на закрывающие и повторно открывающие теги, если строку пришлось резать внутри них
+TAGS_RESERVE = 100
+
+PageBuilder = Callable[[str, int], Optional[List[str]]]
+ExtraButtons = Callable[[str, int, List[str]], List[List[InlineKeyboardButton]]]
+
+
+def escape(value) -> str:
+    """Экранирует пользовательские данные для сообщений с ParseMode.HTML"""
+    return html.escape(str(value), quote=False)
+
+
+def text_length(text: str) -> int:
+    """Длина текста так, как ее считает Telegram (UTF-16)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _open_tags(text: str, opened: List[str]) -> List[str]:
+    """Теги, оставшиеся открытыми после text (opened - открытые до него)"""
+    stack = list(opened)
+    for match in _TAG.finditer(text):
+        if match.group(1):
+            for position in range(len(stack) - 1, -1, -1):
+                if _TAG.match(stack[position]).group(2) == match.group(2):
+                    del stack[position]
+                    break
+        else:
+            stack.append(match.group(0))
+    return stack
+
+
+def _cut_long_line(line: str, limit: int) -> List[str]:
+    """Режет строку длиннее лимита по пробелам, не разрывая теги и сущности.
+
+    Теги, открытые на месте разреза, закрываются в конце куска и открываются заново в следующем.
+    """
+    pieces = []
+    opened: List[str] = []
+    budget = limit - TAGS_RESERVE if "<" in line else limit
+    while text_length(line) > limit:
+        # Грубая граница по символам: текст в UTF-16 не короче, чем в символах
+        cut = budget
+        while text_length(line[:cut]) > budget:
+            cut -= 1
+        space = line.rfind(" ", 0, cut)
+        if space > 0:
+            cut = space + 1
+        unfinished = _UNFINISHED_MARKUP.search(line[:cut])
+        if unfinished and unfinished.start() > 0:
+            cut = unfinished.start()
+        piece, line = line[:cut], line[cut:]
+        still_open = _open_tags(piece, opened)
+        closing = "".join(f"</{_TAG.match(tag).group(2)}>" for tag in reversed(still_open))
+        pieces.append(piece + closing)
+        line = "".join(still_open) + line
+        opened = []
+    pieces.append(line)
+    return pieces
+
+
+def split_lines(lines: Union[str, List[str]], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Склеивает строки в сообщения не длиннее limit, разрезая только между строками.
+
+    Строка - единица разметки: теги не должны переходить через перевод строки.
+    Длина считается по готовому HTML, который не короче видимого текста.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines(keepends=True)
+
+    parts: List[str] = []
+    chunk: List[str] = []
+    size = 0
+    for line in lines:
+        for piece in _cut_long_line(line, limit):
+            piece_size = text_length(piece)
+            if size + piece_size > limit and chunk:
+                parts.append("".join(chunk))
+                chunk, size = [], 0
+            chunk.append(piece)
+            size += piece_size
+    if chunk:
+        parts.append("".join(chunk))
+    return parts or [""]
+
+
+class MessagePager:
+    """Длинный текст одним сообщением со страницами и кнопками ◀️ / ▶️.
+
+    Страницы берутся из источника: зарегистрированной функции (key, user_id) -> страницы,
+    которая собирает их заново (например, из кэша отрисовки), или из памяти для разовых списков.
+    Листание редактирует то же сообщение, поэтому длинный список стоит одного сообщения.
+    """
+
+    MEMORY_SOURCE = "mem"
+
+    def __init__(self, cache_size: int = 1000):
+        self.cache_size = cache_size
+        self._sources: Dict[str, Tuple[PageBuilder, Optional[ExtraButtons]]] = {}
+        self._memory: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    def register(self, source: str, build: PageBuilder, extra_buttons: ExtraButtons = None):
+        """Источник страниц; extra_buttons добавляет свои ряды кнопок под навигацией"""
+        self._sources[source] = (build, extra_buttons)
+
+    def _remember(self, pages: List[str]) -> str:
+        key = uuid.uuid4().hex[:12]
+        self._memory[key] = pages
+        while len(self._memory) > self.cache_size:
+            self._memory.popitem(last=False)
+        return key
+
+    def get_pages(self, source: str, key: str, user_id: int) -> Optional[List[str]]:
+        if source == self.MEMORY_SOURCE:
+            pages = self._memory.get(key)
+            if pages is not None:
+                self._memory.move_to_end(key)
+            return pages
+        if source not in self._sources:
+            return None
+        return self._sources[source][0](key, user_id)
+
+    def keyboard(self, source: str, key: str, page: int, pages: List[str]) -> Optional[InlineKeyboardMarkup]:
+        rows = []
+        if len(pages) > 1:
+            nav = []
+            if page > 0:
+                nav.append(InlineKeyboardButton(text="◀️", callback_data=f"pg:{source}:{key}:{page - 1}"))
+            nav.append(InlineKeyboardButton(text=f"{page + 1}/{len(pages)}", callback_data="pg:noop"))
+            if page < len(pages) - 1:
+                nav.append(InlineKeyboardButton(text="▶️", callback_data=f"pg:{source}:{key}:{page + 1}"))
+            rows.append(nav)
+
+        extra_buttons = self._sources.get(source, (None, None))[1]
+        if extra_buttons:
+            rows.extend(extra_buttons(key, page, pages))
+        return InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+
+    async def send(self, message: Message, text: Union[str, List[str]] = None, reply_markup=None,
+                   footer: str = None, source: str = None, key: str = None) -> Message:
+        """Отправляет первую страницу.
+
+        Для одной страницы footer дописывается к тексту и reply_markup (обычная клавиатура)
+        прикрепляется к тому же сообщению. У сообщения со страницами своя inline-клавиатура,
+        поэтому footer с reply_markup уходят отдельным сообщением (без footer - не отправляются).
+        """
+        if source is None:
+            pages = split_lines(text)
+            source = self.MEMORY_SOURCE
+            key = self._remember(pages) if len(pages) > 1 else None
+        else:
+            pages = self.get_pages(source, key, message.chat.id) or [""]
+
+        inline_markup = self.keyboard(source, key, 0, pages)
+        if inline_markup is None:
+            single = split_lines([pages[0], f"\n\n{footer}" if footer else ""])
+            if len(single) == 1:
+                return await message.answer(single[0], reply_markup=reply_markup)
+
+        sent = await message.answer(pages[0], reply_markup=inline_markup)
+        if footer:
+            await message.answer(footer, reply_markup=reply_markup)
+        return sent
+
+    async def turn(self, callback: CallbackQuery):
+        """Показывает страницу из callback_data вида pg:источник:ключ:страница"""
+        if callback.data == "pg:noop":
+            await callback.answer()
+            return
+
+        _, source, key, page = callback.data.split(":", 3)
+        pages = self.get_pages(source, key, callback.from_user.id)
+        if not pages:
+            await callback.answer("Список устарел, откройте его заново")
+            return
+
+        page = min(int(page), len(pages) - 1)
+        await callback.answer()
+        await callback.message.edit_text(pages[page], reply_markup=self.keyboard(source, key, page, pages))
+
+
+class CursorPage(NamedTuple):
+    """Страница списка мест: place_id страницы и есть ли страницы до и после нее"""
+    list_id: str
+    ids: List[str]
+    has_prev: bool
+    has_next: bool
+
+
+# (user_id, after, before, limit) -> до limit place_id после курсора after или перед before
+PageFetcher = Callable[[int, Optional[str], Optional[str], int], List[str]]
+# страница -> (текст страницы, inline-клавиатура с кнопками мест и листанием)
+PageRenderer = Callable[[CursorPage], Tuple[str, InlineKeyboardMarkup]]
+
+
+def page_navigation(page: CursorPage) -> List[List[InlineKeyboardButton]]:
+    """Ряд ◀️ / ▶️; курсор - крайний place_id страницы, поэтому callback_data короткая"""
+    nav = []
+    if page.has_prev:
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"cl:{page.list_id}:<:{page.ids[0]}"))
+    if page.has_next:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"cl:{page.list_id}:>:{page.ids[-1]}"))
+    return [nav] if nav else []
+
+
+class CursorPager:
+    """Списки мест со страницами по курсору.
+
+    Страница выбирается из упорядоченного индекса хранилища по крайнему place_id соседней,
+    поэтому ни выборка, ни отрисовка текста и кнопок не зависят от общего числа мест.
+    Владелец списка - тот, кто нажал кнопку, в callback_data он не хранится.
+    """
+
+    def __init__(self, page_size: int = 8):
+        self.page_size = page_size
+        self._lists: Dict[str, Tuple[PageFetcher, PageRenderer]] = {}
+
+    def register(self, list_id: str, fetch: PageFetcher, render: PageRenderer):
+        self._lists[list_id] = (fetch, render)
+
+    def get_page(self, list_id: str, user_id: int, after: str = None, before: str = None) -> CursorPage:
+        """Страница после after или перед before; без курсора - первая"""
+        fetch = self._lists[list_id][0]
+        # Лишний элемент показывает, есть ли еще страница в сторону листания
+        ids = fetch(user_id, after, before, self.page_size + 1)
+        if before:
+            return CursorPage(list_id, ids[-self.page_size:], len(ids) > self.page_size, True)
+        return CursorPage(list_id, ids[:self.page_size], after is not None, len(ids) > self.page_size)
+
+    def render(self, page: CursorPage) -> Tuple[str, InlineKeyboardMarkup]:
+        return self._lists[page.list_id][1](page)
+
+    async def send(self, message: Message, page: CursorPage, reply_markup=None, footer: str = None) -> Message:
+        """Отправляет страницу; footer с reply_markup (обычная клавиатура) уходят отдельным сообщением"""
+        text, inline_markup = self.render(page)
+        sent = await message.answer(text, reply_markup=inline_markup)
+        if footer:
+            await message.answer(footer, reply_markup=reply_markup)
+        return sent
+
+    async def turn(self, callback: CallbackQuery):
+        """Показывает страницу из callback_data вида cl:список:<|>:курсор"""
+        _, list_id, direction, cursor = callback.data.split(":", 3)
+        if list_id not in self._lists:
+            await callback.answer("Список устарел, откройте его заново")
+            return
+
+        user_id = callback.from_user.id
+        if direction == "<":
+            page = self.get_page(list_id, user_id, before=cursor)
+        else:
+            page = self.get_page(list_id, user_id, after=cursor)
+        if not page.ids:
+            # Места за курсором исчезли - возвращаемся к началу списка
+            page = self.get_page(list_id, user_id)
+        if not page.ids:
+            await callback.answer("Список пуст")
+            return
+
+        await callback.answer()
+        text, inline_markup = self.render(page)
+        try:
+            await callback.message.edit_text(text, reply_markup=inline_markup)
+        except TelegramBadRequest as e:
+            # Повторное нажатие на ту же страницу
+            if "message is not modified" not in str(e):
+                raise
+
+
+# Общий пейджер сообщений
+pager = MessagePager(PAGER_CACHE_SIZE)
+
+# Общий пейджер списков мест
+cursor_pager = CursorPager(LIST_PAGE_SIZE)
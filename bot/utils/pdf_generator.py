@@ -7,22 +7,26 @@ from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 import os
 
-# Попробуем использовать стандартные шрифты
-try:
-    # Для русского текола попробуем использовать стандартный шрифт
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
+# Шрифт регистрируется при первой генерации PDF, а не при импорте
+FONT_NAME = None
 
-    # Если есть шрифт с поддержкой кириллицы
-    pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
-    FONT_NAME = 'Arial'
-except:
-    # Используем стандартный шрифт
-    FONT_NAME = 'Helvetica'
+
+def get_font_name() -> str:
+    global FONT_NAME
+    if FONT_NAME is None:
+        try:
+            # Если есть шрифт с поддержкой кириллицы
+            pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
+            FONT_NAME = 'Arial'
+        except:
+            # Используем стандартный шрифт
+            FONT_NAME = 'Helvetica'
+    return FONT_NAME
 
 
 def generate_users_pdf(users_data, filename="users_list.pdf"):
     """Генерирует PDF файл со списком пользователей"""
+    font_name = get_font_name()
 
     # Создаем документ
     doc = SimpleDocTemplate(filename, pagesize=A4)
@@ -84,7 +88,7 @@ def generate_users_pdf(users_data, filename="users_list.pdf"):
         ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), FONT_NAME),
+        ('FONTNAME', (0, 0), (-1, 0), font_name),
         ('FONTSIZE', (0, 0), (-1, 0), 10),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
 
@@ -92,7 +96,7 @@ def generate_users_pdf(users_data, filename="users_list.pdf"):
         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
         ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 1), (-1, -1), FONT_NAME),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
         ('FONTSIZE', (0, 1), (-1, -1), 8),
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
 
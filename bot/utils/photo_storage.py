@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import os
+from typing import Dict
+
+from aiogram import Bot
+
+from config import PHOTOS_FOLDER, PHOTO_DOWNLOAD_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoStorage:
+    """Хранилище фото нарушений, адресуемое по file_unique_id.
+
+    Фото скачиваются в фоне (не больше max_concurrent одновременно) потоком прямо в файл,
+    поэтому обработчик сразу получает путь и не ждет сети. Повторно присланное фото
+    (тот же file_unique_id) второй раз не скачивается.
+    """
+
+    def __init__(self, folder: str = "data/checklist_photos", max_concurrent: int = 4):
+        self.folder = folder
+        self.max_concurrent = max_concurrent
+        self._semaphore = None
+        # file_unique_id -> задача скачивания, пока она не завершилась
+        self._downloads: Dict[str, asyncio.Task] = {}
+
+    def path_for(self, file_unique_id: str) -> str:
+        """Путь к фото; файлы раскладываются по подпапкам по первым двум символам id"""
+        return os.path.join(self.folder, file_unique_id[:2], f"{file_unique_id}.jpg")
+
+    def submit(self, bot: Bot, file_id: str, file_unique_id: str) -> str:
+        """Ставит фото в очередь на скачивание и сразу возвращает его будущий путь"""
+        path = self.path_for(file_unique_id)
+        if os.path.exists(path) or file_unique_id in self._downloads:
+            return path
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        task = asyncio.create_task(self._download(bot, file_id, path))
+        self._downloads[file_unique_id] = task
+        task.add_done_callback(lambda _: self._downloads.pop(file_unique_id, None))
+        return path
+
+    async def _download(self, bot: Bot, file_id: str, path: str):
+        tmp_path = f"{path}.part"
+        async with self._semaphore:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # При destination-пути aiogram пишет файл по частям, не держа его целиком в памяти
+                await bot.download(file_id, destination=tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.error(f"Не удалось скачать фото {file_id}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    async def stop(self):
+        """Дожидается скачивания фото, поставленных в очередь до остановки"""
+        if self._downloads:
+            await asyncio.gather(*self._downloads.values(), return_exceptions=True)
+
+
+# Глобальный экземпляр хранилища фото
+photo_storage = PhotoStorage(PHOTOS_FOLDER, PHOTO_DOWNLOAD_CONCURRENCY)
@@ -0,0 +1,37 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Tuple
+
+from config import RENDER_CACHE_SIZE
+from utils.pager import split_lines
+
+
+class RenderCache:
+    """Кэш отрисованных сообщений: (вид, место) -> (версия, части сообщения).
+
+    Пока версия данных не изменилась, повторный просмотр стоит одного поиска в словаре.
+    Старые записи вытесняются по LRU.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[Hashable, List[str]]]" = OrderedDict()
+
+    def get_parts(self, view: str, place_id: str, version: Hashable,
+                  build: Callable[[], List[str]]) -> List[str]:
+        """Части сообщения из кэша; build (список строк) вызывается только при смене версии"""
+        key = (view, place_id)
+        cached = self._cache.get(key)
+        if cached and cached[0] == version:
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        parts = split_lines(build())
+        self._cache[key] = (version, parts)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return parts
+
+
+# Общий кэш отрисовки
+render_cache = RenderCache(RENDER_CACHE_SIZE)
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import REPORT_CACHE_FOLDER, REPORT_CACHE_SIZE, REPORT_WORKERS
+from utils.report_service import ReportService, report_service
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ReportJob:
+    """Задача на отчет; подписчики получают каждое изменение статуса"""
+
+    def __init__(self, kind: str, payload: Dict[str, Any], fingerprint: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.payload = payload
+        self.fingerprint = fingerprint
+        self.path = path
+        self.status = JobStatus.QUEUED
+        self.error: Optional[str] = None
+        self.listeners: List[Callable[["ReportJob"], Awaitable[None]]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+
+class ReportQueue:
+    """Очередь отчетов с кэшем готовых файлов.
+
+    Файл отчета называется по отпечатку входных данных (вид + payload), поэтому одинаковый
+    запрос отдается из кэша без повторной генерации. Одинаковые запросы, пришедшие пока
+    отчет еще готовится, подписываются на уже поставленную задачу, а не ставят вторую.
+    """
+
+    def __init__(self, service: ReportService, folder: str = "data/reports_cache",
+                 workers: int = 2, cache_size: int = 50):
+        self.service = service
+        self.folder = folder
+        self.workers = workers
+        self.cache_size = cache_size
+        self.jobs: Dict[str, ReportJob] = {}
+        # отпечаток -> незавершенная задача
+        self._active: Dict[str, ReportJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def fingerprint(kind: str, payload: Dict[str, Any]) -> str:
+        raw = json.dumps([kind, payload], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], extension: str,
+                      on_progress: Callable[[ReportJob], Awaitable[None]] = None) -> ReportJob:
+        """Ставит отчет в очередь и возвращает задачу; функция отчета получает путь в аргументе filename"""
+        fingerprint = self.fingerprint(kind, payload)
+
+        job = self._active.get(fingerprint)
+        if job is None:
+            job = ReportJob(kind, payload, fingerprint, os.path.join(self.folder, f"{kind}_{fingerprint[:24]}.{extension}"))
+            self.jobs[job.id] = job
+            if os.path.exists(job.path):
+                job.status = JobStatus.DONE
+                # Обновляем время, чтобы часто запрашиваемый отчет не вытеснялся из кэша
+                os.utime(job.path)
+            else:
+                self._active[fingerprint] = job
+                self._ensure_workers()
+                self._queue.put_nowait(job)
+
+        if on_progress:
+            job.listeners.append(on_progress)
+            await self._notify_one(job, on_progress)
+        if job.finished:
+            self.jobs.pop(job.id, None)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ReportJob]:
+        return self.jobs.get(job_id)
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ReportJob):
+        job.status = JobStatus.RUNNING
+        await self._notify(job)
+
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{job.path}.part"
+        try:
+            await self.service.submit_report(job.kind, {**job.payload, "filename": tmp_path})
+            os.replace(tmp_path, job.path)
+            job.status = JobStatus.DONE
+        except Exception as e:
+            logger.error(f"Отчет {job.kind} ({job.id}) не сформирован: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            self._active.pop(job.fingerprint, None)
+
+        if job.status == JobStatus.DONE:
+            self._prune_cache()
+        await self._notify(job)
+        self.jobs.pop(job.id, None)
+
+    async def _notify(self, job: ReportJob):
+        for listener in list(job.listeners):
+            await self._notify_one(job, listener)
+
+    async def _notify_one(self, job: ReportJob, listener: Callable[[ReportJob], Awaitable[None]]):
+        # Ошибка подписчика (например, сообщение удалено) не должна останавливать очередь
+        try:
+            await listener(job)
+        except Exception as e:
+            logger.warning(f"Не удалось сообщить о ходе отчета {job.id}: {e}")
+
+    def _prune_cache(self):
+        """Оставляет в кэше cache_size последних использованных файлов"""
+        files = [
+            os.path.join(self.folder, name) for name in os.listdir(self.folder)
+            if not name.endswith(".part")
+        ]
+        if len(files) <= self.cache_size:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.cache_size]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def stop(self):
+        """Дожидается поставленных отчетов и останавливает обработчики очереди"""
+        if self._queue is not None and self._worker_tasks:
+            await self._queue.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+
+# Глобальная очередь отчетов
+report_queue = ReportQueue(report_service, REPORT_CACHE_FOLDER, REPORT_WORKERS, REPORT_CACHE_SIZE)
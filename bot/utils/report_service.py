@@ -0,0 +1,76 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from config import REPORT_PROCESSES, REPORT_THREADS
+from utils.metrics import metrics
+
+
+def render_users_pdf(users_data: Dict, filename: str) -> str:
+    """Задача "users_pdf": список пользователей в PDF (reportlab импортируется в рабочем процессе)"""
+    from utils.pdf_generator import generate_users_pdf
+    return generate_users_pdf(users_data, filename)
+
+
+class ReportService:
+    """Генерация отчетов вне цикла событий.
+
+    Каждый вид отчета регистрируется с функцией, типом нагрузки и лимитом одновременных задач:
+    CPU-задачи (верстка PDF/Excel) уходят в пул процессов, задачи с вводом-выводом - в пул потоков.
+    Пулы создаются при первой задаче.
+    """
+
+    def __init__(self, processes: int = 2, threads: int = 4):
+        self.processes = processes
+        self.threads = threads
+        self._kinds: Dict[str, Tuple[Callable[..., Any], bool, int]] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._process_pool = None
+        self._thread_pool = None
+
+    def register(self, kind: str, func: Callable[..., Any], cpu_bound: bool = False, limit: int = 1):
+        """Регистрирует вид отчета; для пула процессов func должна быть функцией уровня модуля"""
+        self._kinds[kind] = (func, cpu_bound, limit)
+
+    def _executor(self, cpu_bound: bool) -> Executor:
+        if cpu_bound:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="report")
+        return self._thread_pool
+
+    async def submit_report(self, kind: str, payload: Dict[str, Any]) -> Any:
+        """Выполняет отчет вида kind с аргументами payload и возвращает результат функции"""
+        if kind not in self._kinds:
+            raise ValueError(f"Неизвестный вид отчета: {kind}")
+        func, cpu_bound, limit = self._kinds[kind]
+
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            semaphore = self._semaphores[kind] = asyncio.Semaphore(limit)
+
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            # Время отрисовки без ожидания семафора; упавшие отчеты считаются отдельно
+            try:
+                with metrics.timer("report_render", kind=kind):
+                    return await loop.run_in_executor(self._executor(cpu_bound), functools.partial(func, **payload))
+            except Exception:
+                metrics.inc("report_errors", kind=kind)
+                raise
+
+    def shutdown(self):
+        """Останавливает пулы, дожидаясь начатых задач"""
+        for pool in (self._process_pool, self._thread_pool):
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        self._process_pool = None
+        self._thread_pool = None
+
+
+# Создаем экземпляр сервиса
+report_service = ReportService(REPORT_PROCESSES, REPORT_THREADS)
+report_service.register("users_pdf", render_users_pdf, cpu_bound=True, limit=2)